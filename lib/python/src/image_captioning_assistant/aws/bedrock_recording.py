@@ -0,0 +1,223 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""Record Bedrock Converse responses to disk and replay them, so runs can be benchmarked and compared offline.
+
+Each response is stored as one gzipped JSON file named after the fingerprint of its request, a hash of the
+request with image bytes replaced by their own hash. Replaying serves the stored response after the latency
+it was recorded with, optionally scaled, without calling Bedrock.
+
+Recording is enabled for the generation pipeline and the evaluation suite with environment variables:
+BEDROCK_RECORDING_MODE (record, replay or auto) and BEDROCK_RECORDINGS_DIR, plus BEDROCK_REPLAY_LATENCY_SCALE
+to speed up or slow down replays.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, cast
+
+import boto3
+
+logger = logging.getLogger(__name__)
+
+RECORD = "record"
+REPLAY = "replay"
+# Replay recorded responses and record the missing ones
+AUTO = "auto"
+RECORDING_MODES = (RECORD, REPLAY, AUTO)
+
+RECORDING_MODE_ENV_VAR = "BEDROCK_RECORDING_MODE"
+RECORDINGS_DIR_ENV_VAR = "BEDROCK_RECORDINGS_DIR"
+REPLAY_LATENCY_SCALE_ENV_VAR = "BEDROCK_REPLAY_LATENCY_SCALE"
+
+# Response keys that only describe the HTTP exchange
+TRANSIENT_RESPONSE_KEYS = ("ResponseMetadata",)
+
+
+class RecordingNotFoundError(KeyError):
+    """Raised when replaying a request that was never recorded."""
+
+
+def _canonical(value: Any) -> Any:
+    """Replace bytes with their hash, recursively, so requests with images serialize to compact JSON."""
+    if isinstance(value, (bytes, bytearray)):
+        return {"sha256": hashlib.sha256(value).hexdigest(), "size": len(value)}
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def request_fingerprint(operation: str, request: dict[str, Any]) -> str:
+    """Fingerprint a request by hashing its canonical JSON.
+
+    Args:
+        operation (str): Client operation, such as converse.
+        request (dict[str, Any]): Keyword arguments of the call.
+
+    Returns:
+        str: Hex digest identifying the request.
+    """
+    canonical_json = json.dumps(
+        {"operation": operation, "request": _canonical(request)},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical_json.encode("utf-8")).hexdigest()
+
+
+class ResponseStore:
+    """A directory of recorded responses, one gzipped JSON file per request fingerprint."""
+
+    def __init__(self, directory: str | Path) -> None:
+        """Initialize the store, creating its directory if missing."""
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, fingerprint: str) -> Path:
+        return self.directory / f"{fingerprint}.json.gz"
+
+    def get(self, fingerprint: str) -> dict[str, Any] | None:
+        """Load a recording, or None if the request was never recorded."""
+        try:
+            with gzip.open(self._path(fingerprint), "rt", encoding="utf-8") as f:
+                return cast(dict[str, Any], json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def put(self, fingerprint: str, recording: dict[str, Any]) -> None:
+        """Save a recording, replacing the file atomically so concurrent readers never see a partial one."""
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+                json.dump(recording, f, default=str, separators=(",", ":"))
+            os.replace(temp_path, self._path(fingerprint))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+class RecordingBedrockRuntime:
+    """Wrap a Bedrock runtime client to record its Converse responses or replay recorded ones.
+
+    Other attributes are passed through to the wrapped client, so the wrapper can stand in for it, including
+    as the client of ChatBedrockConverse.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        store: ResponseStore,
+        mode: str = AUTO,
+        latency_scale: float = 1.0,
+    ) -> None:
+        """Initialize the wrapper.
+
+        Args:
+            client (Any): Bedrock runtime client to call when recording.
+            store (ResponseStore): Where recordings are kept.
+            mode (str): RECORD to always call and record, REPLAY to only replay, AUTO to replay if recorded.
+            latency_scale (float): Factor applied to recorded latencies when replaying, 0 to replay instantly.
+        """
+        if mode not in RECORDING_MODES:
+            raise ValueError(f"Unknown recording mode {mode}, expected one of {', '.join(RECORDING_MODES)}")
+        self.client = client
+        self.store = store
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.recorded = 0
+        self.replayed = 0
+        self._lock = threading.Lock()
+
+    def converse(self, **kwargs: Any) -> dict[str, Any]:
+        """Call Converse, or replay its recorded response."""
+        fingerprint = request_fingerprint("converse", kwargs)
+        if self.mode != RECORD:
+            recording = self.store.get(fingerprint)
+            if recording is not None:
+                time.sleep(recording["latency_ms"] * self.latency_scale / 1000)
+                with self._lock:
+                    self.replayed += 1
+                return cast(dict[str, Any], recording["response"])
+            if self.mode == REPLAY:
+                raise RecordingNotFoundError(
+                    f"No recording of converse request {fingerprint} for model {kwargs.get('modelId')}"
+                )
+
+        started = time.perf_counter()
+        response = self.client.converse(**kwargs)
+        latency_ms = round((time.perf_counter() - started) * 1000)
+        self.store.put(
+            fingerprint,
+            {
+                "operation": "converse",
+                "model_id": kwargs.get("modelId"),
+                "latency_ms": latency_ms,
+                "recorded_at": int(time.time()),
+                "response": {key: value for key, value in response.items() if key not in TRANSIENT_RESPONSE_KEYS},
+            },
+        )
+        with self._lock:
+            self.recorded += 1
+        return cast(dict[str, Any], response)
+
+    def stats(self) -> dict[str, int]:
+        """Return the counts of recorded and replayed calls so far."""
+        with self._lock:
+            return {"recorded": self.recorded, "replayed": self.replayed}
+
+    def __getattr__(self, name: str) -> Any:
+        """Delegate every other client method and attribute to the wrapped client."""
+        if name == "client":
+            # Not initialized yet, as when unpickling
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+
+def wrap_bedrock_runtime(client: Any) -> Any:
+    """Wrap a Bedrock runtime client for recording or replay as configured by the environment, if at all.
+
+    Args:
+        client (Any): Bedrock runtime client.
+
+    Returns:
+        Any: A RecordingBedrockRuntime, or the client itself when BEDROCK_RECORDING_MODE is not set.
+    """
+    mode = os.environ.get(RECORDING_MODE_ENV_VAR)
+    if not mode:
+        return client
+    directory = os.environ.get(RECORDINGS_DIR_ENV_VAR)
+    if not directory:
+        msg = f"{RECORDINGS_DIR_ENV_VAR} must be set when {RECORDING_MODE_ENV_VAR} is set"
+        logger.error(msg)
+        raise ValueError(msg)
+    latency_scale = float(os.environ.get(REPLAY_LATENCY_SCALE_ENV_VAR) or 1.0)
+    logger.info(f"Bedrock responses in {mode} mode from {directory}, replay latency scale {latency_scale}")
+    return RecordingBedrockRuntime(client, ResponseStore(directory), mode=mode, latency_scale=latency_scale)
+
+
+def chat_bedrock_converse_kwargs_with_recording(chat_bedrock_converse_kwargs: dict[str, Any]) -> dict[str, Any]:
+    """Give ChatBedrockConverse keyword args a recording client when recording is configured by the environment.
+
+    Args:
+        chat_bedrock_converse_kwargs (dict[str, Any]): Keyword args for ChatBedrockConverse.
+
+    Returns:
+        dict[str, Any]: The same keyword args, with a client that records or replays if enabled.
+    """
+    if not os.environ.get(RECORDING_MODE_ENV_VAR):
+        return chat_bedrock_converse_kwargs
+    client = chat_bedrock_converse_kwargs.get("client")
+    if client is None:
+        region_name = chat_bedrock_converse_kwargs.get("region_name")
+        client = boto3.client("bedrock-runtime", **({"region_name": region_name} if region_name else {}))
+    return chat_bedrock_converse_kwargs | {"client": wrap_bedrock_runtime(client)}
@@ -0,0 +1,536 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""DynamoDB helper functions."""
+
+import logging
+import random
+import time
+from typing import Any, Iterator
+
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "job_name"
+JOB_TYPE = "job_type"
+WORK_ID = "work_id"
+WORK_STATUS = "work_status"
+TOTAL_WORKS = "total_works"
+WORK_STATUS_COUNTS = "work_status_counts"
+WORKS_STATUS_INDEX_NAME = "job_name-work_status-index"
+LEASE_OWNER = "lease_owner"
+LEASE_EXPIRES_AT = "lease_expires_at"
+USAGE = "usage"
+PAGES_PROCESSED = "pages_processed"
+PAGES_FAILED = "pages_failed"
+PROCESSING_MS = "processing_ms"
+TOTAL_PAGES = "total_pages"
+PAGE_COUNT = "page_count"
+ATTEMPTS = "attempts"
+# Concurrent transitions of works in one job contend for its summary item
+TRANSACTION_CONFLICT_RETRIES = 5
+# (jobs table, job name) of jobs found to have no summary item; they never gain one, as it is created with the job
+_jobs_without_counters: set[tuple[str, str]] = set()
+
+
+def build_set_expression(fields: dict[str, Any]) -> tuple[str, dict[str, str], dict[str, Any]]:
+    """Build a SET update expression for top-level fields.
+
+    Args:
+        fields (dict): Field-value pairs to set.
+
+    Returns:
+        tuple: UpdateExpression, ExpressionAttributeNames and ExpressionAttributeValues.
+    """
+    expression_parts = []
+    expression_attribute_names = {}
+    expression_attribute_values = {}
+    for key, value in fields.items():
+        expression_parts.append(f"#{key} = :{key}")
+        expression_attribute_names[f"#{key}"] = key
+        expression_attribute_values[f":{key}"] = value
+    return "SET " + ", ".join(expression_parts), expression_attribute_names, expression_attribute_values
+
+
+def create_job_summary(
+    jobs_table: Any,
+    job_name: str,
+    job_type: str,
+    total_works: int,
+    initial_status: str,
+    total_pages: int | None = None,
+) -> None:
+    """Create the summary item holding a job's per-status work counters.
+
+    Args:
+        jobs_table (Any): DynamoDB jobs table.
+        job_name (str): The job name.
+        job_type (str): The job type.
+        total_works (int): Number of works in the job.
+        initial_status (str): Status every work starts in.
+        total_pages (int, optional): Number of pages over all works, used to estimate the time remaining.
+    """
+    item = {
+        JOB_NAME: job_name,
+        JOB_TYPE: job_type,
+        TOTAL_WORKS: total_works,
+        WORK_STATUS_COUNTS: {initial_status: total_works},
+        USAGE: {},
+        PAGES_PROCESSED: 0,
+    }
+    if total_pages is not None:
+        item[TOTAL_PAGES] = total_pages
+    jobs_table.put_item(Item=item, ConditionExpression=f"attribute_not_exists({JOB_NAME})")
+
+
+def transition_work_status(
+    works_table: Any,
+    jobs_table: Any,
+    job_name: str,
+    work_id: str,
+    from_status: str,
+    to_status: str,
+    update_data: dict[str, Any] | None = None,
+    lease_owner: str | None = None,
+    lease_expired_by: int | None = None,
+) -> None:
+    """Change a work's status and move it between its job's status counters in one transaction.
+
+    The work update is conditional on the work still being in from_status, so concurrent writers cannot
+    double count. Jobs created before summary items existed have no counters; for those only the work is
+    updated, with a plain conditional update once the job is known to have none.
+
+    Args:
+        works_table (Any): DynamoDB works table.
+        jobs_table (Any): DynamoDB jobs table.
+        job_name (str): The job name.
+        work_id (str): The work ID.
+        from_status (str): Status the work is expected to be in.
+        to_status (str): New status for the work.
+        update_data (dict, optional): Additional field-value pairs to set on the work.
+        lease_owner (str, optional): Only change the work if this owner holds its lease.
+        lease_expired_by (int, optional): Only change the work if it has no lease or its lease expired before this
+            epoch time.
+
+    Raises:
+        ClientError: If the work is no longer in from_status, or its lease is held by another owner or still valid.
+    """
+    update_expression, names, values = build_set_expression({WORK_STATUS: to_status} | (update_data or {}))
+    condition_expression = f"#{WORK_STATUS} = :from_status"
+    values = values | {":from_status": from_status}
+    if lease_owner is not None:
+        condition_expression += f" AND #{LEASE_OWNER} = :lease_owner"
+        names = names | {f"#{LEASE_OWNER}": LEASE_OWNER}
+        values = values | {":lease_owner": lease_owner}
+    if lease_expired_by is not None:
+        condition_expression += (
+            f" AND (attribute_not_exists(#{LEASE_EXPIRES_AT}) OR #{LEASE_EXPIRES_AT} < :lease_expired_by)"
+        )
+        names = names | {f"#{LEASE_EXPIRES_AT}": LEASE_EXPIRES_AT}
+        values = values | {":lease_expired_by": lease_expired_by}
+    work_update = {
+        "TableName": works_table.name,
+        "Key": {JOB_NAME: job_name, WORK_ID: work_id},
+        "UpdateExpression": update_expression,
+        "ConditionExpression": condition_expression,
+        "ExpressionAttributeNames": names,
+        "ExpressionAttributeValues": values,
+    }
+    job_key = (jobs_table.name, job_name)
+    if from_status == to_status or job_key in _jobs_without_counters:
+        works_table.update_item(**{k: v for k, v in work_update.items() if k != "TableName"})
+        return
+
+    job_update = {
+        "TableName": jobs_table.name,
+        "Key": {JOB_NAME: job_name},
+        "UpdateExpression": (
+            "SET #counts.#from = if_not_exists(#counts.#from, :zero) - :one, "
+            "#counts.#to = if_not_exists(#counts.#to, :zero) + :one"
+        ),
+        "ConditionExpression": "attribute_exists(#counts)",
+        "ExpressionAttributeNames": {"#counts": WORK_STATUS_COUNTS, "#from": from_status, "#to": to_status},
+        "ExpressionAttributeValues": {":zero": 0, ":one": 1},
+    }
+    for attempt in range(TRANSACTION_CONFLICT_RETRIES + 1):
+        try:
+            # The resource's client accepts native Python types for transactions
+            works_table.meta.client.transact_write_items(
+                TransactItems=[{"Update": work_update}, {"Update": job_update}],
+            )
+            break
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TransactionCanceledException":
+                raise
+            reasons = [reason.get("Code", "None") for reason in e.response.get("CancellationReasons", [])]
+            # Only the job summary's condition failed: a job without counters
+            if reasons == ["None", "ConditionalCheckFailed"]:
+                logger.warning(f"No status counters for job={job_name}, updating its works only")
+                _jobs_without_counters.add(job_key)
+                works_table.update_item(**{k: v for k, v in work_update.items() if k != "TableName"})
+                return
+            if "TransactionConflict" not in reasons or attempt == TRANSACTION_CONFLICT_RETRIES:
+                raise
+            time.sleep(random.uniform(0, 0.05 * 2**attempt))
+    logger.debug(f"Moved job={job_name} work={work_id} from '{from_status}' to '{to_status}'")
+
+
+def is_condition_failure(error: ClientError) -> bool:
+    """Whether an update or transaction failed only because a condition no longer held."""
+    error_code = error.response["Error"]["Code"]
+    if error_code == "ConditionalCheckFailedException":
+        return True
+    if error_code == "TransactionCanceledException":
+        reasons = [reason.get("Code", "None") for reason in error.response.get("CancellationReasons", [])]
+        return "ConditionalCheckFailed" in reasons and set(reasons) <= {"None", "ConditionalCheckFailed"}
+    return False
+
+
+def acquire_work_lease(
+    works_table: Any,
+    jobs_table: Any,
+    job_name: str,
+    work_id: str,
+    owner_id: str,
+    lease_seconds: int,
+    queued_status: str,
+    leased_status: str,
+) -> bool:
+    """Claim a work for processing with a lease that expires if its owner stops.
+
+    A queued work moves to leased_status. A work already in leased_status is only taken over once its
+    lease has expired, which is how work left behind by a stopped worker is detected; works leased
+    before leases existed have no expiry and count as expired. Its own owner may claim it again at any
+    time, as an owner processes one work at a time and so has stopped processing a work it receives
+    again, for instance after failing to put it back in the queue.
+
+    Args:
+        works_table (Any): DynamoDB works table.
+        jobs_table (Any): DynamoDB jobs table.
+        job_name (str): The job name.
+        work_id (str): The work ID.
+        owner_id (str): Identifier of the claiming worker.
+        lease_seconds (int): Seconds until the lease may be taken over.
+        queued_status (str): Status of a work waiting to be processed.
+        leased_status (str): Status of a work being processed.
+
+    Returns:
+        bool: True if the work was claimed, False if it is leased by another owner or no longer queued.
+    """
+    now = int(time.time())
+    lease_data = {LEASE_OWNER: owner_id, LEASE_EXPIRES_AT: now + lease_seconds}
+    try:
+        transition_work_status(
+            works_table=works_table,
+            jobs_table=jobs_table,
+            job_name=job_name,
+            work_id=work_id,
+            from_status=queued_status,
+            to_status=leased_status,
+            update_data=lease_data,
+        )
+        return True
+    except ClientError as e:
+        if not is_condition_failure(e):
+            raise
+
+    # Not queued: take over the work only if it is being processed under an expired lease, or our own
+    update_expression, names, values = build_set_expression(lease_data)
+    try:
+        response = works_table.update_item(
+            Key={JOB_NAME: job_name, WORK_ID: work_id},
+            UpdateExpression=update_expression,
+            ConditionExpression=(
+                f"#{WORK_STATUS} = :leased_status AND "
+                f"(attribute_not_exists(#{LEASE_EXPIRES_AT}) OR #{LEASE_EXPIRES_AT} < :now "
+                f"OR #{LEASE_OWNER} = :{LEASE_OWNER})"
+            ),
+            ExpressionAttributeNames=names | {f"#{WORK_STATUS}": WORK_STATUS},
+            ExpressionAttributeValues=values | {":leased_status": leased_status, ":now": now},
+            ReturnValues="ALL_OLD",
+        )
+    except ClientError as e:
+        if is_condition_failure(e):
+            return False
+        raise
+    if response.get("Attributes", {}).get(LEASE_OWNER) == owner_id:
+        logger.info(f"Claimed our own lease on job={job_name} work={work_id} again")
+    else:
+        logger.warning(f"Took over expired lease on job={job_name} work={work_id}")
+    return True
+
+
+def renew_work_lease(
+    works_table: Any,
+    job_name: str,
+    work_id: str,
+    owner_id: str,
+    lease_seconds: int,
+    leased_status: str,
+) -> bool:
+    """Extend a lease held on a work being processed, so that a long work is not taken over while it runs.
+
+    Args:
+        works_table (Any): DynamoDB works table.
+        job_name (str): The job name.
+        work_id (str): The work ID.
+        owner_id (str): Identifier of the worker holding the lease.
+        lease_seconds (int): Seconds from now until the lease may be taken over.
+        leased_status (str): Status of a work being processed.
+
+    Returns:
+        bool: True if the lease was extended, False if the work is no longer leased by owner_id.
+    """
+    try:
+        works_table.update_item(
+            Key={JOB_NAME: job_name, WORK_ID: work_id},
+            UpdateExpression=f"SET #{LEASE_EXPIRES_AT} = :expires_at",
+            ConditionExpression=f"#{WORK_STATUS} = :leased_status AND #{LEASE_OWNER} = :owner",
+            ExpressionAttributeNames={
+                f"#{LEASE_EXPIRES_AT}": LEASE_EXPIRES_AT,
+                f"#{WORK_STATUS}": WORK_STATUS,
+                f"#{LEASE_OWNER}": LEASE_OWNER,
+            },
+            ExpressionAttributeValues={
+                ":expires_at": int(time.time()) + lease_seconds,
+                ":leased_status": leased_status,
+                ":owner": owner_id,
+            },
+        )
+    except ClientError as e:
+        if is_condition_failure(e):
+            return False
+        raise
+    return True
+
+
+def record_page_count(
+    works_table: Any,
+    jobs_table: Any,
+    job_name: str,
+    work_id: str,
+    page_count: int,
+    submitted_page_count: int,
+) -> bool:
+    """Record a work's page count once its documents are expanded, correcting its job's total pages.
+
+    Jobs count one page per submitted image, but a multi-page document holds more. The work keeps its page
+    count, so that the correction is applied once in the same transaction however often the work is retried.
+
+    Args:
+        works_table (Any): DynamoDB works table.
+        jobs_table (Any): DynamoDB jobs table.
+        job_name (str): The job name.
+        work_id (str): The work ID.
+        page_count (int): Number of pages after expansion.
+        submitted_page_count (int): Number of images the work was submitted with.
+
+    Returns:
+        bool: True if the job's total was corrected, False if it was already, or the job has no total.
+    """
+    work_update = {
+        "TableName": works_table.name,
+        "Key": {JOB_NAME: job_name, WORK_ID: work_id},
+        "UpdateExpression": "SET #page_count = :page_count",
+        "ConditionExpression": "attribute_not_exists(#page_count)",
+        "ExpressionAttributeNames": {"#page_count": PAGE_COUNT},
+        "ExpressionAttributeValues": {":page_count": page_count},
+    }
+    job_update = {
+        "TableName": jobs_table.name,
+        "Key": {JOB_NAME: job_name},
+        "UpdateExpression": "ADD #total_pages :added_pages",
+        "ConditionExpression": "attribute_exists(#total_pages)",
+        "ExpressionAttributeNames": {"#total_pages": TOTAL_PAGES},
+        "ExpressionAttributeValues": {":added_pages": page_count - submitted_page_count},
+    }
+    for attempt in range(TRANSACTION_CONFLICT_RETRIES + 1):
+        try:
+            works_table.meta.client.transact_write_items(
+                TransactItems=[{"Update": work_update}, {"Update": job_update}],
+            )
+            return True
+        except ClientError as e:
+            if is_condition_failure(e):
+                return False
+            reasons = [reason.get("Code", "None") for reason in e.response.get("CancellationReasons", [])]
+            if "TransactionConflict" not in reasons or attempt == TRANSACTION_CONFLICT_RETRIES:
+                raise
+            time.sleep(random.uniform(0, 0.05 * 2**attempt))
+    return False
+
+
+def add_job_usage(
+    jobs_table: Any,
+    job_name: str,
+    usage_by_model: dict[str, dict[str, int]],
+    totals: dict[str, int] | None = None,
+) -> None:
+    """Atomically add a work's token usage per model and other counters, such as its pages, to its job's totals.
+
+    The counters of a model are created on its first use in a job. Jobs created before summary items existed
+    have no totals; for those nothing is recorded.
+
+    Args:
+        jobs_table (Any): DynamoDB jobs table.
+        job_name (str): The job name.
+        usage_by_model (dict): Counters per model to add, as returned by WorkUsage.totals.
+        totals (dict[str, int], optional): Top-level counters to add, such as PAGES_PROCESSED and PROCESSING_MS.
+    """
+    totals = {total: count for total, count in (totals or {}).items() if count}
+    if not usage_by_model and not totals:
+        return
+    names = {"#usage": USAGE} | {f"#t{index}": total for index, total in enumerate(totals)}
+    values = {f":t{index}": count for index, count in enumerate(totals.values())}
+    set_parts = []
+    model_exists = []
+    for model_index, (model_id, counters) in enumerate(usage_by_model.items()):
+        names[f"#m{model_index}"] = model_id
+        values[":zero"] = 0
+        model_exists.append(f"attribute_exists(#usage.#m{model_index})")
+        for counter_index, (counter, count) in enumerate(counters.items()):
+            path = f"#usage.#m{model_index}.#c{model_index}_{counter_index}"
+            names[f"#c{model_index}_{counter_index}"] = counter
+            values[f":c{model_index}_{counter_index}"] = count
+            set_parts.append(f"{path} = if_not_exists({path}, :zero) + :c{model_index}_{counter_index}")
+    add_parts = [f"#t{index} :t{index}" for index in range(len(totals))]
+    update_expression = " ".join(
+        ([f"SET {', '.join(set_parts)}"] if set_parts else []) + ([f"ADD {', '.join(add_parts)}"] if add_parts else [])
+    )
+
+    for attempt in range(2):
+        try:
+            jobs_table.update_item(
+                Key={JOB_NAME: job_name},
+                UpdateExpression=update_expression,
+                ConditionExpression=" AND ".join(["attribute_exists(#usage)"] + model_exists),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+            )
+            return
+        except ClientError as e:
+            if not is_condition_failure(e) or attempt == 1:
+                raise
+
+        # Create the missing totals, which concurrent writers may be doing too, then add again
+        try:
+            jobs_table.update_item(
+                Key={JOB_NAME: job_name},
+                UpdateExpression="SET #usage = if_not_exists(#usage, :empty)",
+                ConditionExpression="attribute_exists(#counts) OR attribute_exists(#usage)",
+                ExpressionAttributeNames={"#usage": USAGE, "#counts": WORK_STATUS_COUNTS},
+                ExpressionAttributeValues={":empty": {}},
+            )
+        except ClientError as e:
+            if not is_condition_failure(e):
+                raise
+            logger.warning(f"No summary for job={job_name}, not recording its usage")
+            return
+        if model_exists:
+            model_names = {name: model_id for name, model_id in names.items() if name.startswith("#m")}
+            jobs_table.update_item(
+                Key={JOB_NAME: job_name},
+                UpdateExpression="SET "
+                + ", ".join(f"#usage.{name} = if_not_exists(#usage.{name}, :empty)" for name in model_names),
+                ExpressionAttributeNames={"#usage": USAGE} | model_names,
+                ExpressionAttributeValues={":empty": {}},
+            )
+
+
+def get_job_summary(jobs_table: Any, job_name: str) -> dict[str, Any] | None:
+    """Get a job's summary item, or None if the job has none."""
+    item: dict[str, Any] | None = jobs_table.get_item(Key={JOB_NAME: job_name}).get("Item")
+    return item
+
+
+def query_works_by_status(
+    works_table: Any,
+    job_name: str,
+    work_status: str,
+    limit: int | None = None,
+    exclusive_start_key: dict[str, Any] | None = None,
+    index_name: str = WORKS_STATUS_INDEX_NAME,
+) -> tuple[list[dict[str, Any]], dict[str, Any] | None]:
+    """Query one page of the keys of a job's works with a status from the status index.
+
+    Args:
+        works_table (Any): DynamoDB works table.
+        job_name (str): The job name.
+        work_status (str): Status to list.
+        limit (int, optional): Maximum number of items in the page.
+        exclusive_start_key (dict, optional): LastEvaluatedKey of the previous page.
+        index_name (str): Name of the (job_name, work_status) index.
+
+    Returns:
+        tuple: Items holding job_name and work_id, and the LastEvaluatedKey (None on the last page).
+    """
+    query_kwargs: dict[str, Any] = {
+        "IndexName": index_name,
+        "KeyConditionExpression": Key(JOB_NAME).eq(job_name) & Key(WORK_STATUS).eq(work_status),
+    }
+    if limit:
+        query_kwargs["Limit"] = limit
+    if exclusive_start_key:
+        query_kwargs["ExclusiveStartKey"] = exclusive_start_key
+    response = works_table.query(**query_kwargs)
+    return response.get("Items", []), response.get("LastEvaluatedKey")
+
+
+def iter_job_names_with_status(jobs_table: Any, work_status: str) -> Iterator[str]:
+    """Iterate over the names of the jobs whose status counters hold works with a status.
+
+    Only jobs with a summary item are found; jobs created before summary items existed must be named or scanned.
+    """
+    scan_kwargs: dict[str, Any] = {
+        "ProjectionExpression": "#job_name, #counts.#status",
+        "ExpressionAttributeNames": {"#job_name": JOB_NAME, "#counts": WORK_STATUS_COUNTS, "#status": work_status},
+    }
+    while True:
+        response = jobs_table.scan(**scan_kwargs)
+        for item in response.get("Items", []):
+            if int(item.get(WORK_STATUS_COUNTS, {}).get(work_status, 0)) > 0:
+                yield item[JOB_NAME]
+        if "LastEvaluatedKey" not in response:
+            break
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def iter_works_by_status(
+    works_table: Any,
+    work_status: str,
+    job_name: str | None = None,
+    jobs_table: Any = None,
+    index_name: str = WORKS_STATUS_INDEX_NAME,
+) -> Iterator[dict[str, Any]]:
+    """Iterate over the keys of every work with a status, page by page.
+
+    Args:
+        works_table (Any): DynamoDB works table.
+        work_status (str): Status to list.
+        job_name (str, optional): Restrict to a single job.
+        jobs_table (Any, optional): DynamoDB jobs table, whose status counters tell which jobs to list when no
+            job_name is given.
+        index_name (str): Name of the (job_name, work_status) index.
+    """
+    if job_name:
+        job_names: Iterator[str] = iter([job_name])
+    elif jobs_table is not None:
+        job_names = iter_job_names_with_status(jobs_table, work_status)
+    else:
+        raise ValueError("Either job_name or jobs_table is required to list works by status")
+
+    for name in job_names:
+        last_evaluated_key = None
+        while True:
+            items, last_evaluated_key = query_works_by_status(
+                works_table=works_table,
+                job_name=name,
+                work_status=work_status,
+                exclusive_start_key=last_evaluated_key,
+                index_name=index_name,
+            )
+            yield from items
+            if not last_evaluated_key:
+                break
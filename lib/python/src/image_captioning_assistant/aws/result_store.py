@@ -0,0 +1,109 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""Store work results in DynamoDB, offloading the largest fields to S3 when an item grows too large."""
+
+import gzip
+import json
+import logging
+import uuid
+from typing import Any
+
+from cloudpathlib import S3Path
+
+from image_captioning_assistant.aws.s3 import load_to_bytes, upload_bytes
+
+logger = logging.getLogger(__name__)
+
+RESULTS_PREFIX = "results"
+RESULT_S3_URI = "result_s3_uri"
+OFFLOADED_FIELDS = "offloaded_fields"
+# DynamoDB items are limited to 400 KB, which must also hold the work's inputs and reviewer edits
+DEFAULT_OFFLOAD_THRESHOLD_BYTES = 100_000
+
+
+def serialized_size(value: Any) -> int:
+    """Approximate the stored size of a value by its JSON encoding."""
+    return len(json.dumps(value, default=str).encode("utf-8"))
+
+
+def result_s3_uri(bucket: str, job_name: str, work_id: str, attempt_id: str) -> str:
+    """Return the S3 URI of the result one attempt at a work offloaded."""
+    return f"s3://{bucket}/{RESULTS_PREFIX}/{job_name}/{work_id}/{attempt_id}.json.gz"
+
+
+def prepare_result(
+    result: dict[str, Any],
+    bucket: str,
+    job_name: str,
+    work_id: str,
+    s3_kwargs: dict[str, Any],
+    threshold_bytes: int = DEFAULT_OFFLOAD_THRESHOLD_BYTES,
+) -> dict[str, Any]:
+    """Return the fields to write on the work item, offloading the largest fields to S3 above a threshold.
+
+    Fields are offloaded largest first, which for long works are the per-page transcriptions and biases,
+    until the remaining fields fit under the threshold. Those fields are written to S3 as gzip-compressed
+    JSON, and the item keeps a pointer to it along with the names of the offloaded fields. Each call writes
+    under its own key, so an attempt that lost its lease cannot overwrite the result another attempt saved.
+
+    Args:
+        result (dict[str, Any]): Top-level result fields of the work.
+        bucket (str): S3 bucket for offloaded results.
+        job_name (str): The job name.
+        work_id (str): The work ID.
+        s3_kwargs (dict[str, Any]): S3 client configuration.
+        threshold_bytes (int): Largest serialized size kept entirely in DynamoDB.
+
+    Returns:
+        dict[str, Any]: Fields to set on the work item.
+    """
+    field_sizes = {field: serialized_size(value) for field, value in result.items()}
+    remaining_size = sum(field_sizes.values())
+    if remaining_size <= threshold_bytes:
+        return result
+
+    offloaded: dict[str, Any] = {}
+    for field in sorted(field_sizes, key=lambda field: field_sizes[field], reverse=True):
+        if remaining_size <= threshold_bytes:
+            break
+        offloaded[field] = result[field]
+        remaining_size -= field_sizes[field]
+
+    s3_uri = result_s3_uri(bucket, job_name, work_id, uuid.uuid4().hex)
+    s3_path = S3Path(s3_uri)
+    body = gzip.compress(json.dumps(offloaded, default=str).encode("utf-8"))
+    upload_bytes(
+        s3_bucket=s3_path.bucket,
+        s3_key=s3_path.key,
+        body=body,
+        s3_client_kwargs=s3_kwargs,
+        content_type="application/gzip",
+    )
+    logger.info(f"Offloaded {list(offloaded)} of work={work_id} to {s3_uri} ({len(body)} bytes compressed)")
+
+    inline = {field: value for field, value in result.items() if field not in offloaded}
+    return inline | {RESULT_S3_URI: s3_uri, OFFLOADED_FIELDS: list(offloaded)}
+
+
+def load_offloaded_fields(item: dict[str, Any], s3_kwargs: dict[str, Any]) -> dict[str, Any]:
+    """Load the fields a work item offloaded to S3, or nothing if it has no offloaded result."""
+    s3_uri = item.get(RESULT_S3_URI)
+    if not s3_uri:
+        return {}
+    s3_path = S3Path(s3_uri)
+    body = load_to_bytes(s3_bucket=s3_path.bucket, s3_key=s3_path.key, s3_client_kwargs=s3_kwargs)
+    offloaded: dict[str, Any] = json.loads(gzip.decompress(body))
+    return offloaded
+
+
+def rehydrate_result(item: dict[str, Any], s3_kwargs: dict[str, Any]) -> dict[str, Any]:
+    """Return a work item with its offloaded fields restored.
+
+    Fields set on the item itself, such as reviewer edits made after offloading, take precedence.
+    """
+    offloaded = load_offloaded_fields(item, s3_kwargs)
+    rehydrated = offloaded | item
+    rehydrated.pop(RESULT_S3_URI, None)
+    rehydrated.pop(OFFLOADED_FIELDS, None)
+    return rehydrated
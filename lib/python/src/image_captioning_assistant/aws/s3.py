@@ -4,13 +4,21 @@
 """S3 helper functions."""
 
 import logging
-from typing import Any
+import tempfile
+from contextlib import closing, contextmanager
+from typing import Any, IO, Iterator
 
 import boto3
 from botocore.exceptions import ClientError
 
 logger = logging.getLogger(__name__)
 
+# Enough for the headers of common image formats, including JPEGs with EXIF data
+DEFAULT_HEADER_BYTES = 64 * 1024
+# Objects up to this size are streamed into memory, larger ones to a temporary file on disk
+DEFAULT_SPOOL_BYTES = 16 * 1024 * 1024
+STREAM_CHUNK_BYTES = 1024 * 1024
+
 
 def list_contents_of_folder(
     bucket: str,
@@ -39,24 +47,118 @@ def list_contents_of_folder(
     return [obj["Key"] for obj in response["Contents"]]
 
 
+class ObjectTooLargeError(ValueError):
+    """Raised when an S3 object is larger than the caller allows."""
+
+
+def check_object_size(s3_bucket: str, s3_key: str, size: int, max_bytes: int | None) -> None:
+    """Raise ObjectTooLargeError if an object's size is over max_bytes."""
+    if max_bytes is not None and size > max_bytes:
+        msg = f"s3://{s3_bucket}/{s3_key} is {size} bytes, over the limit of {max_bytes}"
+        logger.warning(msg)
+        raise ObjectTooLargeError(msg)
+
+
 def load_to_bytes(
     s3_bucket: str,
     s3_key: str,
     s3_client_kwargs: dict[str, Any],
+    max_bytes: int | None = None,
 ) -> bytes:
-    """Load bytes directly into memory."""
+    """Load bytes directly into memory, refusing objects larger than max_bytes if set."""
     try:
         s3_client = boto3.client("s3", **s3_client_kwargs)
-        file_bytes = s3_client.get_object(
+        response = s3_client.get_object(
             Bucket=s3_bucket,
             Key=s3_key,
-        )["Body"].read()
-        return file_bytes
+        )
+        with closing(response["Body"]) as body:
+            check_object_size(s3_bucket, s3_key, response["ContentLength"], max_bytes)
+            file_bytes: bytes = body.read()
+            return file_bytes
     except Exception as exc:
         logger.warning(f"Failed to load {s3_key} from {s3_bucket}")
         raise exc
 
 
+def read_s3_object_header(
+    s3_bucket: str,
+    s3_key: str,
+    s3_client_kwargs: dict[str, Any],
+    header_bytes: int = DEFAULT_HEADER_BYTES,
+) -> bytes:
+    """Read only the first bytes of an object with a ranged GET, such as to sniff an image's format and size.
+
+    Args:
+        s3_bucket (str): Name of S3 bucket.
+        s3_key (str): Object key.
+        s3_client_kwargs (dict[str, Any]): S3 client configuration.
+        header_bytes (int): Number of bytes to read from the start of the object.
+
+    Returns:
+        bytes: The first header_bytes of the object, or the whole object if it is shorter.
+    """
+    try:
+        s3_client = boto3.client("s3", **s3_client_kwargs)
+        response = s3_client.get_object(Bucket=s3_bucket, Key=s3_key, Range=f"bytes=0-{header_bytes - 1}")
+        with closing(response["Body"]) as body:
+            header: bytes = body.read()
+            return header
+    except Exception as exc:
+        logger.warning(f"Failed to read the header of {s3_key} from {s3_bucket}")
+        raise exc
+
+
+@contextmanager
+def open_s3_object(
+    s3_bucket: str,
+    s3_key: str,
+    s3_client_kwargs: dict[str, Any],
+    max_bytes: int | None = None,
+    spool_bytes: int = DEFAULT_SPOOL_BYTES,
+) -> Iterator[IO[bytes]]:
+    """Stream an object into a temporary file, kept in memory while small and on disk beyond spool_bytes.
+
+    Readers such as Pillow decode from the file, so large objects are not held in memory alongside what is
+    decoded from them. The file is closed, and removed from disk, when the context exits.
+
+    Args:
+        s3_bucket (str): Name of S3 bucket.
+        s3_key (str): Object key.
+        s3_client_kwargs (dict[str, Any]): S3 client configuration.
+        max_bytes (int, optional): Largest object accepted, checked before downloading anything.
+        spool_bytes (int): Size above which the object is written to disk rather than kept in memory.
+
+    Yields:
+        IO[bytes]: The object's content, positioned at its start.
+
+    Raises:
+        ObjectTooLargeError: If the object is larger than max_bytes.
+    """
+    try:
+        s3_client = boto3.client("s3", **s3_client_kwargs)
+        response = s3_client.get_object(Bucket=s3_bucket, Key=s3_key)
+    except Exception as exc:
+        logger.warning(f"Failed to load {s3_key} from {s3_bucket}")
+        raise exc
+
+    spooled_file = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+    try:
+        # Close the body however the download ends, rather than leaving its connection half read
+        with closing(response["Body"]) as body:
+            check_object_size(s3_bucket, s3_key, response["ContentLength"], max_bytes)
+            size = 0
+            for chunk in body.iter_chunks(chunk_size=STREAM_CHUNK_BYTES):
+                size += len(chunk)
+                # The body may be longer than declared, as when the object is replaced while being read
+                check_object_size(s3_bucket, s3_key, size, max_bytes)
+                spooled_file.write(chunk)
+        spooled_file.seek(0)
+        yield spooled_file
+    finally:
+        spooled_file.close()
+
+
 def load_to_str(
     s3_bucket: str,
     s3_key: str,
@@ -72,6 +174,23 @@ def load_to_str(
     return file_bytes.decode(encoding)
 
 
+def upload_bytes(
+    s3_bucket: str,
+    s3_key: str,
+    body: bytes,
+    s3_client_kwargs: dict[str, Any],
+    content_type: str | None = None,
+) -> None:
+    """Upload bytes from memory to S3."""
+    extra_args = {"ContentType": content_type} if content_type else {}
+    try:
+        s3_client = boto3.client("s3", **s3_client_kwargs)
+        s3_client.put_object(Bucket=s3_bucket, Key=s3_key, Body=body, **extra_args)
+    except Exception as exc:
+        logger.warning(f"Failed to upload {s3_key} to {s3_bucket}")
+        raise exc
+
+
 def copy_s3_object(source_bucket: str, source_key: str, dest_bucket: str, dest_key: str) -> bool:
     """Copy an object from one S3 location to another."""
     s3_client = boto3.client("s3")
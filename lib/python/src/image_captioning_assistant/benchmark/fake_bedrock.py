@@ -0,0 +1,135 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""A stand-in for the Bedrock runtime client that answers Converse calls with valid outputs, offline."""
+
+import random
+import threading
+import time
+from typing import Any
+
+from botocore.exceptions import ClientError
+
+import image_captioning_assistant.generate.prompts as p
+from image_captioning_assistant.data.constants import LibraryFormat
+from image_captioning_assistant.data.data_classes import (
+    Biases,
+    ExplainedValue,
+    Metadata,
+    PageTranscription,
+    Transcription,
+    WorkBiasAnalysis,
+)
+
+# Rough token counts, enough to exercise usage accounting
+TOKENS_PER_IMAGE = 1600
+CHARACTERS_PER_TOKEN = 4
+
+
+def fake_metadata(image_count: int) -> Metadata:
+    """A valid metadata result for a work with the given number of images."""
+    return Metadata(
+        description=ExplainedValue(value="A photograph of a street scene.", explanation="Fake output."),
+        transcription=Transcription(
+            transcriptions=[
+                PageTranscription(printed_text=["Main Street"], handwriting=[]) for _ in range(image_count)
+            ],
+            model_notes="Fake output.",
+        ),
+        date=ExplainedValue(value="circa 1950", explanation="Fake output."),
+        location=ExplainedValue(value=["Atlanta, Georgia"], explanation="Fake output."),
+        publication_info=ExplainedValue(value="", explanation="Fake output."),
+        contextual_info=ExplainedValue(value="", explanation="Fake output."),
+        format=ExplainedValue(value=LibraryFormat.still_image, explanation="Fake output."),
+        genre=ExplainedValue(value=["Photographs"], explanation="Fake output."),
+        objects=ExplainedValue(value=["street", "car"], explanation="Fake output."),
+        actions=ExplainedValue(value=["walking"], explanation="Fake output."),
+        people=ExplainedValue(value=["pedestrian"], explanation="Fake output."),
+        topics=ExplainedValue(value=["city life"], explanation="Fake output."),
+    )
+
+
+def fake_bias_analysis(image_count: int) -> WorkBiasAnalysis:
+    """A valid bias analysis result, without biases, for a work with the given number of images."""
+    return WorkBiasAnalysis(metadata_biases=Biases(biases=[]), page_biases=[Biases(biases=[])] * image_count)
+
+
+class FakeBedrockRuntime:
+    """Answer Converse calls like the Bedrock runtime client, with simulated latency, throttling and malformed output.
+
+    Bias analysis requests get a bias analysis with one entry per image, and other requests get metadata, both
+    wrapped in the chain-of-thought tags the parsers expect.
+    """
+
+    def __init__(
+        self,
+        latency_seconds: float = 2.0,
+        seconds_per_image: float = 0.5,
+        latency_jitter: float = 0.25,
+        throttle_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        """Initialize the fake client.
+
+        Args:
+            latency_seconds (float): Base latency of a call.
+            seconds_per_image (float): Latency added per image in the request.
+            latency_jitter (float): Relative spread of the latency, drawn uniformly within plus or minus this fraction.
+            throttle_rate (float): Probability that a call fails with a ThrottlingException.
+            malformed_rate (float): Probability that a call returns output that does not parse.
+            seed (int, optional): Seed for reproducible faults and latencies.
+        """
+        self.latency_seconds = latency_seconds
+        self.seconds_per_image = seconds_per_image
+        self.latency_jitter = latency_jitter
+        self.throttle_rate = throttle_rate
+        self.malformed_rate = malformed_rate
+        self.calls = 0
+        self.throttled = 0
+        self.malformed = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def converse(self, modelId: str, messages: list[dict[str, Any]], **kwargs: Any) -> dict[str, Any]:
+        """Answer a Converse request."""
+        started = time.perf_counter()
+        blocks = [block for message in messages if message["role"] == "user" for block in message["content"]]
+        image_count = sum(1 for block in blocks if "image" in block)
+        request_text = " ".join(block["text"] for block in blocks if "text" in block)
+        with self._lock:
+            self.calls += 1
+            throttled = self._random.random() < self.throttle_rate
+            malformed = not throttled and self._random.random() < self.malformed_rate
+            jitter = self._random.uniform(-self.latency_jitter, self.latency_jitter)
+            self.throttled += throttled
+            self.malformed += malformed
+        if throttled:
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, "Converse")
+
+        time.sleep(max(0.0, (self.latency_seconds + self.seconds_per_image * image_count) * (1 + jitter)))
+        if "page_biases" in request_text:
+            result_json = fake_bias_analysis(image_count).model_dump_json()
+        else:
+            result_json = fake_metadata(image_count).model_dump_json()
+        if malformed:
+            # Cut off mid-object, as when the model runs out of output tokens
+            result_json = result_json[: len(result_json) // 2]
+        output_text = f"{p.COT_TAG}Fake analysis of {image_count} images.{p.COT_TAG_END}\n{result_json}"
+        input_tokens = len(request_text) // CHARACTERS_PER_TOKEN + TOKENS_PER_IMAGE * image_count
+        output_tokens = len(output_text) // CHARACTERS_PER_TOKEN
+        return {
+            "output": {"message": {"role": "assistant", "content": [{"text": output_text}]}},
+            "stopReason": "max_tokens" if malformed else "end_turn",
+            "usage": {
+                "inputTokens": input_tokens,
+                "outputTokens": output_tokens,
+                "totalTokens": input_tokens + output_tokens,
+            },
+            "metrics": {"latencyMs": round((time.perf_counter() - started) * 1000)},
+        }
+
+    def stats(self) -> dict[str, int]:
+        """Counts of calls, throttled calls and malformed outputs so far."""
+        with self._lock:
+            return {"calls": self.calls, "throttled": self.throttled, "malformed": self.malformed}
@@ -0,0 +1,408 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""Offline end-to-end load test of the worker, measuring throughput, latency and retries.
+
+A local moto server stands in for S3, DynamoDB and SQS, and FakeBedrockRuntime for Bedrock. For each scenario
+the harness uploads generated images, creates a job with the real create_job Lambda handler and runs the real
+worker's process_sqs_messages in one process per unit of concurrency, until every work is ready for review
+or has failed.
+
+Requires moto with its server extra (`pip install "moto[server]"`). For example:
+
+    python -m image_captioning_assistant.benchmark.load_test --works 40 --concurrency 1 4 8 --pages 1 4
+"""
+
+import argparse
+import importlib.util
+import io
+import json
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.config import Config
+from PIL import Image
+
+from image_captioning_assistant.benchmark.fake_bedrock import FakeBedrockRuntime
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parents[5]
+DEFAULT_WORKER_PATH = REPO_ROOT / "projects/infra/modules/ecs/src/main.py"
+DEFAULT_CREATE_JOB_PATH = REPO_ROOT / "projects/infra/modules/lambda/src/functions/create_job/index.py"
+REGION = "us-east-1"
+BUCKET_NAME = "load-test-uploads"
+WORKS_TABLE_NAME = "load-test-works"
+JOBS_TABLE_NAME = "load-test-jobs"
+QUEUE_NAME = "load-test-works"
+WORKS_STATUS_INDEX_NAME = "job_name-work_status-index"
+READY_FOR_REVIEW = "READY FOR REVIEW"
+FAILED_TO_PROCESS = "FAILED TO PROCESS"
+WORKER_STOP_SECONDS = 30
+
+
+def percentile(values: list[float], quantile: float) -> float | None:
+    """Nearest-rank percentile of values, or None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(quantile * len(ordered)) - 1))]
+
+
+def find_free_port() -> int:
+    """Find a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def load_module(path: Path, name: str) -> ModuleType:
+    """Import a module from a file path, such as the worker or a Lambda handler."""
+    spec = importlib.util.spec_from_file_location(name, path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Cannot import {name} from {path}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def generate_image(width: int, height: int, seed: int) -> bytes:
+    """Generate a noisy JPEG, which compresses about as poorly as a scan."""
+    image = Image.frombytes("RGB", (width, height), random.Random(seed).randbytes(width * height * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def create_resources(max_receive_count: int) -> str:
+    """Create the bucket, tables and queues, returning the work queue URL."""
+    boto3.client("s3", region_name=REGION).create_bucket(Bucket=BUCKET_NAME)
+    dynamodb = boto3.client("dynamodb", region_name=REGION)
+    dynamodb.create_table(
+        TableName=WORKS_TABLE_NAME,
+        KeySchema=[{"AttributeName": "job_name", "KeyType": "HASH"}, {"AttributeName": "work_id", "KeyType": "RANGE"}],
+        AttributeDefinitions=[
+            {"AttributeName": "job_name", "AttributeType": "S"},
+            {"AttributeName": "work_id", "AttributeType": "S"},
+            {"AttributeName": "work_status", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": WORKS_STATUS_INDEX_NAME,
+                "KeySchema": [
+                    {"AttributeName": "job_name", "KeyType": "HASH"},
+                    {"AttributeName": "work_status", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "KEYS_ONLY"},
+            }
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    dynamodb.create_table(
+        TableName=JOBS_TABLE_NAME,
+        KeySchema=[{"AttributeName": "job_name", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "job_name", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    sqs = boto3.client("sqs", region_name=REGION)
+    dlq_url = sqs.create_queue(QueueName=f"{QUEUE_NAME}-dlq")["QueueUrl"]
+    dlq_arn = sqs.get_queue_attributes(QueueUrl=dlq_url, AttributeNames=["QueueArn"])["Attributes"]["QueueArn"]
+    redrive_policy = json.dumps({"deadLetterTargetArn": dlq_arn, "maxReceiveCount": str(max_receive_count)})
+    queue_url: str = sqs.create_queue(QueueName=QUEUE_NAME, Attributes={"RedrivePolicy": redrive_policy})["QueueUrl"]
+    return queue_url
+
+
+def upload_works(job_name: str, work_count: int, pages: int, image_bytes: bytes) -> list[dict[str, Any]]:
+    """Upload the images of a job's works, returning the works of the create-job request."""
+    s3 = boto3.client("s3", region_name=REGION)
+    works = []
+    for work_index in range(work_count):
+        work_id = f"work-{work_index:05d}"
+        image_s3_uris = []
+        for page in range(1, pages + 1):
+            key = f"{job_name}/{work_id}/page-{page:03d}.jpg"
+            s3.put_object(Bucket=BUCKET_NAME, Key=key, Body=image_bytes)
+            image_s3_uris.append(f"s3://{BUCKET_NAME}/{key}")
+        works.append({"work_id": work_id, "image_s3_uris": image_s3_uris})
+    return works
+
+
+def run_worker(worker_path: str, bedrock_kwargs: dict[str, Any], ready: Any) -> None:
+    """Run the real worker against the local stand-ins until terminated; the target of each worker process."""
+    fake_bedrock = FakeBedrockRuntime(**bedrock_kwargs)
+    real_client = boto3.client
+
+    def client(service_name: str, *args: Any, **kwargs: Any) -> Any:
+        if service_name == "bedrock-runtime":
+            return fake_bedrock
+        return real_client(service_name, *args, **kwargs)
+
+    boto3.client = client
+    # Any rather than ModuleType, as the worker's clients are replaced below
+    worker: Any = load_module(Path(worker_path), "load_test_worker")
+    logging.getLogger().setLevel(logging.WARNING)
+    # Virtual-hosted S3 addressing does not resolve against a local endpoint
+    path_style = worker.S3_CONFIG.merge(Config(s3={"addressing_style": "path"}))
+    worker.S3_KWARGS["config"] = path_style
+    worker.s3 = real_client("s3", config=path_style, region_name=worker.AWS_REGION)
+    signal.signal(signal.SIGTERM, worker.handle_sigterm)
+    worker.ensure_rollup(worker.jobs_table)
+    ready.set()
+    try:
+        worker.process_sqs_messages()
+    except worker.WorkerShutdown:
+        pass
+
+
+def wait_for_job(job_name: str, total_works: int, timeout_seconds: float) -> dict[str, int]:
+    """Wait until every work of a job is ready for review or failed, returning its status counts."""
+    jobs_table = boto3.resource("dynamodb", region_name=REGION).Table(JOBS_TABLE_NAME)
+    deadline = time.monotonic() + timeout_seconds
+    while True:
+        summary = jobs_table.get_item(Key={"job_name": job_name})["Item"]
+        counts = {status: int(count) for status, count in summary["work_status_counts"].items()}
+        if counts.get(READY_FOR_REVIEW, 0) + counts.get(FAILED_TO_PROCESS, 0) >= total_works:
+            return counts
+        if time.monotonic() > deadline:
+            logger.warning(f"Timed out waiting for job={job_name}: {counts}")
+            return counts
+        time.sleep(0.5)
+
+
+def collect_work_results(job_name: str) -> dict[str, Any]:
+    """Collect per-work latency, memory and retry statistics of a job from the works table and its summary."""
+    dynamodb = boto3.resource("dynamodb", region_name=REGION)
+    works_table = dynamodb.Table(WORKS_TABLE_NAME)
+    items = []
+    query_kwargs = {"KeyConditionExpression": Key("job_name").eq(job_name)}
+    while True:
+        response = works_table.query(**query_kwargs)
+        items.extend(response["Items"])
+        if "LastEvaluatedKey" not in response:
+            break
+        query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    latencies_ms = [
+        float(item["latency_breakdown"]["total_ms"])
+        for item in items
+        if item["work_status"] == READY_FOR_REVIEW and "latency_breakdown" in item
+    ]
+    peak_rss_kib = [float(item["memory"]["process_peak_rss_kib"]) for item in items if "memory" in item]
+    summary = dynamodb.Table(JOBS_TABLE_NAME).get_item(Key={"job_name": job_name})["Item"]
+    usage = summary.get("usage", {})
+    return {
+        "latency_p50_ms": percentile(latencies_ms, 0.5),
+        "latency_p95_ms": percentile(latencies_ms, 0.95),
+        "peak_rss_mib": round(max(peak_rss_kib) / 1024) if peak_rss_kib else None,
+        "model_calls": sum(int(counters.get("calls", 0)) for counters in usage.values()),
+        "retried_model_calls": sum(int(counters.get("retry_calls", 0)) for counters in usage.values()),
+        "redelivered_works": sum(1 for item in items if "attempts" in item),
+    }
+
+
+def run_scenario(
+    job_name: str,
+    job_type: str,
+    work_count: int,
+    pages: int,
+    concurrency: int,
+    image_bytes: bytes,
+    bedrock_kwargs: dict[str, Any],
+    worker_path: Path,
+    create_job_path: Path,
+    timeout_seconds: float,
+) -> dict[str, Any]:
+    """Process one job with the given number of worker processes and measure it.
+
+    Returns:
+        dict[str, Any]: Works and pages per minute, p50/p95 work latency, retry counts and failed works.
+    """
+    works = upload_works(job_name, work_count, pages, image_bytes)
+    context = multiprocessing.get_context("spawn")
+    workers = []
+    for worker_index in range(concurrency):
+        ready = context.Event()
+        worker_bedrock_kwargs = bedrock_kwargs | {"seed": bedrock_kwargs.get("seed", 0) + worker_index}
+        process = context.Process(target=run_worker, args=(str(worker_path), worker_bedrock_kwargs, ready), daemon=True)
+        process.start()
+        workers.append((process, ready))
+    for _process, ready in workers:
+        ready.wait(timeout=120)
+
+    try:
+        create_job = load_module(create_job_path, "load_test_create_job")
+        logging.getLogger().setLevel(logging.WARNING)
+        started = time.perf_counter()
+        response = create_job.handler(
+            {"body": json.dumps({"job_name": job_name, "job_type": job_type, "works": works})}, None
+        )
+        job_creation = json.loads(response["body"])["job_creation"]
+        if job_creation != "Success":
+            raise RuntimeError(f"Could not create job={job_name}: {job_creation}")
+        create_job_seconds = time.perf_counter() - started
+        counts = wait_for_job(job_name, work_count, timeout_seconds)
+        elapsed_seconds = time.perf_counter() - started
+    finally:
+        for process, _ in workers:
+            process.terminate()
+        for process, _ in workers:
+            process.join(timeout=WORKER_STOP_SECONDS)
+            if process.is_alive():
+                process.kill()
+
+    completed = counts.get(READY_FOR_REVIEW, 0)
+    return {
+        "job_name": job_name,
+        "concurrency": concurrency,
+        "pages": pages,
+        "works": work_count,
+        "completed_works": completed,
+        "failed_works": counts.get(FAILED_TO_PROCESS, 0),
+        "elapsed_seconds": round(elapsed_seconds, 2),
+        "create_job_seconds": round(create_job_seconds, 2),
+        "works_per_minute": round(completed / elapsed_seconds * 60, 2),
+        "pages_per_minute": round(completed * pages / elapsed_seconds * 60, 2),
+    } | collect_work_results(job_name)
+
+
+def set_local_environment(endpoint_url: str, queue_url: str, args: argparse.Namespace) -> None:
+    """Point the worker, the Lambda handler and this process at the local stand-ins."""
+    os.environ.update(
+        {
+            "AWS_ENDPOINT_URL": endpoint_url,
+            "AWS_ACCESS_KEY_ID": "testing",
+            "AWS_SECRET_ACCESS_KEY": "testing",
+            "AWS_REGION": REGION,
+            "AWS_DEFAULT_REGION": REGION,
+            "WORKS_TABLE_NAME": WORKS_TABLE_NAME,
+            "JOBS_TABLE_NAME": JOBS_TABLE_NAME,
+            "WORKS_STATUS_INDEX_NAME": WORKS_STATUS_INDEX_NAME,
+            "SQS_QUEUE_URL": queue_url,
+            "UPLOADS_BUCKET_NAME": BUCKET_NAME,
+            # Workers are stopped once the job is done, not when the queue looks empty during retry backoff
+            "WORKER_IDLE_TIMEOUT_SECONDS": str(24 * 3600),
+            "WORKER_MAX_ATTEMPTS": str(args.max_attempts),
+            "RETRY_BASE_DELAY_SECONDS": str(args.retry_base_delay),
+            "ECS_CLUSTER_NAME": "load-test",
+            "ECS_TASK_DEFINITION_ARN": "arn:aws:ecs:us-east-1:123456789012:task-definition/load-test:1",
+            "ECS_CONTAINER_NAME": "load-test",
+            "ECS_SUBNET_IDS": "subnet-load-test",
+            "ECS_SECURITY_GROUP_IDS": "sg-load-test",
+        }
+    )
+
+
+def print_results(results: list[dict[str, Any]]) -> None:
+    """Print one line per scenario."""
+    columns = [
+        "concurrency",
+        "pages",
+        "completed_works",
+        "failed_works",
+        "works_per_minute",
+        "pages_per_minute",
+        "latency_p50_ms",
+        "latency_p95_ms",
+        "peak_rss_mib",
+        "retried_model_calls",
+        "redelivered_works",
+    ]
+    print("  ".join(f"{column:>19}" for column in columns))
+    for result in results:
+        print("  ".join(f"{str(result[column]):>19}" for column in columns))
+
+
+def main() -> None:
+    """Run the load test scenarios from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--works", type=int, default=20, help="Works per scenario")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1], help="Pages per work, one scenario each")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1], help="Worker processes, one scenario each")
+    parser.add_argument("--job-type", choices=["bias", "metadata"], default="bias")
+    parser.add_argument("--image-size", type=int, nargs=2, default=[1600, 2400], metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--latency", type=float, default=2.0, help="Base seconds per model call")
+    parser.add_argument("--seconds-per-image", type=float, default=0.5, help="Seconds added per image in a call")
+    parser.add_argument("--latency-jitter", type=float, default=0.25, help="Relative spread of model call latency")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of model calls throttled")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Share of model outputs that do not parse")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Failed attempts before a work is marked as failed")
+    parser.add_argument(
+        "--max-receive-count", type=int, default=10, help="Deliveries before a message is dead-lettered"
+    )
+    parser.add_argument("--retry-base-delay", type=int, default=1, help="Seconds before redelivering a throttled work")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for simulated faults and latencies")
+    parser.add_argument("--timeout", type=float, default=1800, help="Seconds to wait for each scenario")
+    parser.add_argument("--worker-path", type=Path, default=DEFAULT_WORKER_PATH)
+    parser.add_argument("--create-job-path", type=Path, default=DEFAULT_CREATE_JOB_PATH)
+    parser.add_argument("--output", type=Path, help="Write the results as JSON to this file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        sys.exit('The load test requires moto with its server extra: pip install "moto[server]"')
+
+    port = find_free_port()
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port)
+    server.start()
+    try:
+        endpoint_url = f"http://127.0.0.1:{port}"
+        os.environ.update(
+            {"AWS_ENDPOINT_URL": endpoint_url, "AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing"}
+        )
+        queue_url = create_resources(args.max_receive_count)
+        set_local_environment(endpoint_url, queue_url, args)
+        width, height = args.image_size
+        image_bytes = generate_image(width, height, seed=0)
+        bedrock_kwargs = {
+            "latency_seconds": args.latency,
+            "seconds_per_image": args.seconds_per_image,
+            "latency_jitter": args.latency_jitter,
+            "throttle_rate": args.throttle_rate,
+            "malformed_rate": args.malformed_rate,
+            "seed": args.seed,
+        }
+
+        results = []
+        for pages in args.pages:
+            for concurrency in args.concurrency:
+                job_name = f"load-test-c{concurrency}-p{pages}-{int(time.time())}"
+                results.append(
+                    run_scenario(
+                        job_name=job_name,
+                        job_type=args.job_type,
+                        work_count=args.works,
+                        pages=pages,
+                        concurrency=concurrency,
+                        image_bytes=image_bytes,
+                        bedrock_kwargs=bedrock_kwargs,
+                        worker_path=args.worker_path,
+                        create_job_path=args.create_job_path,
+                        timeout_seconds=args.timeout,
+                    )
+                )
+                print(f"Finished {job_name}: {results[-1]['works_per_minute']} works per minute")
+    finally:
+        server.stop()
+
+    print()
+    print_results(results)
+    if args.output:
+        args.output.write_text(json.dumps({"arguments": vars(args), "results": results}, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""Micro-benchmarks of the CPU-side work done per page, compared against stored baselines.
+
+Each case runs on generated fixtures in a fresh process, so its memory peak is not hidden by earlier cases.
+Time is the median per call of repeated samples after a warm-up, each batching enough calls to last at least
+0.2 seconds. Memory is the peak of Python allocations traced by tracemalloc, and the growth of the process's
+peak resident set size, which also covers image buffers allocated natively by Pillow.
+
+Timings depend on the machine, so compare against a baseline saved on the same kind of machine. For example:
+
+    python -m image_captioning_assistant.benchmark.micro --save-baseline
+    python -m image_captioning_assistant.benchmark.micro --filter convert_and_reduce_image
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import platform
+import queue
+import random
+import re
+import statistics
+import sys
+import time
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+import pydantic
+from PIL import Image
+
+import image_captioning_assistant.generate.prompts as p
+from image_captioning_assistant.data.constants import BiasLevel, BiasType, LibraryFormat
+from image_captioning_assistant.data.data_classes import (
+    Bias,
+    Biases,
+    ExplainedValue,
+    Metadata,
+    PageTranscription,
+    Transcription,
+    WorkBiasAnalysis,
+)
+from image_captioning_assistant.generate.utils import (
+    convert_and_reduce_image,
+    encode_image_for_model,
+    extract_json_and_cot_from_text,
+    format_prompt_for_converse,
+    parse_model_output_json,
+)
+
+DEFAULT_BASELINE_PATH = Path(__file__).parent / "baselines" / "micro.json"
+DEFAULT_REPEAT = 10
+# Slowdown or memory growth relative to the baseline reported as a regression
+DEFAULT_THRESHOLD = 1.25
+# Differences below these are noise whatever the ratio
+MIN_TIME_DELTA_MS = 0.5
+MIN_MEMORY_DELTA_KIB = 256
+# Longest a case may take, including its warm-up, before it is considered hung
+CASE_TIMEOUT_SECONDS = 600
+# Model that images are encoded for, as by default in the pipelines
+DEFAULT_MODEL_ID = "us.anthropic.claude-3-5-sonnet-20241022-v2:0"
+
+# Source images: width, height and format as uploaded, such as camera JPEGs and archival TIFF masters
+SOURCE_IMAGES = (
+    (1024, 768, "JPEG"),
+    (3000, 4000, "JPEG"),
+    (3000, 4000, "PNG"),
+    (3000, 4000, "TIFF"),
+    (6000, 8000, "JPEG"),
+)
+# Size of large model outputs, such as a long work's transcription
+LARGE_OUTPUT_PAGES = 20
+LINES_PER_PAGE = 40
+BIASES_PER_PAGE = 3
+
+
+def scan_like_image(width: int, height: int, image_format: str, seed: int = 0) -> bytes:
+    """Generate an image with the smooth tones and grain of a scanned photograph, encoded in a format."""
+    grain = Image.frombytes(
+        "RGB", (width // 16, height // 16), random.Random(seed).randbytes((width // 16) * (height // 16) * 3)
+    )
+    image = grain.resize((width, height), Image.Resampling.BICUBIC)
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **({"quality": 90} if image_format == "JPEG" else {}))
+    return buffer.getvalue()
+
+
+def large_metadata(pages: int = LARGE_OUTPUT_PAGES) -> Metadata:
+    """Build a metadata result as long as the model writes for a work with many pages of text."""
+    line = "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt."
+    return Metadata(
+        description=ExplainedValue(value=" ".join([line] * 12), explanation=line),
+        transcription=Transcription(
+            transcriptions=[
+                PageTranscription(printed_text=[line] * LINES_PER_PAGE, handwriting=[line] * (LINES_PER_PAGE // 4))
+                for _ in range(pages)
+            ],
+            model_notes=line,
+        ),
+        date=ExplainedValue(value="circa 1950", explanation=line),
+        location=ExplainedValue(value=["Atlanta, Georgia", "Decatur, Georgia"], explanation=line),
+        publication_info=ExplainedValue(value=line, explanation=line),
+        contextual_info=ExplainedValue(value=" ".join([line] * 6), explanation=line),
+        format=ExplainedValue(value=LibraryFormat.text, explanation=line),
+        genre=ExplainedValue(value=["Letters", "Manuscripts"], explanation=line),
+        objects=ExplainedValue(value=["letterhead", "signature", "stamp"], explanation=line),
+        actions=ExplainedValue(value=["writing"], explanation=line),
+        people=ExplainedValue(value=["author", "recipient"], explanation=line),
+        topics=ExplainedValue(value=["correspondence", "civil rights"], explanation=line),
+    )
+
+
+def large_bias_analysis(pages: int = LARGE_OUTPUT_PAGES) -> WorkBiasAnalysis:
+    """Build a bias analysis result with several biases on every page of a long work."""
+    explanation = "The caption uses an obsolete term for the people depicted, common at the time of creation."
+    biases = Biases(
+        biases=[
+            Bias(level=list(BiasLevel)[index % 3], type=list(BiasType)[index], explanation=explanation)
+            for index in range(BIASES_PER_PAGE)
+        ]
+    )
+    return WorkBiasAnalysis(metadata_biases=biases, page_biases=[biases] * pages)
+
+
+def model_output(result: Any) -> str:
+    """Wrap a result as the model writes it, after its chain of thought."""
+    return f"{p.COT_TAG}{'Careful analysis of the page. ' * 100}{p.COT_TAG_END}\n{result.model_dump_json(indent=2)}"
+
+
+def image_fixture(width: int, height: int, image_format: str) -> Callable[[], bytes]:
+    """Fixture factory of a source image."""
+    return lambda: scan_like_image(width, height, image_format)
+
+
+def run_bias_analysis_render(fixture: None) -> str:
+    """Render the bias analysis prompt, with work context and original metadata."""
+    prompt: str = p.bias_analysis_template.render(
+        COT_TAG=p.COT_TAG,
+        COT_TAG_END=p.COT_TAG_END,
+        COT_TAG_NAME=p.COT_TAG_NAME,
+        work_context="A collection of letters from the 1960s. " * 10,
+        original_metadata="Title: Letter to the editor. Subjects: Civil rights; Segregation. " * 10,
+    )
+    return prompt
+
+
+def run_encode_image_for_model(image_bytes: bytes) -> bytes:
+    """Encode a source image for the default model, sized to its image profile."""
+    return encode_image_for_model(Image.open(io.BytesIO(image_bytes)), DEFAULT_MODEL_ID)[0]
+
+
+# Benchmark cases by name: a fixture factory, run once per case, and the function timed on the fixture
+CASES: dict[str, tuple[Callable[[], Any], Callable[[Any], Any]]] = {
+    **{
+        f"convert_and_reduce_image[{image_format.lower()}-{width}x{height}]": (
+            image_fixture(width, height, image_format),
+            convert_and_reduce_image,
+        )
+        for width, height, image_format in SOURCE_IMAGES
+    },
+    **{
+        f"encode_image_for_model[{image_format.lower()}-{width}x{height}]": (
+            image_fixture(width, height, image_format),
+            run_encode_image_for_model,
+        )
+        for width, height, image_format in SOURCE_IMAGES
+    },
+    "format_prompt_for_converse[2-images]": (
+        lambda: [scan_like_image(2048, 1536, "JPEG", seed) for seed in range(2)],
+        lambda img_bytes_list: format_prompt_for_converse(p.user_prompt_metadata, img_bytes_list, p.COT_TAG),
+    ),
+    "bias_analysis_template.render": (lambda: None, run_bias_analysis_render),
+    "extract_json_and_cot_from_text[metadata]": (
+        lambda: model_output(large_metadata()),
+        extract_json_and_cot_from_text,
+    ),
+    "extract_json_and_cot_from_text[bias_analysis]": (
+        lambda: model_output(large_bias_analysis()),
+        extract_json_and_cot_from_text,
+    ),
+    "parse_model_output_json[metadata]": (
+        lambda: model_output(large_metadata()),
+        lambda text: parse_model_output_json(text, Metadata),
+    ),
+    "parse_model_output_json[bias_analysis]": (
+        lambda: model_output(large_bias_analysis()),
+        lambda text: parse_model_output_json(text, WorkBiasAnalysis),
+    ),
+    "Metadata[validate]": (
+        lambda: large_metadata().model_dump(mode="json"),
+        lambda json_dict: Metadata(**json_dict),
+    ),
+    "Metadata[validate_json]": (
+        lambda: large_metadata().model_dump_json(),
+        Metadata.model_validate_json,
+    ),
+    "WorkBiasAnalysis[validate]": (
+        lambda: large_bias_analysis().model_dump(mode="json"),
+        lambda json_dict: WorkBiasAnalysis(**json_dict),
+    ),
+    "WorkBiasAnalysis[validate_json]": (
+        lambda: large_bias_analysis().model_dump_json(),
+        WorkBiasAnalysis.model_validate_json,
+    ),
+}
+
+
+def peak_rss_kib() -> int:
+    """Peak resident set size of this process so far, in KiB."""
+    # Not available on Windows
+    import resource
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and KiB on Linux
+    return max_rss // 1024 if sys.platform == "darwin" else max_rss
+
+
+def measure_case(name: str, fixture: Any, repeat: int, results: Any) -> None:
+    """Time one case and measure its memory, in the calling process, sending the measurements to a queue.
+
+    Args:
+        name (str): Name of the case in CASES.
+        fixture (Any): The case's fixture.
+        repeat (int): Number of timed calls.
+        results (Any): Queue to put the measurements on.
+    """
+    run = CASES[name][1]
+    rss_before_kib = peak_rss_kib()
+    tracemalloc.start()
+    run(fixture)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_growth_kib = peak_rss_kib() - rss_before_kib
+
+    # Fast cases are timed in batches of calls, so each sample is long enough to measure reliably
+    timer = timeit.Timer(lambda: run(fixture))
+    calls, _ = timer.autorange()
+    durations_ms = [seconds * 1000 / calls for seconds in timer.repeat(repeat=repeat, number=calls)]
+    results.put(
+        {
+            "median_ms": round(statistics.median(durations_ms), 3),
+            "min_ms": round(min(durations_ms), 3),
+            "traced_peak_kib": round(traced_peak / 1024),
+            "rss_growth_kib": rss_growth_kib,
+        }
+    )
+
+
+def run_case(name: str, repeat: int) -> dict[str, Any]:
+    """Generate a case's fixture and measure the case in a fresh process.
+
+    Raises:
+        RuntimeError: If the process exits without measurements, such as when it crashes, or hangs.
+    """
+    fixture = CASES[name][0]()
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=measure_case, args=(name, fixture, repeat, results))
+    process.start()
+    deadline = time.monotonic() + CASE_TIMEOUT_SECONDS
+    try:
+        while True:
+            # Check the process between waits, so that a crash is reported instead of waiting forever
+            exited = not process.is_alive()
+            try:
+                measurements: dict[str, Any] = results.get(timeout=1)
+                break
+            except queue.Empty:
+                if exited:
+                    raise RuntimeError(f"Case {name} exited with code {process.exitcode} without measurements")
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Case {name} did not finish within {CASE_TIMEOUT_SECONDS} seconds")
+    finally:
+        process.join(timeout=10)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+    return measurements
+
+
+def environment() -> dict[str, str]:
+    """Describe the machine, to tell whether a baseline is comparable."""
+    return {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "python": platform.python_version(),
+        "system": platform.system(),
+        "pillow": Image.__version__,
+        "pydantic": pydantic.VERSION,
+    }
+
+
+def compare(
+    results: dict[str, dict[str, Any]],
+    baseline: dict[str, dict[str, Any]],
+    threshold: float,
+) -> list[str]:
+    """Describe the regressions of results against a baseline.
+
+    Args:
+        results (dict): Measurements per case.
+        baseline (dict): Baseline measurements per case.
+        threshold (float): Ratio to the baseline above which a measurement has regressed.
+
+    Returns:
+        list[str]: One line per regressed measurement.
+    """
+    regressions = []
+    for name, measurements in results.items():
+        if name not in baseline:
+            continue
+        for metric, min_delta in (
+            ("median_ms", MIN_TIME_DELTA_MS),
+            ("traced_peak_kib", MIN_MEMORY_DELTA_KIB),
+            ("rss_growth_kib", MIN_MEMORY_DELTA_KIB),
+        ):
+            value, baseline_value = measurements[metric], baseline[name][metric]
+            if value > baseline_value * threshold and value - baseline_value > min_delta:
+                regressions.append(f"{name} {metric}: {value} against {baseline_value} in the baseline")
+    return regressions
+
+
+def print_results(results: dict[str, dict[str, Any]], baseline: dict[str, dict[str, Any]]) -> None:
+    """Print one line per case, with the ratio of its median time to the baseline's."""
+    columns = ["median_ms", "min_ms", "traced_peak_kib", "rss_growth_kib"]
+    width = max(len(name) for name in results)
+    print(f"{'case':<{width}}  " + "  ".join(f"{column:>15}" for column in columns) + f"  {'vs baseline':>11}")
+    for name, measurements in results.items():
+        ratio = ""
+        if name in baseline and baseline[name]["median_ms"]:
+            ratio = f"{measurements['median_ms'] / baseline[name]['median_ms']:.2f}x"
+        print(f"{name:<{width}}  " + "  ".join(f"{measurements[column]:>15}" for column in columns) + f"  {ratio:>11}")
+
+
+def main() -> None:
+    """Run the micro-benchmarks from the command line, exiting with an error on regressions."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--filter", help="Only run cases whose name matches this regular expression")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed calls per case")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Save the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Ratio reported as a regression")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    names = [name for name in CASES if not args.filter or re.search(args.filter, name)]
+    if not names:
+        sys.exit(f"No case matches {args.filter}")
+    results = {}
+    for name in names:
+        results[name] = run_case(name, args.repeat)
+        print(f"Measured {name}", file=sys.stderr)
+
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    baseline = stored.get("cases", {})
+    if stored and stored.get("environment") != environment():
+        print(f"Baseline was measured in a different environment: {stored.get('environment')}", file=sys.stderr)
+    print_results(results, baseline)
+    if args.output:
+        args.output.write_text(json.dumps({"environment": environment(), "cases": results}, indent=2))
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        # Keep the baselines of cases that were filtered out
+        saved = {"environment": environment(), "cases": baseline | results}
+        args.baseline.write_text(json.dumps(saved, indent=2) + "\n")
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print("\nRegressions:\n" + "\n".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
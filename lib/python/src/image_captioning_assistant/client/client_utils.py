@@ -78,6 +78,51 @@ def get_job_progress(api_url: str, job_name: str, api_key: str) -> dict:
         response.raise_for_status()
 
 
+def list_job_work_ids(
+    api_url: str,
+    job_name: str,
+    work_status: str,
+    api_key: str,
+    limit: int = 100,
+    next_token: str | None = None,
+) -> dict:
+    """Query one page of work IDs with the given status from the job_progress endpoint.
+
+    Args:
+        api_url (str): The base URL of your API Gateway
+        job_name (str): The name of the job to query
+        work_status (str): Only list works with this status, e.g. 'FAILED TO PROCESS'
+        limit (int): Maximum number of works to evaluate for this page
+        next_token (str, optional): Cursor returned with the previous page
+
+    Returns:
+        dict: The JSON response from the API, with 'work_ids' and 'next_token'
+    """
+    api_url = api_url.rstrip("/")
+    # Construct the full URL
+    endpoint = f"{api_url}/job_progress"
+
+    # Set up the query parameters
+    params: dict[str, str | int] = {"job_name": job_name, "work_status": work_status, "limit": limit}
+    if next_token:
+        params["next_token"] = next_token
+
+    # Headers
+    headers = {"x-api-key": api_key}
+
+    # Make the GET request
+    response = requests.get(endpoint, params=params, headers=headers)
+
+    # Check if the request was successful
+    if response.status_code == 200:
+        # Parse the JSON response
+        return response.json()
+    else:
+        logging.error(f"Error: API request failed with status code {response.status_code}")
+        logging.error(f"Response: {response.text}")
+        response.raise_for_status()
+
+
 def get_overall_progress(api_url: str, api_key: str) -> dict:
     """Query the overall_progress endpoint.
 
@@ -107,13 +152,22 @@ def get_overall_progress(api_url: str, api_key: str) -> dict:
         response.raise_for_status()
 
 
-def get_job_results(api_url: str, job_name: str, work_id: str, api_key: str) -> dict:
+def get_job_results(
+    api_url: str,
+    job_name: str,
+    work_id: str,
+    api_key: str,
+    include_full_size: bool = False,
+    summary_only: bool = False,
+) -> dict:
     """Query the results endpoint with the given job_name and work_id.
 
     Args:
         api_url (str): The base URL of your API Gateway.
         job_name (str): The name of the job to query.
         work_id (str): The ID of the work within the job.
+        include_full_size (bool): Whether to presign the original images as well as thumbnails and previews.
+        summary_only (bool): Whether to skip loading long results that were offloaded to S3.
 
     Returns:
         dict: The JSON response from the API, or None if an error occurred
@@ -123,7 +177,71 @@ def get_job_results(api_url: str, job_name: str, work_id: str, api_key: str) ->
     endpoint = f"{api_url}/results"
 
     # Set up the query parameters
-    params = {"job_name": job_name, "work_id": work_id}
+    params = {
+        "job_name": job_name,
+        "work_id": work_id,
+        "include_full_size": str(include_full_size).lower(),
+        "summary_only": str(summary_only).lower(),
+    }
+
+    # Headers
+    headers = {"x-api-key": api_key}
+
+    # Make the GET request
+    response = requests.get(endpoint, params=params, headers=headers)
+
+    # Check if the request was successful
+    if response.status_code == 200:
+        # Parse the JSON response
+        return response.json()
+    else:
+        logging.error(f"Error: API request failed with status code {response.status_code}")
+        logging.error(f"Response: {response.text}")
+        response.raise_for_status()
+
+
+def get_job_results_batch(
+    api_url: str,
+    job_name: str,
+    work_ids: list[str],
+    api_key: str,
+    fields: list[str] | None = None,
+    include_presigned_urls: bool = False,
+    pages: list[int] | None = None,
+    include_full_size: bool = False,
+    summary_only: bool = False,
+) -> dict:
+    """Query the results endpoint for up to 100 works of a job in one request.
+
+    Args:
+        api_url (str): The base URL of your API Gateway.
+        job_name (str): The name of the job to query.
+        work_ids (list[str]): The IDs of the works within the job.
+        fields (list[str], optional): Fields to return, e.g. ['work_status', 'description.value']. All if omitted.
+        include_presigned_urls (bool): Whether to return presigned URLs for the work's thumbnails and previews.
+        pages (list[int], optional): Zero-based pages to presign. All pages if omitted.
+        include_full_size (bool): Whether to presign the original images too.
+        summary_only (bool): Whether to skip loading long results that were offloaded to S3.
+
+    Returns:
+        dict: The JSON response from the API, with 'items' and 'missing_work_ids'
+    """
+    api_url = api_url.rstrip("/")
+    # Construct the full URL
+    endpoint = f"{api_url}/results"
+
+    # Set up the query parameters
+    params = {
+        "job_name": job_name,
+        "work_ids": ",".join(work_ids),
+        "include_presigned_urls": str(include_presigned_urls).lower(),
+        "include_full_size": str(include_full_size).lower(),
+        "summary_only": str(summary_only).lower(),
+    }
+    if fields:
+        params["fields"] = ",".join(fields)
+    if pages:
+        params["pages"] = ",".join(str(page) for page in pages)
 
     # Headers
     headers = {"x-api-key": api_key}
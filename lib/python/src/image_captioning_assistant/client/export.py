@@ -0,0 +1,337 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""Stream a job's results from DynamoDB to partitioned JSONL, CSV and Parquet files in S3.
+
+Works are read one page at a time and written in parts of a fixed number of works, so memory stays bounded
+by the part size regardless of the size of the job. A cursor saved after every part lets an interrupted
+export resume where it stopped.
+
+Example:
+    python -m image_captioning_assistant.client.export --works-table <works-table> --job-name <job-name> \
+        --output s3://<bucket>/exports/<job-name> --formats jsonl,csv,parquet
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Any, Iterator
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from cloudpathlib import S3Path
+
+from image_captioning_assistant.aws.result_store import rehydrate_result
+from image_captioning_assistant.aws.s3 import upload_bytes
+from image_captioning_assistant.data.data_classes import Metadata
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "job_name"
+WORK_ID = "work_id"
+JOB_TYPE = "job_type"
+WORK_STATUS = "work_status"
+IMAGE_S3_URIS = "image_s3_uris"
+CONTEXT_S3_URI = "context_s3_uri"
+ORIGINAL_METADATA_S3_URI = "original_metadata_s3_uri"
+TRANSCRIPTION = "transcription"
+METADATA_BIASES = "metadata_biases"
+PAGE_BIASES = "page_biases"
+BIAS_COUNT = "bias_count"
+JSONL = "jsonl"
+CSV = "csv"
+PARQUET = "parquet"
+EXPORT_FORMATS = (JSONL, CSV, PARQUET)
+CURSOR_FILE_NAME = "_export_cursor.json"
+DEFAULT_PART_SIZE = 1000
+LIST_SEPARATOR = "; "
+WORK_COLUMNS = [JOB_NAME, WORK_ID, JOB_TYPE, WORK_STATUS, IMAGE_S3_URIS, CONTEXT_S3_URI, ORIGINAL_METADATA_S3_URI]
+# Every Metadata field other than the transcription is an ExplainedValue
+EXPLAINED_VALUE_FIELDS = [field for field in Metadata.model_fields if field != TRANSCRIPTION]
+EXPORT_COLUMNS = (
+    WORK_COLUMNS
+    + [column for field in EXPLAINED_VALUE_FIELDS for column in (field, f"{field}_explanation")]
+    + [
+        "transcription_printed_text",
+        "transcription_handwriting",
+        "transcription_model_notes",
+        METADATA_BIASES,
+        PAGE_BIASES,
+        BIAS_COUNT,
+    ]
+)
+
+
+def _json_default(value: Any) -> Any:
+    """Encode the Decimals DynamoDB returns for numbers."""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _to_text(value: Any) -> str | None:
+    """Render a value as a single cell of text, joining lists."""
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return LIST_SEPARATOR.join(str(element) for element in value)
+    return str(value)
+
+
+def _format_biases(biases: dict[str, Any] | None) -> list[str]:
+    """Render each bias of a Biases object as 'level type: explanation'."""
+    return [f"{bias['level']} {bias['type']}: {bias['explanation']}" for bias in (biases or {}).get("biases", [])]
+
+
+def _join_pages(pages: list[str]) -> str | None:
+    """Join per-page text, marking where each page starts."""
+    if not any(pages):
+        return None
+    return "\n\n".join(f"[Page {index + 1}]\n{text}" for index, text in enumerate(pages) if text)
+
+
+def flatten_work(item: dict[str, Any]) -> dict[str, Any]:
+    """Flatten a work's Metadata and WorkBiasAnalysis into one row of EXPORT_COLUMNS.
+
+    Args:
+        item (dict[str, Any]): Work item with its full result.
+
+    Returns:
+        dict[str, Any]: Text per column, and the number of biases found.
+    """
+    row: dict[str, Any] = {column: _to_text(item.get(column)) for column in WORK_COLUMNS}
+    for field in EXPLAINED_VALUE_FIELDS:
+        explained_value = item.get(field) or {}
+        row[field] = _to_text(explained_value.get("value"))
+        row[f"{field}_explanation"] = _to_text(explained_value.get("explanation"))
+
+    transcription = item.get(TRANSCRIPTION) or {}
+    pages = transcription.get("transcriptions", [])
+    row["transcription_printed_text"] = _join_pages(["\n".join(page.get("printed_text", [])) for page in pages])
+    row["transcription_handwriting"] = _join_pages(["\n".join(page.get("handwriting", [])) for page in pages])
+    row["transcription_model_notes"] = transcription.get("model_notes")
+
+    metadata_biases = _format_biases(item.get(METADATA_BIASES))
+    page_biases = [_format_biases(biases) for biases in item.get(PAGE_BIASES) or []]
+    row[METADATA_BIASES] = "\n".join(metadata_biases) or None
+    row[PAGE_BIASES] = _join_pages(["\n".join(biases) for biases in page_biases])
+    row[BIAS_COUNT] = len(metadata_biases) + sum(len(biases) for biases in page_biases)
+    return row
+
+
+def encode_jsonl(items: list[dict[str, Any]]) -> bytes:
+    """Encode works as JSON lines, keeping their nested structure."""
+    return "".join(json.dumps(item, default=_json_default) + "\n" for item in items).encode("utf-8")
+
+
+def encode_csv(items: list[dict[str, Any]]) -> bytes:
+    """Encode works as CSV rows of EXPORT_COLUMNS."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    writer.writerows(flatten_work(item) for item in items)
+    return buffer.getvalue().encode("utf-8")
+
+
+def encode_parquet(items: list[dict[str, Any]]) -> bytes:
+    """Encode works as a Parquet file of EXPORT_COLUMNS.
+
+    Raises:
+        ImportError: If pyarrow, from the 'export' extra, is not installed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError("Parquet export requires pyarrow: pip install 'image-captioning-assistant[export]'") from exc
+
+    schema = pa.schema(
+        [(column, pa.int64() if column == BIAS_COUNT else pa.string()) for column in EXPORT_COLUMNS],
+    )
+    table = pa.Table.from_pylist([flatten_work(item) for item in items], schema=schema)
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression="snappy")
+    return buffer.getvalue()
+
+
+ENCODERS = {JSONL: encode_jsonl, CSV: encode_csv, PARQUET: encode_parquet}
+
+
+def iter_job_works(
+    works_table: Any,
+    job_name: str,
+    exclusive_start_key: dict[str, Any] | None = None,
+) -> Iterator[list[dict[str, Any]]]:
+    """Query a job's works one page at a time, starting after exclusive_start_key."""
+    query_kwargs: dict[str, Any] = {"KeyConditionExpression": Key(JOB_NAME).eq(job_name)}
+    if exclusive_start_key:
+        query_kwargs["ExclusiveStartKey"] = exclusive_start_key
+    while True:
+        response = works_table.query(**query_kwargs)
+        yield response.get("Items", [])
+        if "LastEvaluatedKey" not in response:
+            return
+        query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def load_cursor(output_path: S3Path, s3_kwargs: dict[str, Any]) -> dict[str, Any] | None:
+    """Load the cursor of a previous export to the same location, if any."""
+    cursor_path = output_path / CURSOR_FILE_NAME
+    try:
+        body = boto3.client("s3", **s3_kwargs).get_object(Bucket=cursor_path.bucket, Key=cursor_path.key)["Body"]
+        cursor: dict[str, Any] = json.loads(body.read())
+        return cursor
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return None
+        raise
+
+
+def save_cursor(output_path: S3Path, cursor: dict[str, Any], s3_kwargs: dict[str, Any]) -> None:
+    """Save the export's progress next to its output."""
+    cursor_path = output_path / CURSOR_FILE_NAME
+    upload_bytes(
+        s3_bucket=cursor_path.bucket,
+        s3_key=cursor_path.key,
+        body=json.dumps(cursor, default=_json_default).encode("utf-8"),
+        s3_client_kwargs=s3_kwargs,
+        content_type="application/json",
+    )
+
+
+def clear_parts(output_path: S3Path, s3_kwargs: dict[str, Any]) -> None:
+    """Delete the parts of a previous export to the same location, so that none outlive a fresh export."""
+    s3_client = boto3.client("s3", **s3_kwargs)
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for export_format in EXPORT_FORMATS:
+        prefix = (output_path / export_format).key + "/part-"
+        for page in paginator.paginate(Bucket=output_path.bucket, Prefix=prefix):
+            # A listing page holds at most 1000 keys, as many as one request deletes
+            objects = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+            if objects:
+                s3_client.delete_objects(Bucket=output_path.bucket, Delete={"Objects": objects, "Quiet": True})
+                logger.info(f"Deleted {len(objects)} parts of a previous export under {prefix}")
+
+
+def write_part(
+    items: list[dict[str, Any]],
+    output_path: S3Path,
+    part_index: int,
+    formats: tuple[str, ...],
+    s3_kwargs: dict[str, Any],
+) -> None:
+    """Write one part of the export in every format, as <output>/<format>/part-<index>.<format>."""
+    for export_format in formats:
+        part_path = output_path / export_format / f"part-{part_index:05d}.{export_format}"
+        upload_bytes(
+            s3_bucket=part_path.bucket,
+            s3_key=part_path.key,
+            body=ENCODERS[export_format](items),
+            s3_client_kwargs=s3_kwargs,
+        )
+    logger.info(f"Wrote part {part_index} with {len(items)} works")
+
+
+def export_job_results(
+    works_table: Any,
+    job_name: str,
+    output_s3_uri: str,
+    s3_kwargs: dict[str, Any],
+    formats: tuple[str, ...] = EXPORT_FORMATS,
+    part_size: int = DEFAULT_PART_SIZE,
+    resume: bool = True,
+    max_workers: int = 8,
+) -> dict[str, Any]:
+    """Export a job's results to S3, resuming a previous export to the same location.
+
+    Args:
+        works_table (Any): DynamoDB works table.
+        job_name (str): The job to export.
+        output_s3_uri (str): S3 prefix to write the parts and cursor under.
+        s3_kwargs (dict[str, Any]): S3 client configuration.
+        formats (tuple[str, ...]): Formats to write, among EXPORT_FORMATS.
+        part_size (int): Number of works per part, which bounds memory use.
+        resume (bool): Whether to continue from a previous export's cursor. Otherwise the parts of a previous
+            export are deleted first.
+        max_workers (int): Offloaded results loaded concurrently.
+
+    Returns:
+        dict[str, Any]: The final cursor, with the number of parts and works exported.
+    """
+    unsupported_formats = set(formats) - set(EXPORT_FORMATS)
+    if unsupported_formats:
+        raise ValueError(f"Unsupported export formats {sorted(unsupported_formats)}, expected {EXPORT_FORMATS}")
+
+    output_path = S3Path(output_s3_uri)
+    cursor = load_cursor(output_path, s3_kwargs) if resume else None
+    if cursor and cursor.get("completed"):
+        logger.info(f"Export of job={job_name} to {output_s3_uri} already completed")
+        return cursor
+    if cursor is None or cursor[JOB_NAME] != job_name or tuple(cursor["formats"]) != tuple(formats):
+        clear_parts(output_path, s3_kwargs)
+        cursor = {
+            JOB_NAME: job_name,
+            "formats": list(formats),
+            "last_exported_key": None,
+            "parts": 0,
+            "works": 0,
+            "completed": False,
+        }
+    else:
+        logger.info(f"Resuming export of job={job_name} after {cursor['works']} works")
+
+    def flush(items: list[dict[str, Any]]) -> None:
+        write_part(items, output_path, cursor["parts"], formats, s3_kwargs)
+        # The last work of a part is where the next run's query starts
+        cursor["last_exported_key"] = {JOB_NAME: job_name, WORK_ID: items[-1][WORK_ID]}
+        cursor["parts"] += 1
+        cursor["works"] += len(items)
+        save_cursor(output_path, cursor, s3_kwargs)
+
+    buffer: list[dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for page in iter_job_works(works_table, job_name, cursor["last_exported_key"]):
+            buffer.extend(executor.map(lambda item: rehydrate_result(item, s3_kwargs), page))
+            while len(buffer) >= part_size:
+                flush(buffer[:part_size])
+                buffer = buffer[part_size:]
+    if buffer:
+        flush(buffer)
+
+    cursor["completed"] = True
+    save_cursor(output_path, cursor, s3_kwargs)
+    logger.info(f"Exported {cursor['works']} works of job={job_name} in {cursor['parts']} parts to {output_s3_uri}")
+    return cursor
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(description="Export a job's results to JSONL, CSV and Parquet files in S3.")
+    parser.add_argument("--works-table", required=True, help="Name of the DynamoDB works table")
+    parser.add_argument("--job-name", required=True, help="Job to export")
+    parser.add_argument("--output", required=True, help="S3 URI of the export, e.g. s3://bucket/exports/job")
+    parser.add_argument("--formats", default=",".join(EXPORT_FORMATS), help="Comma-separated export formats")
+    parser.add_argument("--part-size", type=int, default=DEFAULT_PART_SIZE, help="Works per output file")
+    parser.add_argument("--restart", action="store_true", help="Start over, deleting the parts of a previous export")
+    parser.add_argument("--region", help="AWS region of the table and bucket")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    s3_kwargs = {"region_name": args.region}
+    export_job_results(
+        works_table=boto3.resource("dynamodb", region_name=args.region).Table(args.works_table),
+        job_name=args.job_name,
+        output_s3_uri=args.output,
+        s3_kwargs=s3_kwargs,
+        formats=tuple(export_format.strip() for export_format in args.formats.split(",")),
+        part_size=args.part_size,
+        resume=not args.restart,
+    )
@@ -1,215 +1,426 @@
 # Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
 # Terms and the SOW between the parties dated 2025.
 
-"""Module for recovering failed tasks."""
+"""Module for recovering failed tasks.
 
+Example:
+    python -m image_captioning_assistant.client.recover --works-table <works-table> --jobs-table <jobs-table> \
+        --queue-url <queue-url> --status "FAILED TO PROCESS" --dry-run
+"""
+
+import argparse
 import json
 import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 import boto3
+from boto3.dynamodb.conditions import Attr, Key
 from botocore.exceptions import ClientError
 
+from image_captioning_assistant.aws.dynamodb import (
+    ATTEMPTS,
+    is_condition_failure,
+    iter_job_names_with_status,
+    iter_works_by_status,
+    LEASE_EXPIRES_AT,
+    LEASE_OWNER,
+    transition_work_status,
+)
+
 # Set up logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize AWS clients
-dynamodb = boto3.resource("dynamodb")
-sqs = boto3.client("sqs")
-
 JOB_NAME = "job_name"
 WORK_ID = "work_id"
 WORK_STATUS = "work_status"
 IN_QUEUE = "IN QUEUE"
+IN_PROGRESS = "IN PROGRESS"
 FAILED_TO_PROCESS = "FAILED TO PROCESS"
+SQS_BATCH_SIZE = 10
+DEFAULT_TOTAL_SEGMENTS = 8
+DEFAULT_MAX_WORKERS = 16
+
+# Boto3 resources are not thread-safe, so each thread creates its own tables
+_thread_local = threading.local()
+
+
+def _get_thread_table(table: Any) -> Any:
+    """Get a resource for the same DynamoDB table that is owned by the calling thread."""
+    tables = _thread_local.__dict__.setdefault("tables", {})
+    if table.name not in tables:
+        region_name = table.meta.client.meta.region_name
+        tables[table.name] = boto3.session.Session().resource("dynamodb", region_name=region_name).Table(table.name)
+    return tables[table.name]
+
+
+def _send_batch(entries: list[dict], queue_url: str, sqs_client: Any) -> int:
+    """Send up to 10 messages, retrying entries that failed through no fault of the sender once."""
+    sent_count = 0
+    for attempt in range(2):
+        try:
+            response = sqs_client.send_message_batch(QueueUrl=queue_url, Entries=entries)
+        except ClientError as e:
+            logger.error(f"Error sending message batch to SQS: {e}")
+            return sent_count
+        failed = response.get("Failed", [])
+        sent_count += len(entries) - len(failed)
+        retry_ids = {failure["Id"] for failure in failed if not failure.get("SenderFault")} if attempt == 0 else set()
+        for failure in failed:
+            if failure["Id"] not in retry_ids:
+                logger.error(f"Error sending message to SQS: {failure}")
+        if not retry_ids:
+            break
+        entries = [entry for entry in entries if entry["Id"] in retry_ids]
+        time.sleep(1)
+    return sent_count
 
 
-def send_to_sqs(items: list, queue_url: str) -> int:
-    """Send job_name and work_id from each item to SQS queue.
+def send_to_sqs(items: list, queue_url: str, sqs_client: Any, max_workers: int = DEFAULT_MAX_WORKERS) -> int:
+    """Send job_name and work_id from each item to SQS queue, in batches of 10 messages.
 
     Args:
         items (list): List of DynamoDB items to process
         queue_url (str): URL of the SQS queue
+        sqs_client (Any): SQS client, which is shared between threads
+        max_workers (int): Number of batches sent concurrently
 
     Returns:
         int: Number of successfully queued items
     """
-    successful_count = 0
-
+    entries: list[dict[str, str]] = []
     for item in items:
-        # Extract required fields
         job_name = item.get(JOB_NAME)
         work_id = item.get(WORK_ID)
-
         if not job_name or not work_id:
             logger.warning(f"Skipping item missing required fields: {item}")
             continue
+        entries.append({"Id": str(len(entries)), "MessageBody": json.dumps({JOB_NAME: job_name, WORK_ID: work_id})})
 
-        message_body = {JOB_NAME: job_name, WORK_ID: work_id}
-
-        try:
-            # Send message to SQS queue
-            response = sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps(message_body))
-            successful_count += 1
-            logger.info(f"Message sent to SQS: {message_body}, MessageId: {response.get('MessageId')}")
-
-        except ClientError as e:
-            logger.error(f"Error sending message to SQS: {e}")
+    batches = [entries[i : i + SQS_BATCH_SIZE] for i in range(0, len(entries), SQS_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        successful_count = sum(executor.map(lambda batch: _send_batch(batch, queue_url, sqs_client), batches))
 
+    logger.info(f"Sent {successful_count} of {len(entries)} messages to SQS")
     return successful_count
 
 
-def get_items_with_status(status: str, table: Any) -> list:
-    """Get all items with the specified work_status.
+def get_items_with_status(
+    status: str,
+    table: Any,
+    jobs_table: Any,
+    job_name: str | None = None,
+    total_segments: int = DEFAULT_TOTAL_SEGMENTS,
+    scan: bool = False,
+) -> list:
+    """Get the keys of all items with the specified work_status.
+
+    Items of a named job, or of the jobs whose status counters hold the status, are read from the status index.
+    Jobs created before job summaries existed have no counters, so when the counters name no job, or when scan
+    is set, the table is read with a parallel scan of total_segments segments instead.
 
     Args:
         status (str): The work_status to filter for
         table (dynamodb.Table) The table to search
+        jobs_table (Any): DynamoDB jobs table, whose status counters tell which jobs hold such items
+        job_name (str, optional): Only return items of this job
+        total_segments (int): Number of segments scanned concurrently
+        scan (bool): Scan the table even if status counters name jobs, to include jobs without counters
 
     Returns:
-        list: Items with the specified work_status
+        list: Items (job_name and work_id) with the specified work_status
     """
-    items = []
-    last_evaluated_key = None
+    if job_name:
+        job_names = [job_name]
+    elif scan:
+        job_names = []
+    else:
+        job_names = list(iter_job_names_with_status(jobs_table, status))
+    if job_names:
+        logger.info(f"Querying table: {table.name} for items with status '{status}' in {len(job_names)} jobs")
+        items = [
+            item
+            for name in job_names
+            for item in iter_works_by_status(works_table=table, work_status=status, job_name=name)
+        ]
+    else:
+        logger.info(f"Scanning table: {table.name} for items with status '{status}' in {total_segments} segments")
+        scan_kwargs = {
+            "FilterExpression": Attr(WORK_STATUS).eq(status),
+            "ProjectionExpression": "#job_name, #work_id",
+            "ExpressionAttributeNames": {"#job_name": JOB_NAME, "#work_id": WORK_ID},
+        }
+        with ThreadPoolExecutor(max_workers=total_segments) as executor:
+            segments = executor.map(
+                lambda segment: _scan_segment(table, segment, total_segments, scan_kwargs), range(total_segments)
+            )
+            items = [item for segment_items in segments for item in segment_items]
+    if items and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Sample item: {items[0]}")
+
+    logger.info(f"Found total of {len(items)} items with work_status '{status}'")
+    return items
 
-    logger.info(f"Scanning table: {table.name} for items with status '{status}'")
 
+def _scan_segment(table: Any, segment: int, total_segments: int, scan_kwargs: dict[str, Any]) -> list:
+    """Scan every page of one segment of a parallel scan."""
+    thread_table = _get_thread_table(table)
+    items = []
+    scan_kwargs = scan_kwargs | {"Segment": segment, "TotalSegments": total_segments}
     while True:
-        scan_kwargs = {"FilterExpression": boto3.dynamodb.conditions.Attr(WORK_STATUS).eq(status)}
+        response = thread_table.scan(**scan_kwargs)
+        items.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            return items
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
 
-        if last_evaluated_key:
-            scan_kwargs["ExclusiveStartKey"] = last_evaluated_key
 
-        response = table.scan(**scan_kwargs)
-        current_items = response.get("Items", [])
-        items.extend(current_items)
+def get_stale_items(
+    table: Any,
+    job_name: str | None = None,
+    total_segments: int = DEFAULT_TOTAL_SEGMENTS,
+) -> list:
+    """Get the items left IN PROGRESS by a worker whose lease has expired.
 
-        logger.info(f"Scan batch returned {len(current_items)} items with status '{status}'")
-        if current_items and logger.isEnabledFor(logging.DEBUG):
-            logger.debug(f"Sample item: {current_items[0]}")
+    Lease expiries are not projected into the status index, so the table itself is read: with a Query when
+    filtering by job, otherwise with a parallel scan of total_segments segments.
 
-        last_evaluated_key = response.get("LastEvaluatedKey")
+    Args:
+        table (Any): DynamoDB table.
+        job_name (str, optional): Only return items of this job
+        total_segments (int): Number of segments scanned concurrently
 
-        if not last_evaluated_key:
-            break
+    Returns:
+        list: Items (job_name, work_id and lease owner) whose lease has expired
+    """
+    filter_expression = Attr(WORK_STATUS).eq(IN_PROGRESS) & (
+        Attr(LEASE_EXPIRES_AT).not_exists() | Attr(LEASE_EXPIRES_AT).lt(int(time.time()))
+    )
+    read_kwargs = {
+        "FilterExpression": filter_expression,
+        "ProjectionExpression": "#job_name, #work_id, #lease_owner",
+        "ExpressionAttributeNames": {"#job_name": JOB_NAME, "#work_id": WORK_ID, "#lease_owner": LEASE_OWNER},
+    }
+    if job_name:
+        logger.info(f"Querying table: {table.name} for stale items of job '{job_name}'")
+        items = []
+        query_kwargs = read_kwargs | {"KeyConditionExpression": Key(JOB_NAME).eq(job_name)}
+        while True:
+            response = table.query(**query_kwargs)
+            items.extend(response.get("Items", []))
+            if "LastEvaluatedKey" not in response:
+                break
+            query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    else:
+        logger.info(f"Scanning table: {table.name} for stale items in {total_segments} segments")
+        with ThreadPoolExecutor(max_workers=total_segments) as executor:
+            segments = executor.map(
+                lambda segment: _scan_segment(table, segment, total_segments, read_kwargs), range(total_segments)
+            )
+            items = [item for segment_items in segments for item in segment_items]
 
-    logger.info(f"Found total of {len(items)} items with work_status '{status}'")
+    logger.info(f"Found total of {len(items)} items with an expired lease")
     return items
 
 
-def change_status(from_status: str, to_status: str, table: Any) -> int:
+def change_status(
+    from_status: str,
+    to_status: str,
+    table: Any,
+    jobs_table: Any,
+    items: list | None = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> list:
     """Change items from one status to another status.
 
     Args:
         from_status (str): The current status to find items by
         to_status (str): The new status to set for matching items
         table (Any): DynamoDB table.
+        jobs_table (Any): DynamoDB jobs table holding per-job status counters.
+        items (list, optional): Items to change, instead of every item with from_status
+        max_workers (int): Number of items updated concurrently
 
     Returns:
-        int: Number of items successfully updated
+        list: Items successfully updated
     """
     # Get items with the specified status
-    items = get_items_with_status(status=from_status, table=table)
+    if items is None:
+        items = get_items_with_status(status=from_status, table=table, jobs_table=jobs_table)
 
     if not items:
         logger.info(f"No items found with status '{from_status}'")
-        return 0
+        return []
 
-    # Update each item's status
-    updated_count = 0
-    for item in items:
+    def update_item(item: dict) -> bool:
         job_name = item.get(JOB_NAME)
         work_id = item.get(WORK_ID)
 
         if not job_name or not work_id:
             logger.warning(f"Skipping item missing required fields: {item}")
-            continue
+            return False
 
         try:
-            table.update_item(
-                Key={JOB_NAME: job_name, WORK_ID: work_id},
-                UpdateExpression="SET work_status = :new_status",
-                ExpressionAttributeValues={":new_status": to_status, ":old_status": from_status},
-                ConditionExpression=f"{WORK_STATUS} = :old_status",
+            transition_work_status(
+                works_table=_get_thread_table(table),
+                jobs_table=_get_thread_table(jobs_table),
+                job_name=job_name,
+                work_id=work_id,
+                from_status=from_status,
+                to_status=to_status,
+                # A requeued work gets a fresh set of attempts
+                update_data={ATTEMPTS: 0} if to_status == IN_QUEUE else None,
+                # Leave the item alone if a worker has taken over or renewed its lease since it was read
+                lease_owner=item.get(LEASE_OWNER),
+                lease_expired_by=int(time.time()) if from_status == IN_PROGRESS else None,
             )
-            updated_count += 1
-            logger.info(f"Updated item status from '{from_status}' to '{to_status}': {job_name}/{work_id}")
+            logger.debug(f"Updated item status from '{from_status}' to '{to_status}': {job_name}/{work_id}")
+            return True
 
         except ClientError as e:
-            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
-                logger.warning(f"Item status changed since scan: {job_name}/{work_id}")
+            if is_condition_failure(e):
+                logger.warning(f"Item status changed since it was read: {job_name}/{work_id}")
             else:
                 logger.error(f"Error updating item: {e}")
+            return False
 
-    logger.info(f"Updated {updated_count} items from '{from_status}' to '{to_status}'")
-    return updated_count
+    # Update the items' statuses concurrently
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        updated_items = [item for item, updated in zip(items, executor.map(update_item, items)) if updated]
 
+    logger.info(f"Updated {len(updated_items)} items from '{from_status}' to '{to_status}'")
+    return updated_items
 
-def queue_items_with_status(status: str, queue_url: str, table: Any) -> int:
-    """Add all items with a specific status to SQS queue.
 
-    Args:
-        status (str): The work_status of items to queue
-        queue_url (str): URL of the SQS queue
-        table (Any): DynamoDB table.
+def report_items(items: list, status: str) -> dict[str, int]:
+    """Log how many items per job would be recovered, without changing anything.
 
     Returns:
-        int: Number of items successfully added to SQS
+        dict[str, int]: Number of items per job name.
     """
-    # Get items with the specified status
-    items = get_items_with_status(status=status, table=table)
+    counts = dict(Counter(item[JOB_NAME] for item in items))
+    logger.info(f"Dry run: {len(items)} items with status '{status}' would be returned to '{IN_QUEUE}' and queued")
+    for job_name, count in sorted(counts.items()):
+        logger.info(f"  {job_name}: {count}")
+    return counts
+
+
+def process_orphaned_items(
+    orphaned_status: str,
+    table: Any,
+    jobs_table: Any,
+    queue_url: str | None,
+    sqs_client: Any = None,
+    job_name: str | None = None,
+    dry_run: bool = False,
+    total_segments: int = DEFAULT_TOTAL_SEGMENTS,
+    scan: bool = False,
+) -> tuple[int, int]:
+    """Return items with orphaned_status to 'IN QUEUE' and send them to SQS.
+
+    Items 'IN PROGRESS' are only recovered once their worker's lease has expired.
 
-    if not items:
-        logger.info(f"No items found with status '{status}' to queue")
-        return 0
-
-    # Send items to SQS
-    successful_count = send_to_sqs(items, queue_url)
-    logger.info(f"Added {successful_count} items with status '{status}' to SQS queue")
+    Args:
+        orphaned_status (str): Status of the items to recover, such as 'FAILED TO PROCESS'.
+        table (Any): DynamoDB table.
+        jobs_table (Any): DynamoDB jobs table holding per-job status counters.
+        queue_url (str, optional): URL of the SQS queue; not needed for a dry run.
+        sqs_client (Any, optional): SQS client; not needed for a dry run.
+        job_name (str, optional): Only recover items of this job.
+        dry_run (bool): Only report the items that would be recovered.
+        total_segments (int): Number of segments scanned concurrently when the table is scanned.
+        scan (bool): Scan for failed items even if job status counters name jobs, to include jobs without counters.
 
-    return successful_count
+    Returns:
+        tuple[int, int]: Number of items updated to 'IN QUEUE' and number of items sent to SQS.
+    """
+    try:
+        if orphaned_status == IN_PROGRESS:
+            items = get_stale_items(table=table, job_name=job_name, total_segments=total_segments)
+        else:
+            items = get_items_with_status(
+                status=orphaned_status,
+                table=table,
+                jobs_table=jobs_table,
+                job_name=job_name,
+                total_segments=total_segments,
+                scan=scan,
+            )
 
+        if dry_run:
+            report_items(items, orphaned_status)
+            return 0, 0
+        if not queue_url:
+            raise ValueError("A queue URL is required to recover items")
 
-def process_orphaned_items(orphaned_status: str, table: Any) -> tuple[int, int]:
-    """Find items with work_status == 'FAILED TO PROCESS', update them to 'IN QUEUE', and send them to SQS."""
-    try:
         # Change items from orphaned_status to 'IN QUEUE'
-        updated_count = change_status(
+        updated_items = change_status(
             from_status=orphaned_status,
             to_status=IN_QUEUE,
             table=table,
+            jobs_table=jobs_table,
+            items=items,
         )
 
-        # Queue all items with 'IN QUEUE' status
-        queued_count = queue_items_with_status(
-            status=IN_QUEUE,
-            queue_url=queue_url,
-            table=table,
-        )
+        # Only queue the items updated here, which have no message in flight
+        queued_count = send_to_sqs(updated_items, queue_url, sqs_client) if updated_items else 0
 
-        logger.info(f"Summary: {updated_count} items updated to '{IN_QUEUE}', {queued_count} items sent to SQS")
-        return updated_count, queued_count
+        logger.info(f"Summary: {len(updated_items)} items updated to '{IN_QUEUE}', {queued_count} items sent to SQS")
+        return len(updated_items), queued_count
 
     except Exception as e:
         logger.error(f"Error processing items: {e}")
         return 0, 0
 
 
+def parse_args() -> argparse.Namespace:
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(description="Return failed or stale works to the queue.")
+    parser.add_argument("--works-table", required=True, help="Name of the DynamoDB works table")
+    parser.add_argument("--jobs-table", required=True, help="Name of the DynamoDB jobs table")
+    parser.add_argument("--queue-url", help="URL of the SQS work queue, required unless --dry-run")
+    parser.add_argument(
+        "--status",
+        default=FAILED_TO_PROCESS,
+        choices=[FAILED_TO_PROCESS, IN_PROGRESS],
+        help="Status of the works to recover",
+    )
+    parser.add_argument("--job-name", help="Only recover works of this job")
+    parser.add_argument("--segments", type=int, default=DEFAULT_TOTAL_SEGMENTS, help="Parallel scan segments")
+    parser.add_argument(
+        "--scan",
+        action="store_true",
+        help="Scan the works table even if job summaries name jobs, to include jobs created before summaries existed",
+    )
+    parser.add_argument("--region", help="AWS region of the table and queue")
+    parser.add_argument("--dry-run", action="store_true", help="Report the works to recover without changes")
+    args = parser.parse_args()
+    if not args.dry_run and not args.queue_url:
+        parser.error("--queue-url is required unless --dry-run is set")
+    return args
+
+
 # Execute the function
 if __name__ == "__main__":
-    table = dynamodb.Table("ai-description-dev-nt01-works-table")
-    queue_url = "https://sqs.us-east-1.amazonaws.com/008971633436/ai-description-dev-nt01-queue"
-    orphan_status = FAILED_TO_PROCESS
+    args = parse_args()
+    dynamodb = boto3.resource("dynamodb", region_name=args.region)
+    sqs = boto3.client("sqs", region_name=args.region)
 
     updated_items, queued_items = process_orphaned_items(
-        orphaned_status=orphan_status,
-        table=table,
-    )
-    print(f"Updated {updated_items} items from '{orphan_status}' to '{IN_QUEUE}'")
-    queue_items_with_status(
-        status=IN_QUEUE,
-        queue_url=queue_url,
-        table=table,
+        orphaned_status=args.status,
+        table=dynamodb.Table(args.works_table),
+        jobs_table=dynamodb.Table(args.jobs_table),
+        queue_url=args.queue_url,
+        sqs_client=sqs,
+        job_name=args.job_name,
+        dry_run=args.dry_run,
+        total_segments=args.segments,
+        scan=args.scan,
     )
-    print(f"Successfully queued {queued_items} items to SQS")
+    if not args.dry_run:
+        print(f"Updated {updated_items} items from '{args.status}' to '{IN_QUEUE}'")
+        print(f"Successfully queued {queued_items} items to SQS")
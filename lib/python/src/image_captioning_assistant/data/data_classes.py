@@ -10,6 +10,7 @@ This module contains structured data definitions for:
 - Composite structured metadata format
 """
 
+from functools import cache
 from typing import Generic, List, TypeVar
 
 from pydantic import BaseModel, Field
@@ -26,12 +27,14 @@ class ExplainedValue(BaseModel, Generic[ValueType]):
     explanation: str = Field(..., description="LLM's reasoning for providing this specific value")
 
     @classmethod
+    @cache
     def with_type(cls, value_type: type[ValueType]) -> type["ExplainedValue"]:
-        """Type helper for creating field-specific variants."""
+        """Type helper for creating field-specific variants, created once per value type."""
 
         class ConcreteExplainedValue(ExplainedValue[ValueType]):
             value: value_type  # type: ignore
 
+        ConcreteExplainedValue.__name__ = f"ExplainedValue[{getattr(value_type, '__name__', value_type)}]"
         return ConcreteExplainedValue
 
 
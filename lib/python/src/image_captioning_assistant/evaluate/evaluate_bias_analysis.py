@@ -9,6 +9,7 @@ from typing import Any
 from langchain_aws import ChatBedrockConverse
 from pydantic import BaseModel, Field
 
+from image_captioning_assistant.aws.bedrock_recording import chat_bedrock_converse_kwargs_with_recording
 from image_captioning_assistant.data.data_classes import BiasAnalysisCOT
 from image_captioning_assistant.evaluate.utils import mean
 
@@ -94,7 +95,8 @@ def evaluate_potential_biases(
         BiasAnalysisEvaluation: Evaluation of potential biases identified by LLM vs human
     """
     # Build structured LLM client
-    structured_llm = ChatBedrockConverse(**chat_bedrock_converse_kwargs).with_structured_output(BiasAnalysisEvaluation)
+    llm = ChatBedrockConverse(**chat_bedrock_converse_kwargs_with_recording(chat_bedrock_converse_kwargs))
+    structured_llm = llm.with_structured_output(BiasAnalysisEvaluation)
 
     # Build prompt
     prompt = PROMPT_TEMPLATE.format(
@@ -9,6 +9,7 @@ from typing import Any
 from langchain_aws import ChatBedrockConverse
 from pydantic import BaseModel, Field
 
+from image_captioning_assistant.aws.bedrock_recording import chat_bedrock_converse_kwargs_with_recording
 from image_captioning_assistant.evaluate.utils import mean
 
 logger = logging.getLogger(__name__)
@@ -88,9 +89,8 @@ def evaluate_freeform_response(
         FreeformResponseEvaluation: Evaluation of LLM's response.
     """
     # Build structured LLM client
-    structured_llm = ChatBedrockConverse(**chat_bedrock_converse_kwargs).with_structured_output(
-        FreeformResponseEvaluation
-    )
+    llm = ChatBedrockConverse(**chat_bedrock_converse_kwargs_with_recording(chat_bedrock_converse_kwargs))
+    structured_llm = llm.with_structured_output(FreeformResponseEvaluation)
 
     # Build prompt
     prompt = PROMPT_TEMPLATE.format(
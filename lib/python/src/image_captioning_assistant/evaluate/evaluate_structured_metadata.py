@@ -10,6 +10,7 @@ from typing import Any
 from langchain_aws import ChatBedrockConverse
 from pydantic import BaseModel, Field
 
+from image_captioning_assistant.aws.bedrock_recording import chat_bedrock_converse_kwargs_with_recording
 from image_captioning_assistant.data.data_classes import Metadata
 from image_captioning_assistant.evaluate.evaluate_freeform_description import (
     BatchFreeformResponseEvaluation,
@@ -122,9 +123,8 @@ def evaluate_structured_metadata(
         chat_bedrock_converse_kwargs=chat_bedrock_converse_kwargs,
     )
     # Build structured LLM client
-    structured_llm = ChatBedrockConverse(**chat_bedrock_converse_kwargs).with_structured_output(
-        PartialStructuredMetadataEvaluation
-    )
+    llm = ChatBedrockConverse(**chat_bedrock_converse_kwargs_with_recording(chat_bedrock_converse_kwargs))
+    structured_llm = llm.with_structured_output(PartialStructuredMetadataEvaluation)
 
     # Build prompt, dump metadata to strings
     human_written_metadata_str = json.dumps(human_structured_metadata.model_dump(), indent=2)
@@ -6,10 +6,10 @@
 import logging
 from typing import Any
 
-import boto3
-
 from image_captioning_assistant.data.data_classes import Bias, Biases, BiasLevel, BiasType, WorkBiasAnalysis
 from image_captioning_assistant.generate.bias_analysis.find_biases_in_short_work import find_biases_in_short_work
+from image_captioning_assistant.generate.utils import initialize_bedrock_runtime
+from image_captioning_assistant.monitoring.spans import metric_context
 
 logger = logging.getLogger(__name__)
 
@@ -51,17 +51,18 @@ def find_biases_in_images(
     """Find biases in an image."""
     logger.info(f"Analyzing {len(image_s3_uris)} images")
     page_biases = []
-    for image_s3_uri in image_s3_uris:
+    for page_number, image_s3_uri in enumerate(image_s3_uris, start=1):
         logger.debug(f"Analyzing image {image_s3_uri}")
         try:
-            llm_output = find_biases_in_short_work(
-                image_s3_uris=[image_s3_uri],  # one image
-                s3_kwargs=s3_kwargs,
-                llm_kwargs=llm_kwargs,
-                resize_kwargs=resize_kwargs,
-                work_context=work_context,
-                bedrock_runtime=bedrock_runtime,
-            )
+            with metric_context(page=page_number):
+                llm_output = find_biases_in_short_work(
+                    image_s3_uris=[image_s3_uri],  # one image
+                    s3_kwargs=s3_kwargs,
+                    llm_kwargs=llm_kwargs,
+                    resize_kwargs=resize_kwargs,
+                    work_context=work_context,
+                    bedrock_runtime=bedrock_runtime,
+                )
             page_biases.append(llm_output.page_biases[0])
         except Exception as exc:
             logger.warning(f"Failed to process {image_s3_uri}: {exc}")
@@ -80,10 +81,7 @@ def find_biases_in_long_work(
     work_context: str | None = None,
 ) -> WorkBiasAnalysis:
     """Find image and metadata biases independently."""
-    if "region_name" in llm_kwargs:
-        bedrock_runtime = boto3.client("bedrock-runtime", region_name=llm_kwargs["region_name"])
-    else:
-        bedrock_runtime = boto3.client("bedrock-runtime")
+    bedrock_runtime = initialize_bedrock_runtime(llm_kwargs)
     metadata_biases: Biases = Biases(biases=[])
     if original_metadata:
         metadata_biases.biases = find_biases_in_original_metadata(
@@ -14,6 +14,7 @@ from image_captioning_assistant.generate.bias_analysis.utils import (
     prepare_images,
 )
 from image_captioning_assistant.generate.utils import initialize_bedrock_runtime, needs_court_order
+from image_captioning_assistant.monitoring.spans import metric_context
 
 logger = logging.getLogger(__name__)
 
@@ -50,26 +51,27 @@ def find_biases_in_short_work(
 
     # Retry loop for robustness around structured metadata
     for attempt in range(5):
-        try:
-            # Call the model
-            llm_output = call_model(bedrock_runtime, model_name, messages, court_order)
+        with metric_context(attempt=attempt + 1):
+            try:
+                # Call the model
+                llm_output = call_model(bedrock_runtime, model_name, messages, court_order)
 
-            # Parse output and validate
-            cot, work_bias_analysis = parse_model_output(llm_output, len(image_s3_uris))
+                # Parse output and validate
+                cot, work_bias_analysis = parse_model_output(llm_output, len(image_s3_uris))
 
-            # Log chain of thought
-            logger.debug(f"\n\n********** CHAIN OF THOUGHT **********\n {cot} \n\n")
+                # Log chain of thought
+                logger.debug(f"\n\n********** CHAIN OF THOUGHT **********\n {cot} \n\n")
 
-            return work_bias_analysis
+                return work_bias_analysis
 
-        except Exception as e:
-            logger.warning(f"Attempt {attempt+1}/5 failed: {str(e)}")
-            if attempt == 4:
-                # need to raise exception that was thrown for debugging purposes
-                raise e
+            except Exception as e:
+                logger.warning(f"Attempt {attempt+1}/5 failed: {str(e)}")
+                if attempt == 4:
+                    # need to raise exception that was thrown for debugging purposes
+                    raise e
 
-            # Check if we need to use court order prompt
-            if needs_court_order(e, llm_output):
-                court_order = True
+                # Check if we need to use court order prompt
+                if needs_court_order(e, llm_output):
+                    court_order = True
 
     raise RuntimeError("Failed to parse model output after 5 attempts")
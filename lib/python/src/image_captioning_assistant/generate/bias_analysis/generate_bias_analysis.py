@@ -11,6 +11,7 @@ from image_captioning_assistant.aws.s3 import load_to_str
 from image_captioning_assistant.data.data_classes import WorkBiasAnalysis
 from image_captioning_assistant.generate.bias_analysis.find_biases_in_long_work import find_biases_in_long_work
 from image_captioning_assistant.generate.bias_analysis.find_biases_in_short_work import find_biases_in_short_work
+from image_captioning_assistant.monitoring.spans import S3_FETCH, span
 
 
 def generate_bias_analysis_from_s3_images(
@@ -30,22 +31,24 @@ def generate_bias_analysis_from_s3_images(
     if original_metadata_s3_uri:
         # Retrieve it from S3
         s3_path = S3Path(original_metadata_s3_uri)
-        original_metadata = load_to_str(
-            s3_bucket=s3_path.bucket,
-            s3_key=s3_path.key,
-            s3_client_kwargs=s3_kwargs,
-        )
+        with span(S3_FETCH):
+            original_metadata = load_to_str(
+                s3_bucket=s3_path.bucket,
+                s3_key=s3_path.key,
+                s3_client_kwargs=s3_kwargs,
+            )
 
     work_context = None
     # If context was provided
     if context_s3_uri:
         # Retrieve it from S3
         s3_path = S3Path(context_s3_uri)
-        work_context = load_to_str(
-            s3_bucket=s3_path.bucket,
-            s3_key=s3_path.key,
-            s3_client_kwargs=s3_kwargs,
-        )
+        with span(S3_FETCH):
+            work_context = load_to_str(
+                s3_bucket=s3_path.bucket,
+                s3_key=s3_path.key,
+                s3_client_kwargs=s3_kwargs,
+            )
 
     # If it's a short document, analyze metadata (if available) and image(s) all together
     if len(image_s3_uris) <= 2:
@@ -9,11 +9,14 @@ from typing import Any
 import image_captioning_assistant.generate.prompts as p
 from image_captioning_assistant.data.data_classes import WorkBiasAnalysis
 from image_captioning_assistant.generate.errors import LLMResponseParsingError
+from image_captioning_assistant.generate.model_profiles import ASSISTANT_PREFILL, get_model_profile
 from image_captioning_assistant.generate.utils import (
-    extract_json_and_cot_from_text,
     format_prompt_for_converse,
     load_and_resize_images,
+    parse_model_output_json,
 )
+from image_captioning_assistant.monitoring.spans import BEDROCK_CALL, PARSE_VALIDATE, PROMPT_RENDER, span
+from image_captioning_assistant.monitoring.usage import record_usage
 
 logger = logging.getLogger(__name__)
 
@@ -28,31 +31,30 @@ def prepare_images(
     if len(image_s3_uris) == 0:
         return []
 
-    # Adjust resize parameters for specific models
-    if "llama" in model_name:
-        resize_kwargs["max_dimension"] = 1024
-
-    return load_and_resize_images(image_s3_uris, s3_kwargs, resize_kwargs)
+    # Each page is sized and encoded for the model's image profile
+    return load_and_resize_images(image_s3_uris, s3_kwargs, resize_kwargs, model_name=model_name)
 
 
 def call_model(bedrock_runtime: Any, model_name: str, messages: list[dict[str, Any]], court_order: bool = False) -> str:
     """Call the model and return the output."""
     sys_prompt = p.system_prompt_court_order if court_order else p.system_prompt
 
-    response = bedrock_runtime.converse(
-        modelId=model_name,
-        messages=messages,
-        system=[{"text": sys_prompt}],
-        inferenceConfig={
-            "temperature": 0.1,
-            "maxTokens": 4000,
-            "topP": 0.6,
-        },
-    )
-
-    # Log token usage from the response
+    with span(BEDROCK_CALL, model=model_name):
+        response = bedrock_runtime.converse(
+            modelId=model_name,
+            messages=messages,
+            system=[{"text": sys_prompt}],
+            inferenceConfig={
+                "temperature": 0.1,
+                "maxTokens": 4000,
+                "topP": 0.6,
+            },
+        )
+
+    # Log token usage from the response and add it to the work's usage
     input_tokens = response["usage"]["inputTokens"]
     output_tokens = response["usage"]["outputTokens"]
+    record_usage(model_name, response["usage"])
 
     logger.info(f"Token usage - Input: {input_tokens}, Output: {output_tokens}")
 
@@ -61,13 +63,18 @@ def call_model(bedrock_runtime: Any, model_name: str, messages: list[dict[str, A
 
 def parse_model_output(llm_output: str, image_count: int) -> tuple[str, WorkBiasAnalysis]:
     """Parse the model output and validate the result."""
-    cot, json_dict = extract_json_and_cot_from_text(llm_output)
+    with span(PARSE_VALIDATE):
+        cot, work_bias_analysis = parse_model_output_json(llm_output, WorkBiasAnalysis)
 
-    # validate correct number of biases output
-    if image_count > 0 and image_count != len(json_dict["page_biases"]):
-        raise LLMResponseParsingError(f"incorrect number of bias lists for {image_count} pages")
+        # validate correct number of biases output
+        if image_count > 0 and image_count != len(work_bias_analysis.page_biases):
+            raise LLMResponseParsingError(
+                f"incorrect number of bias lists for {image_count} pages",
+                error_code="page_count_mismatch",
+                errors=[{"loc": ("page_biases",), "msg": f"{len(work_bias_analysis.page_biases)} bias lists"}],
+            )
 
-    return cot, WorkBiasAnalysis(**json_dict)
+        return cot, work_bias_analysis
 
 
 def create_messages(
@@ -77,18 +84,19 @@ def create_messages(
     model_name: str = "us.anthropic.claude-3-5-sonnet-20241022-v2:0",
 ) -> list[dict[str, Any]]:
     """Create Messages list to pass to LLM, supports Claude and Nova models."""
-    # Create system prompt
-    prompt = p.bias_analysis_template.render(
-        COT_TAG=p.COT_TAG,
-        COT_TAG_END=p.COT_TAG_END,
-        COT_TAG_NAME=p.COT_TAG_NAME,
-        work_context=work_context,
-        original_metadata=original_metadata,
-    )
-    logger.debug(f"PROMPT:\n```\n{prompt}\n```\n")
-    messages = format_prompt_for_converse(
-        prompt=prompt,
-        img_bytes_list=img_bytes_list,
-        assistant_start=(p.COT_TAG if "llama" not in model_name else None),
-    )
+    with span(PROMPT_RENDER):
+        # Create system prompt
+        prompt = p.bias_analysis_template.render(
+            COT_TAG=p.COT_TAG,
+            COT_TAG_END=p.COT_TAG_END,
+            COT_TAG_NAME=p.COT_TAG_NAME,
+            work_context=work_context,
+            original_metadata=original_metadata,
+        )
+        logger.debug(f"PROMPT:\n```\n{prompt}\n```\n")
+        messages = format_prompt_for_converse(
+            prompt=prompt,
+            img_bytes_list=img_bytes_list,
+            assistant_start=(p.COT_TAG if get_model_profile(model_name)[ASSISTANT_PREFILL] else None),
+        )
     return messages
@@ -0,0 +1,156 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""Thumbnail and preview derivatives of work images for the review UI."""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from io import BytesIO
+from typing import Any, IO
+
+from cloudpathlib import S3Path
+from PIL import features, Image
+
+from image_captioning_assistant.aws.s3 import upload_bytes
+from image_captioning_assistant.generate.pages import open_image, page_key, split_page_uri
+from image_captioning_assistant.generate.pixel_budget import admit_decode
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_PREFIX = "derivatives"
+THUMBNAIL = "thumbnail"
+PREVIEW = "preview"
+# Largest first, so that each derivative can be reduced from the previous one
+DERIVATIVE_MAX_DIMENSIONS = {
+    PREVIEW: 1024,
+    THUMBNAIL: 256,
+}
+DERIVATIVE_QUALITY = 80
+DERIVATIVE_FORMAT = "WEBP" if features.check("webp") else "JPEG"
+DERIVATIVE_EXTENSIONS = {"WEBP": "webp", "JPEG": "jpg"}
+DERIVATIVE_CONTENT_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg"}
+
+
+def derivative_s3_uri(image_s3_uri: str, derivative_name: str, derivative_format: str = DERIVATIVE_FORMAT) -> str:
+    """Return the deterministic S3 URI of an image's derivative.
+
+    s3://bucket/job/work/images/page_00001.jpg becomes
+    s3://bucket/derivatives/thumbnail/job/work/images/page_00001.jpg.webp, and page 3 of a document,
+    s3://bucket/job/work/scan.tif#page=3, becomes
+    s3://bucket/derivatives/thumbnail/job/work/scan_page_00003.tif.webp. The original extension is kept so that
+    page_1.jpg and page_1.png of one work have derivatives of their own.
+    """
+    s3_path = S3Path(split_page_uri(image_s3_uri)[0])
+    key = page_key(image_s3_uri)
+    key = key.with_name(f"{key.name}.{DERIVATIVE_EXTENSIONS[derivative_format]}")
+    return f"s3://{s3_path.bucket}/{DERIVATIVES_PREFIX}/{derivative_name}/{key}"
+
+
+def create_derivatives_from_image(image: Image.Image, derivative_format: str = DERIVATIVE_FORMAT) -> dict[str, bytes]:
+    """Decode an opened image once and encode each derivative size from it.
+
+    Args:
+        image (Image.Image): Image returned by Image.open, or a page of a document.
+        derivative_format (str): Pillow format of the derivatives.
+
+    Returns:
+        dict[str, bytes]: Encoded derivative per derivative name.
+    """
+    largest = max(DERIVATIVE_MAX_DIMENSIONS.values())
+    # Let JPEG decode at a reduced scale, which is far cheaper for large scans
+    image.draft("RGB", (largest, largest))
+    derivatives = {}
+    with admit_decode(image):
+        image = image.convert("RGB")
+
+        for derivative_name, max_dimension in DERIVATIVE_MAX_DIMENSIONS.items():
+            # Each size is reduced from the previous, smaller image rather than from the original
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            buffer = BytesIO()
+            image.save(buffer, format=derivative_format, quality=DERIVATIVE_QUALITY)
+            derivatives[derivative_name] = buffer.getvalue()
+    return derivatives
+
+
+def create_derivatives(image_bytes: bytes | IO[bytes], derivative_format: str = DERIVATIVE_FORMAT) -> dict[str, bytes]:
+    """Decode an image once and encode each derivative size from it.
+
+    Args:
+        image_bytes (bytes | IO[bytes]): Original image, or a file to decode it from.
+        derivative_format (str): Pillow format of the derivatives.
+
+    Returns:
+        dict[str, bytes]: Encoded derivative per derivative name.
+    """
+    image = Image.open(BytesIO(image_bytes) if isinstance(image_bytes, bytes) else image_bytes)
+    return create_derivatives_from_image(image, derivative_format=derivative_format)
+
+
+def create_and_upload_derivatives(image_s3_uri: str, s3_kwargs: dict[str, Any]) -> dict[str, str]:
+    """Create the derivatives of an image, or of a page of a document, and upload them under the derivatives prefix.
+
+    Returns:
+        dict[str, str]: Derivative S3 URI per derivative name.
+    """
+    with open_image(image_s3_uri, s3_kwargs, max_dimension=max(DERIVATIVE_MAX_DIMENSIONS.values())) as image:
+        derivatives = create_derivatives_from_image(image)
+    derivative_uris = {}
+    for derivative_name, derivative_bytes in derivatives.items():
+        derivative_uri = derivative_s3_uri(image_s3_uri, derivative_name)
+        derivative_path = S3Path(derivative_uri)
+        upload_bytes(
+            s3_bucket=derivative_path.bucket,
+            s3_key=derivative_path.key,
+            body=derivative_bytes,
+            s3_client_kwargs=s3_kwargs,
+            content_type=DERIVATIVE_CONTENT_TYPES[DERIVATIVE_FORMAT],
+        )
+        derivative_uris[derivative_name] = derivative_uri
+    return derivative_uris
+
+
+def create_and_upload_document_derivatives(image_s3_uris: list[str], s3_kwargs: dict[str, Any]) -> list[dict[str, str]]:
+    """Create and upload the derivatives of images in turn, such as the pages of one document, which share its file.
+
+    Returns:
+        list[dict[str, str]]: Derivative S3 URI per derivative name, per image.
+    """
+    return [create_and_upload_derivatives(image_s3_uri, s3_kwargs) for image_s3_uri in image_s3_uris]
+
+
+def generate_derivatives_from_s3_images(
+    image_s3_uris: list[str],
+    s3_kwargs: dict[str, Any],
+    max_workers: int = 4,
+) -> dict[str, list[str]]:
+    """Create and upload the derivatives of every page of a work.
+
+    Args:
+        image_s3_uris (list[str]): Work images and virtual page URIs, in page order.
+        s3_kwargs (dict[str, Any]): S3 client configuration.
+        max_workers (int): Images or documents processed concurrently.
+
+    Returns:
+        dict[str, list[str]]: Derivative S3 URIs per derivative name, in page order.
+    """
+    # Pages of one document are processed in turn by one thread, since they share the document's file
+    documents: dict[str, list[str]] = {}
+    for image_s3_uri in image_s3_uris:
+        documents.setdefault(split_page_uri(image_s3_uri)[0], []).append(image_s3_uri)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Each thread runs in a copy of this context, to share the documents cached for the work
+        futures = [
+            executor.submit(copy_context().run, create_and_upload_document_derivatives, uris, s3_kwargs)
+            for uris in documents.values()
+        ]
+        derivatives_by_uri = {
+            image_s3_uri: derivatives
+            for uris, future in zip(documents.values(), futures)
+            for image_s3_uri, derivatives in zip(uris, future.result())
+        }
+    page_derivatives = [derivatives_by_uri[image_s3_uri] for image_s3_uri in image_s3_uris]
+    return {
+        derivative_name: [derivatives[derivative_name] for derivatives in page_derivatives]
+        for derivative_name in DERIVATIVE_MAX_DIMENSIONS
+    }
@@ -3,14 +3,23 @@
 
 """Custom error classes."""
 
+from typing import Any
+
 
 class LLMResponseParsingError(Exception):
     """LLM response parsing error."""
 
-    def __init__(self, message: str, error_code: str | None = None):
-        """Initialize error."""
+    def __init__(self, message: str, error_code: str | None = None, errors: list[dict[str, Any]] | None = None):
+        """Initialize error.
+
+        Args:
+            message (str): Description of the error.
+            error_code (str, optional): Kind of error, such as json_invalid.
+            errors (list[dict[str, Any]], optional): Where the output failed to parse, for retry or repair logic.
+        """
         self.message = message
         self.error_code = error_code
+        self.errors = errors or []
         super().__init__(self.message)
 
     def __str__(self) -> str:
@@ -20,6 +20,7 @@ from image_captioning_assistant.generate.utils import (
     load_and_resize_images,
     needs_court_order,
 )
+from image_captioning_assistant.monitoring.spans import metric_context, S3_FETCH, span
 
 logger = logging.getLogger(__name__)
 
@@ -54,27 +55,28 @@ def generate_metadata_from_images(
 
     # Retry loop for robustness around structured metadata
     for attempt in range(5):
-        try:
-            # Prepare invocation parameters
-            invoke_params = prepare_model_invocation(
-                model_name=model_name,
-                img_bytes_list=img_bytes_list,
-                work_context=work_context,
-                court_order=court_order,
-            )
-
-            # Invoke model and process response
-            return invoke_model_and_process_response(bedrock_runtime, invoke_params)
-
-        except Exception as e:
-            logger.warning(f"Attempt {attempt+1}/5 failed: {str(type(e))} : {str(e)}")
-            if attempt == 4:
-                # Need to raise exception that was thrown for debugging purposes
-                raise e
-
-            # Check if we need to use court order in next attempt
-            if hasattr(locals(), "llm_output") and needs_court_order(e, llm_output):
-                court_order = True
+        with metric_context(attempt=attempt + 1):
+            try:
+                # Prepare invocation parameters
+                invoke_params = prepare_model_invocation(
+                    model_name=model_name,
+                    img_bytes_list=img_bytes_list,
+                    work_context=work_context,
+                    court_order=court_order,
+                )
+
+                # Invoke model and process response
+                return invoke_model_and_process_response(bedrock_runtime, invoke_params)
+
+            except Exception as e:
+                logger.warning(f"Attempt {attempt+1}/5 failed: {str(type(e))} : {str(e)}")
+                if attempt == 4:
+                    # Need to raise exception that was thrown for debugging purposes
+                    raise e
+
+                # Check if we need to use court order in next attempt
+                if hasattr(locals(), "llm_output") and needs_court_order(e, llm_output):
+                    court_order = True
 
     raise RuntimeError("Failed to parse model output after 5 attempts")
 
@@ -115,14 +117,15 @@ def generate_metadata_from_s3_images(
     work_context = None
     if context_s3_uri:
         s3_path = S3Path(context_s3_uri)
-        work_context = load_to_str(
-            s3_bucket=s3_path.bucket,
-            s3_key=s3_path.key,
-            s3_client_kwargs=s3_kwargs,
-        )
-
-    # Load and resize image bytes
-    img_bytes_list = load_and_resize_images(image_s3_uris, s3_kwargs, resize_kwargs)
+        with span(S3_FETCH):
+            work_context = load_to_str(
+                s3_bucket=s3_path.bucket,
+                s3_key=s3_path.key,
+                s3_client_kwargs=s3_kwargs,
+            )
+
+    # Load and resize image bytes for the model
+    img_bytes_list = load_and_resize_images(image_s3_uris, s3_kwargs, resize_kwargs, model_name=llm_kwargs["model_id"])
 
     # Generate metadata
     return generate_metadata_from_images(
@@ -8,7 +8,10 @@ from typing import Any
 
 import image_captioning_assistant.generate.prompts as p
 from image_captioning_assistant.data.data_classes import Metadata
-from image_captioning_assistant.generate.utils import extract_json_and_cot_from_text, format_prompt_for_converse
+from image_captioning_assistant.generate.model_profiles import ASSISTANT_PREFILL, get_model_profile
+from image_captioning_assistant.generate.utils import format_prompt_for_converse, parse_model_output_json
+from image_captioning_assistant.monitoring.spans import BEDROCK_CALL, PARSE_VALIDATE, PROMPT_RENDER, span
+from image_captioning_assistant.monitoring.usage import record_usage
 
 logger = logging.getLogger(__name__)
 
@@ -27,15 +30,16 @@ def prepare_model_invocation(
     Returns:
         dict: Prepared parameters for model invocation
     """
-    # Construct prompt
-    text_prompt = f"{p.user_prompt_metadata}\nContextual Help: {work_context}"
+    with span(PROMPT_RENDER):
+        # Construct prompt
+        text_prompt = f"{p.user_prompt_metadata}\nContextual Help: {work_context}"
 
-    # Format messages for API
-    messages = format_prompt_for_converse(
-        prompt=text_prompt,
-        img_bytes_list=img_bytes_list,
-        assistant_start=(p.COT_TAG if "llama" not in model_name else None),
-    )
+        # Format messages for API
+        messages = format_prompt_for_converse(
+            prompt=text_prompt,
+            img_bytes_list=img_bytes_list,
+            assistant_start=(p.COT_TAG if get_model_profile(model_name)[ASSISTANT_PREFILL] else None),
+        )
 
     # Create system instructions
     sys_prompt = p.system_prompt_court_order if court_order else p.system_prompt
@@ -67,17 +71,19 @@ def invoke_model_and_process_response(bedrock_runtime: Any, invoke_params: dict)
         ValidationError: If schema validation fails
     """
     # Invoke the model
-    response = bedrock_runtime.converse(**invoke_params)
+    with span(BEDROCK_CALL, model=invoke_params["modelId"]):
+        response = bedrock_runtime.converse(**invoke_params)
 
     input_tokens = response["usage"]["inputTokens"]
     output_tokens = response["usage"]["outputTokens"]
+    record_usage(invoke_params["modelId"], response["usage"])
     logger.info(f"Token usage - Input: {input_tokens}, Output: {output_tokens}")
 
     llm_output = response["output"]["message"]["content"][0]["text"]
 
-    # Parse output and extract metadata
-    cot, json_dict = extract_json_and_cot_from_text(llm_output)
-    logger.debug(f"\n\n********** CHAIN OF THOUGHT **********\n {cot} \n\n")
+    with span(PARSE_VALIDATE):
+        # Parse output and validate its JSON as structured metadata
+        cot, metadata = parse_model_output_json(llm_output, Metadata)
+        logger.debug(f"\n\n********** CHAIN OF THOUGHT **********\n {cot} \n\n")
 
-    # Validate and return structured metadata
-    return Metadata(**json_dict)
+        return metadata
@@ -0,0 +1,175 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""How each model takes images, to encode every page at the size that model makes use of.
+
+Image tokens dominate the input of a page, and models bill them in proportion to pixels, up to a size past which
+the model downscales the image itself. Each page is therefore sized to a target of image tokens for its model, but
+no smaller than a legibility floor if it is mostly text, and encoded to fit the Converse API's payload limit.
+
+Profiles are matched against model IDs by substring, the longest key winning, so inference profiles resolve. They
+can be overridden or added to with JSON in the MODEL_IMAGE_PROFILES environment variable, such as
+{"anthropic.claude": {"target_image_tokens": 800}}.
+"""
+
+import json
+import math
+import os
+from functools import cache
+from typing import Any
+
+from PIL import Image, ImageFilter
+
+# Longest side the model uses; larger images are downscaled by the model, so sending them only wastes bandwidth
+MAX_DIMENSION = "max_dimension"
+# Pixels per image token, approximately
+PIXELS_PER_TOKEN = "pixels_per_token"
+# Image tokens aimed for per page, or None to send pages at the largest size the model uses
+TARGET_IMAGE_TOKENS = "target_image_tokens"
+# Image tokens the model takes at most per page, which the legibility floor cannot exceed
+MAX_IMAGE_TOKENS = "max_image_tokens"
+# Longest side below which a page of text stops being legible to the model
+MIN_TEXT_DIMENSION = "min_text_dimension"
+# Largest encoded image the model accepts
+MAX_IMAGE_BYTES = "max_image_bytes"
+# JPEG quality to encode at, lowered down to MIN_JPEG_QUALITY if the image is too large
+JPEG_QUALITY = "jpeg_quality"
+MIN_JPEG_QUALITY = "min_jpeg_quality"
+# Converse image formats to try, and the least PSNR in dB of a lossy format and milliseconds to spend choosing
+IMAGE_FORMATS = "image_formats"
+MIN_PSNR_DB = "min_psnr_db"
+FORMAT_TIME_BUDGET_MS = "format_time_budget_ms"
+# Whether the model accepts the start of its answer as a final assistant message
+ASSISTANT_PREFILL = "assistant_prefill"
+
+# Images of the Converse API are limited to 3.75 MB each
+CONVERSE_MAX_IMAGE_BYTES = 3_750_000
+
+DEFAULT_MODEL_PROFILE = {
+    MAX_DIMENSION: 2048,
+    PIXELS_PER_TOKEN: 750,
+    TARGET_IMAGE_TOKENS: None,
+    MAX_IMAGE_TOKENS: None,
+    MIN_TEXT_DIMENSION: 1568,
+    MAX_IMAGE_BYTES: CONVERSE_MAX_IMAGE_BYTES,
+    JPEG_QUALITY: 95,
+    MIN_JPEG_QUALITY: 75,
+    IMAGE_FORMATS: ["jpeg", "png", "webp"],
+    MIN_PSNR_DB: 35,
+    FORMAT_TIME_BUDGET_MS: 250,
+    ASSISTANT_PREFILL: True,
+}
+DEFAULT_MODEL_PROFILES = {
+    # Claude downscales images past 1568 px or about 1600 tokens, at width * height / 750 tokens
+    "anthropic.claude": DEFAULT_MODEL_PROFILE
+    | {
+        MAX_DIMENSION: 1568,
+        TARGET_IMAGE_TOKENS: 1200,
+        MAX_IMAGE_TOKENS: 1600,
+        MIN_TEXT_DIMENSION: 1400,
+        JPEG_QUALITY: 90,
+    },
+    "amazon.nova": DEFAULT_MODEL_PROFILE
+    | {
+        TARGET_IMAGE_TOKENS: 1600,
+        MAX_IMAGE_TOKENS: 2800,
+        JPEG_QUALITY: 90,
+    },
+    # Llama 3.2 takes up to four tiles of 560 px, of 1601 tokens each, and does not accept prefilled answers
+    "meta.llama": DEFAULT_MODEL_PROFILE
+    | {
+        MAX_DIMENSION: 1024,
+        PIXELS_PER_TOKEN: 196,
+        TARGET_IMAGE_TOKENS: 4000,
+        MAX_IMAGE_TOKENS: 6404,
+        MIN_TEXT_DIMENSION: 1024,
+        JPEG_QUALITY: 90,
+        ASSISTANT_PREFILL: False,
+    },
+}
+MODEL_IMAGE_PROFILES_ENV_VAR = "MODEL_IMAGE_PROFILES"
+
+# A page is mostly text if most of it is an even background, some of it ink much darker than the background, and
+# enough of it edges, measured on a small grayscale copy
+TEXT_SAMPLE_DIMENSION = 512
+MIN_BACKGROUND_FRACTION = 0.5
+BACKGROUND_TOLERANCE = 24
+INK_CONTRAST = 64
+MIN_INK_FRACTION = 0.01
+EDGE_THRESHOLD = 48
+MIN_EDGE_FRACTION = 0.02
+
+
+@cache
+def load_model_profiles(profiles_json: str = "{}") -> dict[str, dict[str, Any]]:
+    """Return the profiles, with any set as JSON, such as from MODEL_IMAGE_PROFILES, overriding their fields."""
+    profiles = dict(DEFAULT_MODEL_PROFILES)
+    for key, overrides in json.loads(profiles_json).items():
+        profiles[key] = profiles.get(key, DEFAULT_MODEL_PROFILE) | overrides
+    return profiles
+
+
+def get_model_profile(model_id: str) -> dict[str, Any]:
+    """Find the profile of a model, preferring the longest matching key, or the default profile."""
+    profiles = load_model_profiles(os.environ.get(MODEL_IMAGE_PROFILES_ENV_VAR) or "{}")
+    matches = [key for key in profiles if key in model_id]
+    return profiles[max(matches, key=len)] if matches else DEFAULT_MODEL_PROFILE
+
+
+def estimate_image_tokens(width: int, height: int, profile: dict[str, Any]) -> int:
+    """Estimate the image tokens of an image of the given size."""
+    pixels_per_token: float = profile[PIXELS_PER_TOKEN]
+    return math.ceil(width * height / pixels_per_token)
+
+
+def is_text_heavy(image: Image.Image) -> bool:
+    """Whether an image is mostly text, such as a letter or a typed page, rather than a photograph or artwork."""
+    sample = image.convert("L")
+    sample.thumbnail((TEXT_SAMPLE_DIMENSION, TEXT_SAMPLE_DIMENSION))
+    histogram = sample.histogram()
+    pixels = sample.width * sample.height
+    background = max(range(256), key=histogram.__getitem__)
+    background_fraction = (
+        sum(histogram[max(background - BACKGROUND_TOLERANCE, 0) : background + BACKGROUND_TOLERANCE + 1]) / pixels
+    )
+    ink_fraction = sum(histogram[: max(background - INK_CONTRAST, 0)]) / pixels
+    edge_fraction = sum(sample.filter(ImageFilter.FIND_EDGES).histogram()[EDGE_THRESHOLD:]) / pixels
+    return (
+        background_fraction >= MIN_BACKGROUND_FRACTION
+        and ink_fraction >= MIN_INK_FRACTION
+        and edge_fraction >= MIN_EDGE_FRACTION
+    )
+
+
+def fit_dimension(
+    width: int, height: int, profile: dict[str, Any], text_heavy: bool = False, max_dimension: int | None = None
+) -> int:
+    """Choose the longest side to reduce an image to for a model, never enlarging it.
+
+    The image is reduced to the profile's target of image tokens, but a page of text is kept at the legibility
+    floor if the target is smaller, as long as it stays within the tokens the model takes.
+
+    Args:
+        width (int): Width of the image.
+        height (int): Height of the image.
+        profile (dict[str, Any]): Model profile.
+        text_heavy (bool): Whether the image is mostly text.
+        max_dimension (int, optional): Longest side allowed by the caller, on top of the model's.
+
+    Returns:
+        int: Longest side, in pixels.
+    """
+    longest = max(width, height)
+    limit: int = min(longest, profile[MAX_DIMENSION], max_dimension or longest)
+    target_tokens = profile[TARGET_IMAGE_TOKENS]
+    if target_tokens is None:
+        return limit
+
+    def longest_for(tokens: int) -> int:
+        return math.floor(longest * math.sqrt(tokens * profile[PIXELS_PER_TOKEN] / (width * height)))
+
+    dimension: int = min(limit, longest_for(target_tokens))
+    if text_heavy and dimension < profile[MIN_TEXT_DIMENSION]:
+        ceiling = longest_for(profile[MAX_IMAGE_TOKENS] or target_tokens)
+        dimension = min(limit, max(dimension, min(profile[MIN_TEXT_DIMENSION], ceiling)))
+    return max(dimension, 1)
@@ -0,0 +1,276 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""Expansion of multi-page TIFF and PDF documents into one virtual image URI per page.
+
+A page of a document is addressed as the document's URI with a page fragment, such as
+s3://bucket/job/work/scan.tif#page=3, so the pages feed into the pipeline like separate images. Pages are
+opened one at a time, seeking to a TIFF frame or rendering a PDF page at the size it is needed, so memory
+stays about constant whatever the number of pages.
+
+While cache_documents is active, each document is downloaded once, to a spooled temporary file, and shared
+by all its pages until the context exits. Otherwise every page downloads its document again.
+
+PDF support requires pypdfium2, from the 'pdf' extra.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager, ExitStack
+from contextvars import ContextVar
+from pathlib import PurePosixPath
+from typing import Any, IO, Iterator
+
+from cloudpathlib import S3Path
+from PIL import Image
+
+from image_captioning_assistant.aws.s3 import open_s3_object
+from image_captioning_assistant.generate.pixel_budget import get_pixel_budget
+
+logger = logging.getLogger(__name__)
+
+PAGE_FRAGMENT = "#page="
+TIFF_SUFFIXES = (".tif", ".tiff")
+PDF_SUFFIXES = (".pdf",)
+# Largest source object fetched; larger objects fail before any download
+MAX_SOURCE_OBJECT_BYTES = 1024 * 1024 * 1024
+# Size of the longest side of a rendered PDF page when the caller does not need it smaller
+DEFAULT_PDF_MAX_DIMENSION = 2048
+
+_documents: ContextVar["DocumentCache | None"] = ContextVar("documents", default=None)
+# PDFium may not be called from several threads at once
+_pdfium_lock = threading.Lock()
+
+
+def page_uri(document_uri: str, page_number: int) -> str:
+    """Return the virtual URI of a page of a document, numbered from 1."""
+    return f"{document_uri}{PAGE_FRAGMENT}{page_number}"
+
+
+def split_page_uri(image_uri: str) -> tuple[str, int | None]:
+    """Split a virtual page URI into its document URI and page number, which is None for a plain image URI."""
+    document_uri, fragment, page_number = image_uri.rpartition(PAGE_FRAGMENT)
+    if not fragment or not page_number.isdigit():
+        return image_uri, None
+    return document_uri, int(page_number)
+
+
+def is_tiff(uri: str) -> bool:
+    """Whether a URI names a TIFF, which may hold several pages."""
+    return uri.lower().endswith(TIFF_SUFFIXES)
+
+
+def is_pdf(uri: str) -> bool:
+    """Whether a URI names a PDF."""
+    return uri.lower().endswith(PDF_SUFFIXES)
+
+
+def import_pdfium() -> Any:
+    """Import pypdfium2, which is optional.
+
+    Raises:
+        ImportError: If pypdfium2, from the 'pdf' extra, is not installed.
+    """
+    try:
+        import pypdfium2
+    except ImportError as exc:
+        raise ImportError("PDF documents require pypdfium2: pip install 'image-captioning-assistant[pdf]'") from exc
+    return pypdfium2
+
+
+class DocumentCache:
+    """Documents downloaded while processing a work, kept open for the pages that follow."""
+
+    def __init__(self, s3_kwargs: dict[str, Any]) -> None:
+        """Initialize an empty cache.
+
+        Args:
+            s3_kwargs (dict[str, Any]): S3 client configuration used to download documents.
+        """
+        self.s3_kwargs = s3_kwargs
+        self._files: dict[str, IO[bytes]] = {}
+        self._exit_stack = ExitStack()
+        self._lock = threading.Lock()
+
+    def get(self, document_uri: str) -> IO[bytes]:
+        """Return a document's file, downloading it on first use."""
+        with self._lock:
+            if document_uri not in self._files:
+                s3_path = S3Path(document_uri)
+                self._files[document_uri] = self._exit_stack.enter_context(
+                    open_s3_object(
+                        s3_bucket=s3_path.bucket,
+                        s3_key=s3_path.key,
+                        s3_client_kwargs=self.s3_kwargs,
+                        max_bytes=MAX_SOURCE_OBJECT_BYTES,
+                    )
+                )
+            return self._files[document_uri]
+
+    def close(self) -> None:
+        """Close every document, removing the files spooled to disk."""
+        with self._lock:
+            self._files.clear()
+            self._exit_stack.close()
+
+
+@contextmanager
+def cache_documents(s3_kwargs: dict[str, Any]) -> Iterator[DocumentCache]:
+    """Download each document once for all its pages in the enclosed code, such as while processing a work."""
+    document_cache = DocumentCache(s3_kwargs)
+    token = _documents.set(document_cache)
+    try:
+        yield document_cache
+    finally:
+        _documents.reset(token)
+        document_cache.close()
+
+
+@contextmanager
+def open_document(document_uri: str, s3_kwargs: dict[str, Any]) -> Iterator[IO[bytes]]:
+    """Open a document's file, from the active cache if any.
+
+    Pages of one document must be read in turn, since they share the file's position.
+    """
+    document_cache = _documents.get()
+    if document_cache is not None:
+        yield document_cache.get(document_uri)
+        return
+    s3_path = S3Path(document_uri)
+    with open_s3_object(
+        s3_bucket=s3_path.bucket, s3_key=s3_path.key, s3_client_kwargs=s3_kwargs, max_bytes=MAX_SOURCE_OBJECT_BYTES
+    ) as document_file:
+        yield document_file
+
+
+def count_pages(document_file: IO[bytes], document_uri: str) -> int:
+    """Count the pages of a TIFF or PDF, reading only the TIFF's directories or the PDF's page tree."""
+    if is_pdf(document_uri):
+        pdfium = import_pdfium()
+        with _pdfium_lock:
+            document_file.seek(0)
+            pdf = pdfium.PdfDocument(document_file)
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+    with Image.open(document_file) as image:
+        return getattr(image, "n_frames", 1)
+
+
+@contextmanager
+def open_page(
+    document_file: IO[bytes], document_uri: str, page_number: int, max_dimension: int | None = None
+) -> Iterator[Image.Image]:
+    """Open one page of a document as an image.
+
+    A TIFF frame is sought to but not decoded, so callers can decode it within the pixel budget. A PDF page is
+    rendered so that its longest side is max_dimension, within the budget, since PDFs have no pixels to decode.
+
+    Args:
+        document_file (IO[bytes]): The document.
+        document_uri (str): URI of the document, whose suffix tells its format.
+        page_number (int): Page number, from 1.
+        max_dimension (int, optional): Longest side needed, for PDF pages.
+    """
+    if is_pdf(document_uri):
+        pdfium = import_pdfium()
+        max_dimension = max_dimension or DEFAULT_PDF_MAX_DIMENSION
+        with _pdfium_lock:
+            document_file.seek(0)
+            pdf = pdfium.PdfDocument(document_file)
+            try:
+                page = pdf[page_number - 1]
+                width, height = page.get_size()
+                scale = max_dimension / max(width, height)
+                with get_pixel_budget().admit(round(width * scale) * round(height * scale)):
+                    image = page.render(scale=scale).to_pil()
+                page.close()
+            finally:
+                pdf.close()
+        yield image
+        return
+
+    with Image.open(document_file) as image:
+        image.seek(page_number - 1)
+        yield image
+
+
+@contextmanager
+def open_image(image_uri: str, s3_kwargs: dict[str, Any], max_dimension: int | None = None) -> Iterator[Image.Image]:
+    """Open the image of a URI, or one page of a document for a virtual page URI, without decoding it if possible.
+
+    Args:
+        image_uri (str): S3 URI of an image, or a virtual page URI.
+        s3_kwargs (dict[str, Any]): S3 client configuration.
+        max_dimension (int, optional): Longest side needed, for PDF pages.
+    """
+    document_uri, page_number = split_page_uri(image_uri)
+    if page_number is not None:
+        with open_document(document_uri, s3_kwargs) as document_file:
+            with open_page(document_file, document_uri, page_number, max_dimension) as image:
+                yield image
+        return
+
+    s3_path = S3Path(image_uri)
+    with open_s3_object(
+        s3_bucket=s3_path.bucket, s3_key=s3_path.key, s3_client_kwargs=s3_kwargs, max_bytes=MAX_SOURCE_OBJECT_BYTES
+    ) as image_file:
+        with Image.open(image_file) as image:
+            yield image
+
+
+def iter_pages(
+    document_uri: str, s3_kwargs: dict[str, Any], max_dimension: int | None = None
+) -> Iterator[tuple[str, Image.Image]]:
+    """Open each page of a document in turn, with its virtual page URI.
+
+    Each image is only valid until the next one is yielded.
+    """
+    with open_document(document_uri, s3_kwargs) as document_file:
+        for page_number in range(1, count_pages(document_file, document_uri) + 1):
+            with open_page(document_file, document_uri, page_number, max_dimension) as image:
+                yield page_uri(document_uri, page_number), image
+
+
+def expand_image_s3_uris(image_s3_uris: list[str], s3_kwargs: dict[str, Any]) -> list[str]:
+    """Replace each multi-page TIFF and each PDF with the virtual URIs of its pages, keeping other URIs.
+
+    Args:
+        image_s3_uris (list[str]): S3 URIs of a work's images, in page order.
+        s3_kwargs (dict[str, Any]): S3 client configuration.
+
+    Returns:
+        list[str]: Image and virtual page URIs, in page order.
+    """
+    page_uris = []
+    for image_s3_uri in image_s3_uris:
+        if not (is_tiff(image_s3_uri) or is_pdf(image_s3_uri)):
+            page_uris.append(image_s3_uri)
+            continue
+        with open_document(image_s3_uri, s3_kwargs) as document_file:
+            page_count = count_pages(document_file, image_s3_uri)
+        # A single-page TIFF is an ordinary image, but Pillow cannot open a PDF
+        if page_count == 1 and not is_pdf(image_s3_uri):
+            page_uris.append(image_s3_uri)
+            continue
+        logger.info(f"Expanded {image_s3_uri} into {page_count} pages")
+        page_uris.extend(page_uri(image_s3_uri, page_number) for page_number in range(1, page_count + 1))
+    return page_uris
+
+
+def first_page_uris(page_uris: list[str]) -> list[str]:
+    """Keep the first page of each expanded document, and every other image, in page order."""
+    first_pages: dict[str, str] = {}
+    for image_uri in page_uris:
+        first_pages.setdefault(split_page_uri(image_uri)[0], image_uri)
+    return list(first_pages.values())
+
+
+def page_key(image_uri: str) -> PurePosixPath:
+    """Return an S3 key naming an image or a page of a document, such as job/work/scan_page_00003.tif."""
+    document_uri, page_number = split_page_uri(image_uri)
+    key = PurePosixPath(S3Path(document_uri).key)
+    if page_number is None:
+        return key
+    return key.with_name(f"{key.stem}_page_{page_number:05d}{key.suffix}")
@@ -0,0 +1,116 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""Admission control of image decodes by pixel count, so concurrent decodes of large scans cannot exhaust memory.
+
+Decoding an image needs memory in proportion to its pixels: Pillow holds RGB images at 4 bytes per pixel, and
+converting one holds two copies, so a 12,000 x 9,000 scan takes over 800 MB. Decodes are admitted against a
+process-wide budget of pixels, using the dimensions declared in the image header, read before the full decode.
+An image larger than the whole budget is admitted alone rather than refused.
+
+The budget is set in pixels by the PIXEL_BUDGET environment variable or configure_pixel_budget.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+PIXEL_BUDGET_ENV_VAR = "PIXEL_BUDGET"
+# About 800 MB of decoded images at once, leaving room for the rest of a 2 GB task
+DEFAULT_PIXEL_BUDGET = 100_000_000
+
+
+class PixelBudget:
+    """A counting semaphore of pixels being decoded."""
+
+    def __init__(self, max_pixels: int) -> None:
+        """Initialize the budget.
+
+        Args:
+            max_pixels (int): Pixels that may be decoded at once.
+        """
+        self.max_pixels = max_pixels
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.waits = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, pixels: int) -> float:
+        """Wait until the pixels fit in the budget, or nothing else is being decoded, and take them.
+
+        Returns:
+            float: Seconds waited.
+        """
+        started = time.perf_counter()
+        with self._condition:
+            if self.in_use and self.in_use + pixels > self.max_pixels:
+                self.waits += 1
+                self._condition.wait_for(lambda: not self.in_use or self.in_use + pixels <= self.max_pixels)
+            self.in_use += pixels
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+        return time.perf_counter() - started
+
+    def release(self, pixels: int) -> None:
+        """Return pixels to the budget."""
+        with self._condition:
+            self.in_use -= pixels
+            self._condition.notify_all()
+
+    @contextmanager
+    def admit(self, pixels: int) -> Iterator[None]:
+        """Hold pixels of the budget while the enclosed code decodes an image."""
+        waited = self.acquire(pixels)
+        if waited > 0.001:
+            logger.debug(f"Waited {waited:.3f}s to decode {pixels} pixels")
+        try:
+            yield
+        finally:
+            self.release(pixels)
+
+    def reset_stats(self) -> None:
+        """Start counting the peak and waits over again, such as for each work."""
+        with self._condition:
+            self.peak_in_use = self.in_use
+            self.waits = 0
+
+    def stats(self) -> dict[str, int]:
+        """Budget, pixels in use now and at most so far, and number of decodes that had to wait."""
+        with self._condition:
+            return {
+                "max_pixels": self.max_pixels,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "waits": self.waits,
+            }
+
+
+_pixel_budget = PixelBudget(int(os.environ.get(PIXEL_BUDGET_ENV_VAR) or DEFAULT_PIXEL_BUDGET))
+
+
+def configure_pixel_budget(max_pixels: int) -> None:
+    """Replace the process-wide budget, for decodes started from now on."""
+    global _pixel_budget
+    _pixel_budget = PixelBudget(max_pixels)
+
+
+def get_pixel_budget() -> PixelBudget:
+    """Return the process-wide budget."""
+    return _pixel_budget
+
+
+@contextmanager
+def admit_decode(image: Image.Image) -> Iterator[None]:
+    """Hold the pixels an opened, not yet decoded, image declares while the enclosed code decodes it.
+
+    Args:
+        image (Image.Image): Image returned by Image.open, after any draft, so its size is as it will decode.
+    """
+    with get_pixel_budget().admit(image.width * image.height):
+        yield
@@ -0,0 +1,117 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""Preprocessing of scans before they are encoded for a model: cropping empty borders and detecting grayscale.
+
+Archival scans often include the scanner bed around the page, and many are grayscale saved as color. Cropping
+the bed and encoding grayscale pages with a single channel sends fewer pixels and bytes for the same content.
+
+Both are measured on a small sample of the image, with NumPy: the bed is the run of rows and columns from each
+edge whose pixels match the edge's color, and an image is grayscale if almost none of its pixels differ across
+channels.
+"""
+
+import math
+
+import numpy as np
+from PIL import Image
+
+# Longest side of the sample that borders and color are measured on, whatever size the image was decoded at
+SAMPLE_DIMENSION = 512
+# Largest difference in gray level from the bed's color, the median of the outermost row or column, of a bed pixel
+BED_TOLERANCE = 16
+# Fraction of a row's or column's pixels that must match the bed's color for it to be bed, allowing for dust
+BED_MATCH_FRACTION = 0.98
+# Margin kept around the content, as a fraction of each side
+CROP_MARGIN = 0.01
+# Fraction of the image the content must cover to be cropped to, so a mostly blank page is left whole
+MIN_CONTENT_FRACTION = 0.05
+# Difference between channels above which a pixel is colored, and fraction of colored pixels of a color image
+GRAYSCALE_CHROMA = 12
+MAX_COLOR_FRACTION = 0.005
+
+
+def sample_image(image: Image.Image, mode: str) -> tuple[np.ndarray, float]:
+    """Reduce an image to SAMPLE_DIMENSION on its longest side, returning its pixels and the scale of the sample.
+
+    The sample has the same size however the image was decoded, such as at a JPEG draft scale, so that
+    measurements do not depend on it.
+    """
+    width, height = image.size
+    scale = min(1.0, SAMPLE_DIMENSION / max(width, height))
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    # Reduce by an integer factor first, which is fast, to no smaller than the sample
+    factor = max(1, max(width, height) // SAMPLE_DIMENSION)
+    sample = (image.reduce(factor) if factor > 1 else image).convert(mode)
+    if sample.size != size:
+        sample = sample.resize(size, Image.Resampling.BOX)
+    return np.asarray(sample, dtype=np.float32), scale
+
+
+def bed_run(lines: np.ndarray) -> int:
+    """Count the rows or columns, from the image edge inward, whose pixels match the color of the outermost one."""
+    bed_color = np.median(lines[0])
+    matching = np.mean(np.abs(lines - bed_color) <= BED_TOLERANCE, axis=1) >= BED_MATCH_FRACTION
+    mismatches = np.flatnonzero(~matching)
+    return int(mismatches[0]) if mismatches.size else len(lines)
+
+
+def find_content_box(image: Image.Image) -> tuple[int, int, int, int]:
+    """Find the box of an image within the scanner bed around it, an even run of color from each edge.
+
+    Returns:
+        tuple[int, int, int, int]: Left, top, right and bottom of the content with a margin, or of the whole image.
+    """
+    width, height = image.size
+    pixels, scale = sample_image(image, "L")
+    sample_height, sample_width = pixels.shape
+    left = bed_run(pixels.T)
+    right = sample_width - bed_run(pixels.T[::-1])
+    if left >= right:
+        return 0, 0, width, height
+    # Rows are measured within the content's columns, so that the bed at the sides does not count as content
+    content_columns = pixels[:, left:right]
+    top = bed_run(content_columns)
+    bottom = sample_height - bed_run(content_columns[::-1])
+    if top >= bottom:
+        return 0, 0, width, height
+
+    # One sample pixel spans 1 / scale pixels of the image
+    margin_x = math.ceil(1 / scale) + round(width * CROP_MARGIN)
+    margin_y = math.ceil(1 / scale) + round(height * CROP_MARGIN)
+    box = (
+        max(int(left / scale) - margin_x, 0),
+        max(int(top / scale) - margin_y, 0),
+        min(math.ceil(right / scale) + margin_x, width),
+        min(math.ceil(bottom / scale) + margin_y, height),
+    )
+    if (box[2] - box[0]) * (box[3] - box[1]) < width * height * MIN_CONTENT_FRACTION:
+        return 0, 0, width, height
+    return box
+
+
+def is_grayscale(image: Image.Image) -> bool:
+    """Whether an image is grayscale, if saved as color, with at most a few colored pixels such as noise."""
+    if image.mode in ("1", "L", "LA", "I", "I;16", "F"):
+        return True
+    pixels, _ = sample_image(image, "RGB")
+    chroma = pixels.max(axis=2) - pixels.min(axis=2)
+    return float(np.mean(chroma > GRAYSCALE_CHROMA)) <= MAX_COLOR_FRACTION
+
+
+def preprocess_image(image: Image.Image) -> tuple[Image.Image, bool]:
+    """Crop an image's borders and convert it to grayscale if it has no color.
+
+    Args:
+        image (Image.Image): Decoded image.
+
+    Returns:
+        tuple[Image.Image, bool]: The cropped image, and whether it is grayscale.
+    """
+    box = find_content_box(image)
+    if box != (0, 0, image.width, image.height):
+        image = image.crop(box)
+    grayscale = is_grayscale(image)
+    if grayscale and image.mode != "L":
+        image = image.convert("L")
+    return image, grayscale
@@ -5,56 +5,186 @@
 
 import json
 import logging
+from contextlib import ExitStack
 from io import BytesIO
-from typing import Any
+from typing import Any, IO, TypeVar
 
 import boto3
-from cloudpathlib import S3Path
 from PIL import Image
+from pydantic import TypeAdapter
 from pydantic_core import ValidationError
 from retry import retry
 
-from image_captioning_assistant.aws.s3 import load_to_bytes
+from image_captioning_assistant.aws.bedrock_recording import wrap_bedrock_runtime
 from image_captioning_assistant.generate import prompts as p
+from image_captioning_assistant.generate.encoding import (
+    apply_palette,
+    choose_format,
+    detect_image_format,
+    encode_image,
+    find_palette,
+    JPEG,
+    LOSSLESS_FORMATS,
+)
 from image_captioning_assistant.generate.errors import LLMResponseParsingError
+from image_captioning_assistant.generate.model_profiles import (
+    estimate_image_tokens,
+    fit_dimension,
+    FORMAT_TIME_BUDGET_MS,
+    get_model_profile,
+    IMAGE_FORMATS,
+    is_text_heavy,
+    JPEG_QUALITY,
+    MAX_DIMENSION,
+    MAX_IMAGE_BYTES,
+    MIN_JPEG_QUALITY,
+    MIN_PSNR_DB,
+)
+from image_captioning_assistant.generate.pages import open_image
+from image_captioning_assistant.generate.pixel_budget import admit_decode
+from image_captioning_assistant.generate.preprocess import preprocess_image
+from image_captioning_assistant.monitoring.images import record_image
+from image_captioning_assistant.monitoring.spans import DECODE_RESIZE, S3_FETCH, span
 
 logger = logging.getLogger(__name__)
 
+ModelType = TypeVar("ModelType")
+# Steps by which an image too large for its model is encoded at lower quality, then made smaller
+JPEG_QUALITY_STEP = 10
+DIMENSION_STEP = 0.8
+# TypeAdapters by the type they validate
+_type_adapters: dict[Any, TypeAdapter] = {}
 
-def convert_and_reduce_image(image_bytes: bytes, max_dimension: int = 2048, jpeg_quality: int = 95) -> bytes:
-    """Convert and reduce size of image."""
-    # Open image and convert to RGB (removes alpha channel if present)
-    image = Image.open(BytesIO(image_bytes)).convert("RGB")
 
-    # Set maximum dimensions while maintaining aspect ratio
-    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+def reduce_image(image: Image.Image, max_dimension: int = 2048, jpeg_quality: int = 95) -> bytes:
+    """Decode an opened image within the decode budget, reduce its size and encode it as JPEG."""
+    with admit_decode(image):
+        # Convert to RGB (removes alpha channel if present)
+        image = image.convert("RGB")
 
-    # Optimize JPEG quality and save to buffer
-    buffer = BytesIO()
-    image.save(
-        buffer, format="JPEG", quality=jpeg_quality, optimize=True  # Adjust between 75-95 for quality/size balance
-    )
+        # Set maximum dimensions while maintaining aspect ratio
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+        # Optimize JPEG quality and save to buffer
+        buffer = BytesIO()
+        image.save(
+            buffer, format="JPEG", quality=jpeg_quality, optimize=True  # Adjust between 75-95 for quality/size balance
+        )
 
     buffer.seek(0)
     return buffer.read()
 
 
+def convert_and_reduce_image(
+    image_bytes: bytes | IO[bytes], max_dimension: int = 2048, jpeg_quality: int = 95
+) -> bytes:
+    """Convert and reduce size of image, given as bytes or as a file to decode from."""
+    # Open image, reading only its header, and wait for its pixels to fit the decode budget
+    image = Image.open(BytesIO(image_bytes) if isinstance(image_bytes, bytes) else image_bytes)
+    return reduce_image(image, max_dimension=max_dimension, jpeg_quality=jpeg_quality)
+
+
+def encode_image_for_model(
+    image: Image.Image, model_name: str, max_dimension: int | None = None, jpeg_quality: int | None = None
+) -> tuple[bytes, dict[str, Any]]:
+    """Decode an opened image within the decode budget and encode it at the size its model makes use of.
+
+    Empty borders are cropped and grayscale images encoded with a single channel. The image is then reduced to the
+    model's target of image tokens, or kept at its legibility floor if mostly text. It is encoded in the smallest
+    of the model's formats that is faithful enough, then at lower quality and smaller until it fits the model's
+    payload limit.
+
+    Args:
+        image (Image.Image): Image returned by Image.open, or a page of a document.
+        model_name (str): Model ID, whose profile sets the size and quality.
+        max_dimension (int, optional): Longest side allowed, on top of the model's.
+        jpeg_quality (int, optional): Quality of lossy formats allowed at most, on top of the model's.
+
+    Returns:
+        tuple[bytes, dict[str, Any]]: The encoded image, and its sizes before and after each step, with the
+            sizes of each format tried.
+    """
+    profile = get_model_profile(model_name)
+    sizes: dict[str, Any] = {"source_width": image.width, "source_height": image.height}
+    largest = min(profile[MAX_DIMENSION], max_dimension or profile[MAX_DIMENSION])
+    # Let JPEG decode at a reduced scale, no smaller than the largest size the model uses
+    image.draft("RGB", (largest, largest))
+    with admit_decode(image):
+        image = image.convert("RGB")
+        # Crop before reducing, so that the largest size the model uses is spent on the content
+        scale = sizes["source_width"] / image.width
+        image, grayscale = preprocess_image(image)
+        # The content's size in source pixels, to compare with the source
+        sizes |= {
+            "cropped_width": round(image.width * scale),
+            "cropped_height": round(image.height * scale),
+            "grayscale": grayscale,
+        }
+        palette = find_palette(image)
+        image.thumbnail((largest, largest), Image.LANCZOS)
+        text_heavy = is_text_heavy(image)
+        dimension = fit_dimension(image.width, image.height, profile, text_heavy=text_heavy)
+        image.thumbnail((dimension, dimension), Image.LANCZOS)
+        if palette is not None:
+            # Keep the few colors of line art and bitonal scans, so that they encode as exact, small PNG
+            image = apply_palette(image, palette)
+
+        quality = min(profile[JPEG_QUALITY], jpeg_quality or profile[JPEG_QUALITY])
+        image_format, encoded, format_stats = choose_format(
+            image,
+            profile[IMAGE_FORMATS],
+            quality,
+            min_psnr_db=profile[MIN_PSNR_DB],
+            time_budget_ms=profile[FORMAT_TIME_BUDGET_MS],
+        )
+        while len(encoded) > profile[MAX_IMAGE_BYTES]:
+            if image_format in LOSSLESS_FORMATS:
+                image_format = JPEG
+            elif quality > profile[MIN_JPEG_QUALITY]:
+                quality = max(quality - JPEG_QUALITY_STEP, profile[MIN_JPEG_QUALITY])
+            else:
+                dimension = round(max(image.size) * DIMENSION_STEP)
+                image.thumbnail((dimension, dimension), Image.LANCZOS)
+            encoded = encode_image(image, image_format, quality)
+
+    sizes |= {
+        "text": text_heavy,
+        "width": image.width,
+        "height": image.height,
+        "format": image_format,
+        "quality": quality,
+        "bytes": len(encoded),
+        "image_tokens": estimate_image_tokens(image.width, image.height, profile),
+        "formats": format_stats,
+    }
+    logger.info(f"Encoded image: {sizes}")
+    return encoded, sizes
+
+
 def load_and_resize_image(
     image_s3_uri: str,
     s3_kwargs: dict[str, Any],
     resize_kwargs: dict[str, Any],
+    model_name: str | None = None,
 ) -> bytes:
-    """Load and resize image."""
-    s3_path = S3Path(image_s3_uri)
-    img_bytes = load_to_bytes(
-        s3_bucket=s3_path.bucket,
-        s3_key=s3_path.key,
-        s3_client_kwargs=s3_kwargs,
-    )
-    resized_image = convert_and_reduce_image(
-        image_bytes=img_bytes,
-        **resize_kwargs,
-    )
+    """Load and resize an image, or a page of a document, decoding it from a temporary file rather than bytes.
+
+    With a model name, the image is sized and encoded for that model, within the limits of resize_kwargs.
+    """
+    max_dimension = resize_kwargs.get("max_dimension")
+    if model_name is not None:
+        model_max_dimension = get_model_profile(model_name)[MAX_DIMENSION]
+        max_dimension = min(model_max_dimension, max_dimension or model_max_dimension)
+    with ExitStack() as stack:
+        # Opening a PDF page renders it, at the size it is reduced to
+        with span(S3_FETCH):
+            image = stack.enter_context(open_image(image_s3_uri, s3_kwargs, max_dimension=max_dimension))
+        with span(DECODE_RESIZE):
+            if model_name is not None:
+                resized_image, sizes = encode_image_for_model(image, model_name, **resize_kwargs)
+                record_image(image_s3_uri, sizes)
+            else:
+                resized_image = reduce_image(image, **resize_kwargs)
     return resized_image
 
 
@@ -62,8 +192,9 @@ def load_and_resize_images(
     image_s3_uris: list[str],
     s3_kwargs: dict[str, Any],
     resize_kwargs: dict[str, Any],
+    model_name: str | None = None,
 ) -> list[bytes]:
-    """Load and resize images."""
+    """Load and resize images, for a model if given."""
     # Load all img bytes into list
     resized_img_bytes_list = []
     for image_s3_uri in image_s3_uris:
@@ -71,6 +202,7 @@ def load_and_resize_images(
             image_s3_uri=image_s3_uri,
             s3_kwargs=s3_kwargs,
             resize_kwargs=resize_kwargs,
+            model_name=model_name,
         )
         resized_img_bytes_list.append(resized_img_bytes)
     return resized_img_bytes_list
@@ -92,7 +224,7 @@ def format_prompt_for_converse(
 
     Args:
         prompt (str): Text prompt for model
-        img_bytes_list (list[bytes]): Image(s) for model
+        img_bytes_list (list[bytes]): Image(s) for model, in any format the API accepts
 
     Returns:
         list[dict]: Prompt formatted for Bedrock Converse API.
@@ -101,7 +233,7 @@ def format_prompt_for_converse(
     for img_bytes in img_bytes_list:
         img_message = {
             "image": {
-                "format": "jpeg",
+                "format": detect_image_format(img_bytes),
                 "source": {"bytes": img_bytes},
             }
         }
@@ -123,6 +255,60 @@ def extract_json_and_cot_from_text(text: str) -> tuple:
         raise LLMResponseParsingError("Could not parse and decode JSON output")
 
 
+def get_type_adapter(model_type: Any) -> TypeAdapter:
+    """Return a TypeAdapter for a type, built once since building its validator is costly."""
+    adapter = _type_adapters.get(model_type)
+    if adapter is None:
+        # Threads building the same adapter at once all get the first one stored
+        adapter = _type_adapters.setdefault(model_type, TypeAdapter(model_type))
+    return adapter
+
+
+def format_error_location(loc: tuple[int | str, ...]) -> str:
+    """Format a pydantic error location as a path, such as page_biases[3].biases[0].type."""
+    path = ""
+    for part in loc:
+        path += f"[{part}]" if isinstance(part, int) else f".{part}" if path else str(part)
+    return path
+
+
+def parse_model_output_json(text: str, model_type: type[ModelType]) -> tuple[str, ModelType]:
+    """Split a model output into its chain-of-thought and result, validating the result's JSON directly.
+
+    Args:
+        text (str): Model output, with the chain-of-thought before COT_TAG_END and the result's JSON after it.
+        model_type (type): Pydantic model, or any type pydantic validates, of the result.
+
+    Returns:
+        tuple[str, ModelType]: The chain-of-thought and the validated result.
+
+    Raises:
+        LLMResponseParsingError: If the output has no chain-of-thought end tag or its JSON is malformed, with the
+            line, column and offset into the output of a JSON syntax error.
+        ValidationError: If the JSON does not match the model, with the location of each mismatch.
+    """
+    cot, tag_end, json_text = text.rpartition(p.COT_TAG_END)
+    if not tag_end:
+        raise LLMResponseParsingError(f"No {p.COT_TAG_END} tag in output", error_code="missing_cot_tag")
+    try:
+        result = get_type_adapter(model_type).validate_json(json_text)
+    except ValidationError as e:
+        errors: list[dict[str, Any]] = [dict(error) for error in e.errors(include_url=False, include_input=False)]
+        if any(error["type"] == "json_invalid" for error in errors):
+            json_offset = len(cot) + len(tag_end)
+            errors = [error | {"json_offset": json_offset} for error in errors]
+            logger.warning(f"Could not parse JSON starting at offset {json_offset}: {errors[0]['msg']}")
+            raise LLMResponseParsingError(
+                f"Could not parse and decode JSON output: {errors[0]['msg']}", error_code="json_invalid", errors=errors
+            ) from e
+        logger.warning(
+            f"Output does not match {getattr(model_type, '__name__', model_type)} at "
+            + "; ".join(f"{format_error_location(error['loc'])}: {error['msg']}" for error in errors)
+        )
+        raise
+    return cot.replace(p.COT_TAG, ""), result
+
+
 def needs_court_order(e: Exception, llm_output: str) -> bool:
     """Determine if we need to use the court order system prompt."""
     if isinstance(e, (LLMResponseParsingError, ValidationError)):
@@ -134,6 +320,7 @@ def needs_court_order(e: Exception, llm_output: str) -> bool:
 def initialize_bedrock_runtime(llm_kwargs: dict[str, Any]) -> Any:
     """Initialize and return the bedrock runtime client."""
     if "region_name" in llm_kwargs:
-        return boto3.client("bedrock-runtime", region_name=llm_kwargs["region_name"])
+        bedrock_runtime = boto3.client("bedrock-runtime", region_name=llm_kwargs["region_name"])
     else:
-        return boto3.client("bedrock-runtime")
+        bedrock_runtime = boto3.client("bedrock-runtime")
+    return wrap_bedrock_runtime(bedrock_runtime)
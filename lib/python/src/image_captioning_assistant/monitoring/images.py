@@ -0,0 +1,52 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""Sizes of each page image sent to models while processing a work, before and after it is prepared.
+
+Pages are recorded as they are encoded, into the collector of the enclosing record_work_images, if any, so
+library users who do not collect them pay nothing.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+_work_images: ContextVar["WorkImages | None"] = ContextVar("work_images", default=None)
+
+
+class WorkImages:
+    """Collect the sizes of the page images encoded while processing one work."""
+
+    def __init__(self) -> None:
+        """Initialize an empty collection."""
+        self.images: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, image_uri: str, sizes: dict[str, Any]) -> None:
+        """Record the sizes of a page image, replacing any from an earlier attempt."""
+        with self._lock:
+            self.images[image_uri] = sizes
+
+    def pages(self) -> list[dict[str, Any]]:
+        """Sizes per page image, in the order first encoded, as values that DynamoDB can store."""
+        with self._lock:
+            return [{"image_s3_uri": image_uri} | sizes for image_uri, sizes in self.images.items()]
+
+
+@contextmanager
+def record_work_images() -> Iterator[WorkImages]:
+    """Collect the sizes of the page images encoded by the enclosed code."""
+    work_images = WorkImages()
+    token = _work_images.set(work_images)
+    try:
+        yield work_images
+    finally:
+        _work_images.reset(token)
+
+
+def record_image(image_uri: str, sizes: dict[str, Any]) -> None:
+    """Record the sizes of a page image in the work being processed, if any."""
+    work_images = _work_images.get()
+    if work_images is not None:
+        work_images.add(image_uri, sizes)
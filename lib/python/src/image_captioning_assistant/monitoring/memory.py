@@ -0,0 +1,121 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""Peak memory used while processing a work, to size task memory and concurrency from data.
+
+The resident set size (RSS) of the process is sampled from a background thread, which covers memory allocated
+outside Python such as decoded images. Python allocations can also be traced with tracemalloc, which is exact
+but slows down allocation-heavy code, so it is off by default.
+
+Sizes are in KiB, as integers that DynamoDB can store.
+"""
+
+import os
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+# Often enough to catch the peak of decoding a large image, which lasts a few hundred milliseconds
+SAMPLE_INTERVAL_SECONDS = 0.02
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_kib() -> int | None:
+    """Resident set size of this process now, or None where it cannot be read cheaply."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE // 1024
+    except OSError:
+        return None
+
+
+def peak_rss_kib() -> int | None:
+    """Peak resident set size of this process since it started, or None where it is not available."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and KiB on Linux
+    return max_rss // 1024 if sys.platform == "darwin" else max_rss
+
+
+class WorkMemory:
+    """Sample the memory used while processing one work."""
+
+    def __init__(self, trace_python: bool = False, sample_interval: float = SAMPLE_INTERVAL_SECONDS) -> None:
+        """Initialize the sampler.
+
+        Args:
+            trace_python (bool): Whether to also trace Python allocations with tracemalloc.
+            sample_interval (float): Seconds between RSS samples.
+        """
+        self.trace_python = trace_python
+        self.sample_interval = sample_interval
+        self.rss_start_kib = current_rss_kib()
+        self.peak_rss_kib = self.rss_start_kib
+        self.peak_traced_kib: int | None = None
+        self._started_tracing = False
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def sample(self) -> None:
+        """Take one RSS sample."""
+        rss_kib = current_rss_kib()
+        if rss_kib is not None:
+            with self._lock:
+                self.peak_rss_kib = max(self.peak_rss_kib or 0, rss_kib)
+
+    def _sample_until_stopped(self) -> None:
+        while not self._stopped.wait(self.sample_interval):
+            self.sample()
+
+    def start(self) -> None:
+        """Start sampling, and tracing if enabled."""
+        if self.trace_python:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+        if self.rss_start_kib is not None:
+            self._thread = threading.Thread(target=self._sample_until_stopped, name="work-memory", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and tracing, keeping the peaks."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sample()
+        if self.trace_python and tracemalloc.is_tracing():
+            self.peak_traced_kib = tracemalloc.get_traced_memory()[1] // 1024
+            if self._started_tracing:
+                tracemalloc.stop()
+
+    def summary(self) -> dict[str, Any]:
+        """Peak memory of the work, and of the process so far to compare against the task's memory."""
+        summary: dict[str, Any] = {"process_peak_rss_kib": peak_rss_kib()}
+        with self._lock:
+            if self.rss_start_kib is not None and self.peak_rss_kib is not None:
+                summary |= {
+                    "rss_start_kib": self.rss_start_kib,
+                    "peak_rss_kib": self.peak_rss_kib,
+                    "peak_rss_growth_kib": self.peak_rss_kib - self.rss_start_kib,
+                }
+        if self.peak_traced_kib is not None:
+            summary["peak_traced_kib"] = self.peak_traced_kib
+        return {key: value for key, value in summary.items() if value is not None}
+
+
+@contextmanager
+def record_work_memory(trace_python: bool = False) -> Iterator[WorkMemory]:
+    """Sample the memory used by the enclosed code."""
+    work_memory = WorkMemory(trace_python=trace_python)
+    work_memory.start()
+    try:
+        yield work_memory
+    finally:
+        work_memory.stop()
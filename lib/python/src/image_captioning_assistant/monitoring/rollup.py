@@ -0,0 +1,235 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""A compact rollup item of worker throughput, work latency and in-flight works, kept up to date by workers.
+
+The rollup lives in the jobs table under a reserved job name. It holds one slot per minute of the last hour
+in a ring buffer, each counting the works and pages completed in that minute and a histogram of their
+latencies, one entry per worker for the work it is processing, and the token usage and pages processed over
+all jobs. Progress reporting reads this single item instead of scanning works or jobs.
+
+Updating the rollup is best effort: failures are logged and never fail the work.
+"""
+
+import logging
+import time
+from typing import Any
+
+from botocore.exceptions import ClientError
+
+from image_captioning_assistant.aws.dynamodb import add_job_usage, is_condition_failure, JOB_NAME, USAGE
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_JOB_NAME = "__worker_rollup__"
+MINUTES = "minutes"
+WORKERS = "workers"
+ROLLUP_MINUTES = 60
+# Upper bounds of the work latency histogram buckets, in milliseconds
+LATENCY_BUCKET_BOUNDS_MS = tuple(
+    seconds * 1000 for seconds in (5, 10, 20, 30, 45, 60, 90, 120, 180, 300, 450, 600, 900, 1800, 3600)
+)
+OVERFLOW_BUCKET = "inf"
+
+
+def latency_bucket(duration_ms: float) -> str:
+    """Name of the histogram bucket of a work latency."""
+    for bound_ms in LATENCY_BUCKET_BOUNDS_MS:
+        if duration_ms <= bound_ms:
+            return str(bound_ms)
+    return OVERFLOW_BUCKET
+
+
+def ensure_rollup(jobs_table: Any, now: float | None = None) -> None:
+    """Create the rollup item if missing, and drop the in-flight entries of workers that stopped without clearing.
+
+    Args:
+        jobs_table (Any): DynamoDB jobs table.
+        now (float, optional): Current epoch time in seconds.
+    """
+    now = time.time() if now is None else now
+    try:
+        response = jobs_table.update_item(
+            Key={JOB_NAME: ROLLUP_JOB_NAME},
+            UpdateExpression=(
+                "SET #minutes = if_not_exists(#minutes, :empty), #workers = if_not_exists(#workers, :empty), "
+                "#usage = if_not_exists(#usage, :empty)"
+            ),
+            ExpressionAttributeNames={"#minutes": MINUTES, "#workers": WORKERS, "#usage": USAGE},
+            ExpressionAttributeValues={":empty": {}},
+            ReturnValues="ALL_NEW",
+        )
+        expired = [
+            worker_id
+            for worker_id, entry in response["Attributes"][WORKERS].items()
+            if float(entry.get("expires_at", 0)) < now
+        ]
+        if expired:
+            names = {f"#w{index}": worker_id for index, worker_id in enumerate(expired)}
+            jobs_table.update_item(
+                Key={JOB_NAME: ROLLUP_JOB_NAME},
+                UpdateExpression="REMOVE " + ", ".join(f"#workers.{name}" for name in names),
+                ExpressionAttributeNames={"#workers": WORKERS} | names,
+            )
+            logger.info(f"Removed {len(expired)} expired in-flight entries from the rollup")
+    except ClientError as e:
+        logger.warning(f"Could not prepare the worker rollup: {e}")
+
+
+def register_in_flight(
+    jobs_table: Any,
+    worker_id: str,
+    job_name: str,
+    work_id: str,
+    pages: int,
+    lease_seconds: int,
+    now: float | None = None,
+) -> None:
+    """Record the work a worker started processing, until it completes, fails or its lease expires.
+
+    Args:
+        jobs_table (Any): DynamoDB jobs table.
+        worker_id (str): ID of the worker.
+        job_name (str): The job name.
+        work_id (str): The work ID.
+        pages (int): Number of pages in the work.
+        lease_seconds (int): Seconds after which the entry is ignored, matching the work's lease.
+        now (float, optional): Current epoch time in seconds.
+    """
+    now = time.time() if now is None else now
+    entry = {
+        JOB_NAME: job_name,
+        "work_id": work_id,
+        "pages": pages,
+        "started_at": int(now),
+        "expires_at": int(now) + lease_seconds,
+    }
+    try:
+        jobs_table.update_item(
+            Key={JOB_NAME: ROLLUP_JOB_NAME},
+            UpdateExpression="SET #workers.#worker = :entry",
+            ConditionExpression="attribute_exists(#workers)",
+            ExpressionAttributeNames={"#workers": WORKERS, "#worker": worker_id},
+            ExpressionAttributeValues={":entry": entry},
+        )
+    except ClientError as e:
+        logger.warning(f"Could not register work={work_id} as in flight: {e}")
+
+
+def renew_in_flight(jobs_table: Any, worker_id: str, lease_seconds: int, now: float | None = None) -> None:
+    """Push back the expiry of a worker's in-flight entry as its work's lease is extended."""
+    now = time.time() if now is None else now
+    try:
+        jobs_table.update_item(
+            Key={JOB_NAME: ROLLUP_JOB_NAME},
+            UpdateExpression="SET #workers.#worker.#expires_at = :expires_at",
+            ConditionExpression="attribute_exists(#workers.#worker)",
+            ExpressionAttributeNames={"#workers": WORKERS, "#worker": worker_id, "#expires_at": "expires_at"},
+            ExpressionAttributeValues={":expires_at": int(now) + lease_seconds},
+        )
+    except ClientError as e:
+        # A missing entry, which was never registered or has been cleared, needs no renewal
+        if not is_condition_failure(e):
+            logger.warning(f"Could not renew the in-flight entry of worker={worker_id}: {e}")
+
+
+def clear_in_flight(jobs_table: Any, worker_id: str) -> None:
+    """Remove a worker's in-flight entry after its work failed or was released."""
+    try:
+        jobs_table.update_item(
+            Key={JOB_NAME: ROLLUP_JOB_NAME},
+            UpdateExpression="REMOVE #workers.#worker",
+            ConditionExpression="attribute_exists(#workers)",
+            ExpressionAttributeNames={"#workers": WORKERS, "#worker": worker_id},
+        )
+    except ClientError as e:
+        logger.warning(f"Could not clear the in-flight entry of worker={worker_id}: {e}")
+
+
+def add_usage_totals(
+    jobs_table: Any,
+    usage_by_model: dict[str, dict[str, int]],
+    totals: dict[str, int] | None = None,
+) -> None:
+    """Add a work's token usage per model and other counters, such as its pages, to the totals over all jobs.
+
+    Args:
+        jobs_table (Any): DynamoDB jobs table.
+        usage_by_model (dict): Counters per model to add, as returned by WorkUsage.totals.
+        totals (dict[str, int], optional): Top-level counters to add, such as PAGES_PROCESSED and PROCESSING_MS.
+    """
+    try:
+        add_job_usage(jobs_table, ROLLUP_JOB_NAME, usage_by_model, totals)
+    except ClientError as e:
+        logger.warning(f"Could not add usage to the rollup: {e}")
+
+
+def record_work_completed(
+    jobs_table: Any,
+    worker_id: str,
+    duration_ms: float,
+    pages: int,
+    now: float | None = None,
+) -> None:
+    """Count a completed work in the current minute's slot and clear the worker's in-flight entry.
+
+    The slot of a minute is reused an hour later. The first worker to complete a work in the new minute
+    starts the slot over, conditionally so that concurrent workers do not lose each other's counts.
+
+    Args:
+        jobs_table (Any): DynamoDB jobs table.
+        worker_id (str): ID of the worker.
+        duration_ms (float): Time taken to process the work.
+        pages (int): Number of pages in the work.
+        now (float, optional): Current epoch time in seconds.
+    """
+    minute = int((time.time() if now is None else now) // 60)
+    bucket = latency_bucket(duration_ms)
+    names = {
+        "#minutes": MINUTES,
+        "#slot": str(minute % ROLLUP_MINUTES),
+        "#minute": "minute",
+        "#works": "works",
+        "#pages": "pages",
+        "#latency": "latency",
+        "#bucket": bucket,
+        "#workers": WORKERS,
+        "#worker": worker_id,
+    }
+    add_to_slot = {
+        "Key": {JOB_NAME: ROLLUP_JOB_NAME},
+        "UpdateExpression": (
+            "SET #minutes.#slot.#works = #minutes.#slot.#works + :one, "
+            "#minutes.#slot.#pages = #minutes.#slot.#pages + :pages, "
+            "#minutes.#slot.#latency.#bucket = if_not_exists(#minutes.#slot.#latency.#bucket, :zero) + :one "
+            "REMOVE #workers.#worker"
+        ),
+        "ConditionExpression": "#minutes.#slot.#minute = :minute",
+        "ExpressionAttributeNames": names,
+        "ExpressionAttributeValues": {":one": 1, ":zero": 0, ":pages": pages, ":minute": minute},
+    }
+    start_slot = {
+        "Key": {JOB_NAME: ROLLUP_JOB_NAME},
+        "UpdateExpression": "SET #minutes.#slot = :slot REMOVE #workers.#worker",
+        "ConditionExpression": (
+            "attribute_exists(#minutes) AND (attribute_not_exists(#minutes.#slot) OR #minutes.#slot.#minute < :minute)"
+        ),
+        "ExpressionAttributeNames": {
+            name: names[name] for name in ("#minutes", "#slot", "#minute", "#workers", "#worker")
+        },
+        "ExpressionAttributeValues": {
+            ":minute": minute,
+            ":slot": {"minute": minute, "works": 1, "pages": pages, "latency": {bucket: 1}},
+        },
+    }
+    try:
+        for update in (add_to_slot, start_slot, add_to_slot):
+            try:
+                jobs_table.update_item(**update)
+                return
+            except ClientError as e:
+                if not is_condition_failure(e):
+                    raise
+        logger.warning(f"Could not count a completed work in minute={minute} of the rollup")
+    except ClientError as e:
+        logger.warning(f"Could not count a completed work in the rollup: {e}")
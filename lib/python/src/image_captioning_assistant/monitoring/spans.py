@@ -0,0 +1,185 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""Timing spans around the stages of processing a work, emitted as structured metrics.
+
+Spans are tagged with the dimensions of the enclosing metric_context, such as the job name and work ID, and
+sent to every configured sink. Nothing is emitted until a sink is configured, so library users who do not
+want metrics pay only for reading the clock.
+"""
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, TextIO
+
+# Stages of processing a work
+SQS_RECEIVE = "sqs_receive"
+DYNAMODB_GET = "dynamodb_get"
+S3_FETCH = "s3_fetch"
+DECODE_RESIZE = "decode_resize"
+PROMPT_RENDER = "prompt_render"
+BEDROCK_CALL = "bedrock_call"
+PARSE_VALIDATE = "parse_validate"
+DYNAMODB_WRITE = "dynamodb_write"
+
+DEFAULT_NAMESPACE = "ImageCaptioningAssistant"
+# Low-cardinality dimensions CloudWatch aggregates by; the others are searchable log properties
+METRIC_DIMENSIONS = ("stage", "model")
+
+# None outside any metric_context, so that dimensions cannot be added where nothing would remove them
+_dimensions: ContextVar[dict[str, Any] | None] = ContextVar("metric_dimensions", default=None)
+_work_timings: ContextVar["WorkTimings | None"] = ContextVar("work_timings", default=None)
+_sinks: list[Any] = []
+
+
+class InMemorySink:
+    """Keep emitted spans in memory, for tests and local runs."""
+
+    def __init__(self) -> None:
+        """Initialize an empty sink."""
+        self.spans: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def emit(self, span_record: dict[str, Any]) -> None:
+        """Record a span."""
+        with self._lock:
+            self.spans.append(span_record)
+
+    def durations(self, stage: str) -> list[float]:
+        """Durations in milliseconds of the recorded spans of a stage."""
+        return [span_record["duration_ms"] for span_record in self.spans if span_record["stage"] == stage]
+
+
+class EmfSink:
+    """Write spans as CloudWatch embedded metric format (EMF) lines, which CloudWatch Logs turns into metrics."""
+
+    def __init__(self, namespace: str = DEFAULT_NAMESPACE, stream: TextIO | None = None) -> None:
+        """Initialize the sink.
+
+        Args:
+            namespace (str): CloudWatch metrics namespace.
+            stream (TextIO, optional): Stream to write to, stdout by default.
+        """
+        self.namespace = namespace
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def emit(self, span_record: dict[str, Any]) -> None:
+        """Write a span as one EMF line."""
+        dimensions = [name for name in METRIC_DIMENSIONS if span_record.get(name) is not None]
+        line = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": self.namespace,
+                        "Dimensions": [dimensions[:1], dimensions] if len(dimensions) > 1 else [dimensions],
+                        "Metrics": [{"Name": "Duration", "Unit": "Milliseconds"}],
+                    }
+                ],
+            },
+            "Duration": span_record["duration_ms"],
+        } | {key: value for key, value in span_record.items() if key != "duration_ms"}
+        stream = self.stream or sys.stdout
+        with self._lock:
+            stream.write(json.dumps(line, default=str) + "\n")
+            stream.flush()
+
+
+class WorkTimings:
+    """Accumulate the time spent per stage while processing one work."""
+
+    def __init__(self) -> None:
+        """Initialize empty timings."""
+        self.started = time.perf_counter()
+        self.stages: dict[str, dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, duration_ms: float) -> None:
+        """Add a span's duration to its stage."""
+        with self._lock:
+            totals = self.stages.setdefault(stage, {"total_ms": 0.0, "count": 0})
+            totals["total_ms"] += duration_ms
+            totals["count"] += 1
+
+    def breakdown(self) -> dict[str, Any]:
+        """Milliseconds and span count per stage and overall, as integers that DynamoDB can store."""
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000),
+            "stages": {
+                stage: {"total_ms": round(totals["total_ms"]), "count": int(totals["count"])}
+                for stage, totals in self.stages.items()
+            },
+        }
+
+
+def configure_sinks(*sinks: Any) -> None:
+    """Replace the sinks spans are emitted to; no sinks disables emission."""
+    _sinks[:] = sinks
+
+
+@contextmanager
+def metric_context(**dimensions: Any) -> Iterator[None]:
+    """Tag the spans of the enclosed code with dimensions, such as job_name, work_id or attempt."""
+    token = _dimensions.set((_dimensions.get() or {}) | dimensions)
+    try:
+        yield
+    finally:
+        _dimensions.reset(token)
+
+
+def set_dimensions(**dimensions: Any) -> None:
+    """Add dimensions to the current metric context until it exits, and do nothing outside any metric context."""
+    current = _dimensions.get()
+    if current is not None:
+        _dimensions.set(current | dimensions)
+
+
+def current_dimensions() -> dict[str, Any]:
+    """Return the dimensions of the current metric context."""
+    return dict(_dimensions.get() or {})
+
+
+@contextmanager
+def record_work_timings() -> Iterator[WorkTimings]:
+    """Collect a per-stage latency breakdown of the spans in the enclosed code."""
+    work_timings = WorkTimings()
+    token = _work_timings.set(work_timings)
+    try:
+        yield work_timings
+    finally:
+        _work_timings.reset(token)
+
+
+@contextmanager
+def span(stage: str, **dimensions: Any) -> Iterator[None]:
+    """Time the enclosed code as a stage, recording whether it raised.
+
+    Args:
+        stage (str): Stage name, such as BEDROCK_CALL.
+        **dimensions: Dimensions of this span only, added to those of the metric context.
+    """
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        work_timings = _work_timings.get()
+        if work_timings is not None:
+            work_timings.add(stage, duration_ms)
+        if _sinks:
+            span_record = (
+                (_dimensions.get() or {}) | dimensions | {"stage": stage, "duration_ms": round(duration_ms, 3)}
+            )
+            if error:
+                span_record["error"] = error
+            for sink in _sinks:
+                sink.emit(span_record)
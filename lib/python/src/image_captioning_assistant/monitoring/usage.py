@@ -0,0 +1,86 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""Token usage of model calls, aggregated per work and per model; the progress endpoints price it.
+
+Calls made while retrying, either another attempt within a work or a redelivery of the whole work, are also
+counted separately so the share of spend that goes to retries is visible.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+from image_captioning_assistant.monitoring.spans import current_dimensions
+
+INPUT_TOKENS = "input_tokens"
+OUTPUT_TOKENS = "output_tokens"
+CACHE_READ_TOKENS = "cache_read_tokens"
+CACHE_WRITE_TOKENS = "cache_write_tokens"
+CALLS = "calls"
+RETRY_PREFIX = "retry_"
+TOKEN_FIELDS = (INPUT_TOKENS, OUTPUT_TOKENS, CACHE_READ_TOKENS, CACHE_WRITE_TOKENS)
+# Converse API usage keys for each token field
+CONVERSE_USAGE_KEYS = {
+    INPUT_TOKENS: "inputTokens",
+    OUTPUT_TOKENS: "outputTokens",
+    CACHE_READ_TOKENS: "cacheReadInputTokens",
+    CACHE_WRITE_TOKENS: "cacheWriteInputTokens",
+}
+
+_work_usage: ContextVar["WorkUsage | None"] = ContextVar("work_usage", default=None)
+
+
+class WorkUsage:
+    """Accumulate the token usage per model of the calls made while processing one work."""
+
+    def __init__(self, is_retry: bool = False) -> None:
+        """Initialize empty usage.
+
+        Args:
+            is_retry (bool): Whether the work is being processed again, so every call counts as a retry.
+        """
+        self.is_retry = is_retry
+        self.models: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, model_id: str, usage: dict[str, Any], attempt: int = 1) -> None:
+        """Add the usage of one Converse call.
+
+        Args:
+            model_id (str): Model or inference profile ID.
+            usage (dict[str, Any]): The response's usage, with Converse API keys.
+            attempt (int): Attempt number of the call within the work.
+        """
+        tokens = {field: int(usage.get(key) or 0) for field, key in CONVERSE_USAGE_KEYS.items()}
+        counted = tokens | {CALLS: 1}
+        if self.is_retry or attempt > 1:
+            counted |= {RETRY_PREFIX + field: count for field, count in counted.items()}
+        with self._lock:
+            totals = self.models.setdefault(model_id, {})
+            for field, count in counted.items():
+                totals[field] = totals.get(field, 0) + count
+
+    def totals(self) -> dict[str, dict[str, int]]:
+        """Counters per model, as integers that DynamoDB can store."""
+        with self._lock:
+            return {model_id: dict(counters) for model_id, counters in self.models.items()}
+
+
+@contextmanager
+def record_work_usage(is_retry: bool = False) -> Iterator[WorkUsage]:
+    """Collect the token usage of the model calls in the enclosed code."""
+    work_usage = WorkUsage(is_retry=is_retry)
+    token = _work_usage.set(work_usage)
+    try:
+        yield work_usage
+    finally:
+        _work_usage.reset(token)
+
+
+def record_usage(model_id: str, usage: dict[str, Any]) -> None:
+    """Add a Converse call's usage to the work being processed, taking its attempt from the metric context."""
+    work_usage = _work_usage.get()
+    if work_usage is not None:
+        work_usage.add(model_id, usage, attempt=int(current_dimensions().get("attempt", 1)))
@@ -5,7 +5,7 @@
 import { useState, useEffect, useCallback } from 'react';
 import { useAuth } from '../../../AuthContext';
 import { useNavigate } from 'react-router-dom';
-import { buildApiUrl } from '../../../utils/apiUrls';
+import { fetchJobWorks } from '../../../utils/jobWorks';
 
 // components/Bias/hooks/useWorkData.js
 
@@ -39,36 +39,19 @@ export const useWorkData = (jobName, initialWorkId, onWorkSelect) => {
         setIsLoading(true);
         // Instead of calling useAuth() inside this function,
         // use the token and headers you already have from the parent scope
-        const url = buildApiUrl(`/api/job_progress?job_name=${jobName}`);
-        const response = await fetch(url, {
-          headers: {
+        let works;
+        try {
+          ({ works } = await fetchJobWorks(jobName, {
             'x-api-key': token,
             'Content-Type': 'application/json',
-          },
-        });
-
-        if (!response.ok) {
-          if (response.status === 401 || response.status === 403) {
+          }));
+        } catch (fetchError) {
+          if (fetchError.status === 401 || fetchError.status === 403) {
             logout();
             navigate('/login');
             throw new Error('Authentication failed. Please log in again.');
           }
-          throw new Error(`Failed to fetch job data: ${response.status}`);
-        }
-
-        const jobData = await response.json();
-        const works = [];
-        if (jobData.job_progress) {
-          Object.entries(jobData.job_progress).forEach(([work_status, ids]) => {
-            ids.forEach((id) => {
-              works.push({
-                work_id: id,
-                work_status: work_status,
-                job_name: jobName,
-                job_type: jobData.job_type,
-              });
-            });
-          });
+          throw fetchError;
         }
 
         setAllWorks(works);
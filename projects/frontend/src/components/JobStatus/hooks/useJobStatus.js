@@ -7,7 +7,7 @@
 
 import { useState, useEffect, useCallback } from 'react';
 import { useAuth } from '../../../AuthContext';
-import { buildApiUrl } from '../../../utils/apiUrls';
+import { fetchJobWorks } from '../../../utils/jobWorks';
 
 const useJobStatus = (token, navigate) => {
   const { logout } = useAuth();
@@ -47,24 +47,22 @@ const useJobStatus = (token, navigate) => {
         } else {
           setIsLoading(true);
         }
-        const url = buildApiUrl('/api/job_progress');
-        console.log(`Fetching from: ${url}?job_name=${nameToUse}`);
+        console.log(`Fetching works of job_name=${nameToUse}`);
 
-        // Use nameToUse in the API call
-        const response = await fetch(`${url}?job_name=${nameToUse}`, {
-          headers: {
+        let jobType;
+        let workItems;
+        try {
+          ({ jobType, works: workItems } = await fetchJobWorks(nameToUse, {
             ...getAuthHeaders(),
             'Content-Type': 'application/json',
-          },
-        });
-
-        console.log('Response Status:', response.status);
-        const responseText = await response.text();
-        console.log('Response Body:', responseText);
-
-        if (!response.ok) {
+          }));
+        } catch (fetchError) {
+          console.log('Response Status:', fetchError.status);
+          if (!fetchError.status) {
+            throw fetchError;
+          }
           // Handle unauthorized responses (token expired)
-          if (response.status === 401 || response.status === 403) {
+          if (fetchError.status === 401 || fetchError.status === 403) {
             logout();
             navigate('/login');
             return;
@@ -74,43 +72,13 @@ const useJobStatus = (token, navigate) => {
           return;
         }
 
-        // Parse JSON after logging the raw text
-        let data;
-        try {
-          data = JSON.parse(responseText);
-          console.log('Parsed Data:', data);
-        } catch (parseError) {
-          console.error('JSON Parse Error:', parseError);
-          return;
-        }
-
         const newJobs = new Map();
         const jobKey = submittedJobName;
-        const workItems = [];
-
-        if (data && data.job_progress) {
-          console.log('Job progress structure:', data.job_progress);
-          Object.entries(data.job_progress).forEach(([work_status, ids]) => {
-            // Check if ids is an array before processing
-            if (Array.isArray(ids)) {
-              ids.forEach((id) => {
-                workItems.push({
-                  work_id: id,
-                  work_status: work_status,
-                  job_name: jobKey,
-                  job_type: data.job_type || 'unknown',
-                });
-              });
-            } else {
-              console.warn(`Expected array for work_status "${work_status}" but got:`, ids);
-            }
-          });
-        }
 
         const jobData = {
           job_name: jobKey,
-          job_type: data.job_type || 'unknown',
-          works: workItems,
+          job_type: jobType,
+          works: workItems.map((work) => ({ ...work, job_name: jobKey })),
         };
 
         newJobs.set(jobKey, jobData);
@@ -5,6 +5,7 @@
 import { useCallback } from 'react';
 import { buildApiUrl } from '../../../utils/apiUrls';
 import { useAuth } from '../../../AuthContext';
+import { fetchJobWorks } from '../../../utils/jobWorks';
 
 export default function useMetadataFetch({ token, logout, navigate, setError }) {
   const { getAuthHeaders } = useAuth();
@@ -46,37 +47,19 @@ export default function useMetadataFetch({ token, logout, navigate, setError })
       if (!token || !jobName) return [];
 
       try {
-        const url = buildApiUrl(`/api/job_progress?job_name=${jobName}`);
-        const response = await fetch(url, {
-          headers: {
+        let works;
+        try {
+          ({ works } = await fetchJobWorks(jobName, {
             ...getAuthHeaders(),
             'Content-Type': 'application/json',
-          },
-        });
-
-        if (!response.ok) {
-          if (response.status === 401 || response.status === 403) {
+          }));
+        } catch (fetchError) {
+          if (fetchError.status === 401 || fetchError.status === 403) {
             logout();
             navigate('/login');
             throw new Error('Authentication failed. Please log in again.');
           }
-          throw new Error(`Failed to fetch job data: ${response.status}`);
-        }
-
-        const jobData = await response.json();
-        const works = [];
-
-        if (jobData.job_progress) {
-          Object.entries(jobData.job_progress).forEach(([status, ids]) => {
-            ids.forEach((id) => {
-              works.push({
-                work_id: id,
-                work_status: status,
-                job_name: jobName,
-                job_type: jobData.job_type,
-              });
-            });
-          });
+          throw fetchError;
         }
 
         return works;
@@ -0,0 +1,66 @@
+/*
+ * Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+ * Terms and the SOW between the parties dated 2025.
+ */
+
+// src/utils/jobWorks.js
+
+import { buildApiUrl } from './apiUrls';
+
+const PAGE_LIMIT = 1000;
+
+const fetchJson = async (url, headers) => {
+  const response = await fetch(url, { headers });
+  if (!response.ok) {
+    const error = new Error(`Failed to fetch job data: ${response.status}`);
+    error.status = response.status;
+    throw error;
+  }
+  return response.json();
+};
+
+/**
+ * Fetch the works of a job with their status.
+ *
+ * The job's status counts come from its progress, and the work IDs of each status are listed page by page,
+ * rather than all at once. Jobs created before status counters existed still return every work ID by status.
+ *
+ * Errors carry the HTTP status of the failed response as `status`.
+ */
+export const fetchJobWorks = async (jobName, headers) => {
+  const jobParam = `job_name=${encodeURIComponent(jobName)}`;
+  const jobData = await fetchJson(buildApiUrl(`/api/job_progress?${jobParam}`), headers);
+  const jobType = jobData.job_type || 'unknown';
+
+  let workIdsByStatus = jobData.job_progress;
+  if (!workIdsByStatus) {
+    workIdsByStatus = {};
+    for (const workStatus of Object.keys(jobData.job_counts || {})) {
+      const workIds = [];
+      let nextToken = null;
+      do {
+        let url = `/api/job_progress?${jobParam}&work_status=${encodeURIComponent(workStatus)}&limit=${PAGE_LIMIT}`;
+        if (nextToken) {
+          url += `&next_token=${encodeURIComponent(nextToken)}`;
+        }
+        const page = await fetchJson(buildApiUrl(url), headers);
+        workIds.push(...page.work_ids);
+        nextToken = page.next_token;
+      } while (nextToken);
+      workIdsByStatus[workStatus] = workIds;
+    }
+  }
+
+  const works = [];
+  Object.entries(workIdsByStatus).forEach(([workStatus, ids]) => {
+    ids.forEach((id) => {
+      works.push({
+        work_id: id,
+        work_status: workStatus,
+        job_name: jobName,
+        job_type: jobType,
+      });
+    });
+  });
+  return { jobType, works };
+};
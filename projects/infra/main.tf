@@ -70,6 +70,8 @@ module "sqs" {
   message_retention_seconds  = 86400 # 1 day
   receive_wait_time_seconds  = 10
   visibility_timeout_seconds = 60
+  # Well above the worker's attempts, as releases on scale-in and deploys also redeliver messages
+  max_receive_count = 20
 }
 
 # ECR module
@@ -103,6 +105,7 @@ module "iam" {
 
   deployment_prefix             = local.deployment_prefix
   works_table_arn               = module.dynamodb.works_table_arn
+  jobs_table_arn                = module.dynamodb.jobs_table_arn
   uploads_bucket_arn            = module.s3.uploads_bucket_arn
   sqs_works_queue_arn           = module.sqs.queue_arn
   vpc_s3_endpoint_id            = module.vpc.vpc_endpoint_ids.s3
@@ -130,9 +133,11 @@ module "ecs" {
   deployment_stage             = var.deployment_stage
   ecr_processor_repository_url = module.ecr.ecr_processor_repository_url
   works_table_name             = module.dynamodb.works_table_name
+  jobs_table_name              = module.dynamodb.jobs_table_name
   centralized_log_group_name   = module.cloudwatch.cloudwatch_log_group_name
   uploads_bucket_name          = module.s3.uploads_bucket_name
   sqs_queue_url                = module.sqs.queue_url
+  worker_max_attempts          = 5
   task_execution_role_arn      = module.iam.ecs_task_execution_role_arn
   task_role_arn                = module.iam.ecs_task_role_arn
 }
@@ -159,6 +164,8 @@ module "lambda" {
   sqs_queue_url              = module.sqs.queue_url
   private_subnet_ids         = module.vpc.private_subnet_ids
   works_table_name           = module.dynamodb.works_table_name
+  jobs_table_name            = module.dynamodb.jobs_table_name
+  works_status_index_name    = module.dynamodb.works_status_index_name
   uploads_bucket_name        = module.s3.uploads_bucket_name
   task_execution_role_arn    = module.iam.ecs_task_execution_role_arn
   ecs_cluster_name           = module.ecs.cluster_name
@@ -17,6 +17,34 @@ resource "aws_dynamodb_table" "works" {
     name = "work_id"
     type = "S"
   }
+
+  attribute {
+    name = "work_status"
+    type = "S"
+  }
+
+  # Lists the works of a job by status without reading its whole partition. Hashing on the job rather than
+  # the status, which has a handful of values, spreads index writes across partitions.
+  global_secondary_index {
+    name            = "job_name-work_status-index"
+    hash_key        = "job_name"
+    range_key       = "work_status"
+    projection_type = "KEYS_ONLY"
+  }
+  point_in_time_recovery {
+    enabled = true
+  }
+}
+
+# Per-job summary items holding work status counters
+resource "aws_dynamodb_table" "jobs" {
+  name         = "${var.deployment_prefix}-jobs-table"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "job_name"
+  attribute {
+    name = "job_name"
+    type = "S"
+  }
   point_in_time_recovery {
     enabled = true
   }
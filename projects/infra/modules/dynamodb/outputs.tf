@@ -12,3 +12,18 @@ output "works_table_arn" {
   description = "The ARN of the DynamoDB works table"
   value       = aws_dynamodb_table.works.arn
 }
+
+output "works_status_index_name" {
+  description = "The name of the works table index on job_name and work_status"
+  value       = "job_name-work_status-index"
+}
+
+output "jobs_table_name" {
+  description = "The name of the DynamoDB jobs table"
+  value       = aws_dynamodb_table.jobs.name
+}
+
+output "jobs_table_arn" {
+  description = "The ARN of the DynamoDB jobs table"
+  value       = aws_dynamodb_table.jobs.arn
+}
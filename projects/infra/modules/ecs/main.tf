@@ -8,7 +8,7 @@ data "aws_region" "current" {}
 locals {
   project_root_path = "${path.root}/../.."
   ecs_src_path      = "${path.module}/src"
-  lib_path          = "${local.project_root_path}/lib/ruby"
+  lib_path          = "${local.project_root_path}/lib/python"
   ecs_src_files     = fileset(local.ecs_src_path, "**")
   package_src_files = fileset(local.lib_path, "**")
   ecs_src_hash      = sha256(join("", [for f in local.ecs_src_files : filesha256("${local.ecs_src_path}/${f}")]))
@@ -29,7 +29,7 @@ resource "null_resource" "push_image" {
     command     = <<EOF
       echo "Starting Docker build and push process"
       aws ecr get-login-password --region ${data.aws_region.current.name} | docker login --username AWS --password-stdin ${var.ecr_processor_repository_url}
-      docker build -t ${var.ecr_processor_repository_url}:${local.image_tag} -f ${local.ecs_src_path}/Dockerfile.ruby ${local.project_root_path} || exit 1
+      docker build -t ${var.ecr_processor_repository_url}:${local.image_tag} -f ${local.ecs_src_path}/Dockerfile.python ${local.project_root_path} || exit 1
       docker push ${var.ecr_processor_repository_url}:${local.image_tag} || exit 1
       echo "Docker build and push process completed"
     EOF
@@ -70,11 +70,23 @@ resource "aws_ecs_task_definition" "task" {
       cpu       = 1024
       memory    = 2048
       essential = true
+      # Seconds ECS waits after SIGTERM before killing the worker, which finishes or releases its message first
+      stopTimeout = var.worker_shutdown_grace_seconds + 10
       environment = [
         { name = "AWS_REGION", value = data.aws_region.current.name },
         { name = "UPLOADS_BUCKET_NAME", value = var.uploads_bucket_name },
         { name = "WORKS_TABLE_NAME", value = var.works_table_name },
+        { name = "JOBS_TABLE_NAME", value = var.jobs_table_name },
         { name = "SQS_QUEUE_URL", value = var.sqs_queue_url },
+        { name = "WORKER_IDLE_TIMEOUT_SECONDS", value = tostring(var.worker_idle_timeout_seconds) },
+        { name = "WORKER_SHUTDOWN_GRACE_SECONDS", value = tostring(var.worker_shutdown_grace_seconds) },
+        { name = "WORKER_MAX_ATTEMPTS", value = tostring(var.worker_max_attempts) },
+        { name = "WORK_LEASE_SECONDS", value = tostring(var.work_lease_seconds) },
+        { name = "MESSAGE_VISIBILITY_SECONDS", value = tostring(var.message_visibility_seconds) },
+        { name = "WORK_HEARTBEAT_SECONDS", value = tostring(var.work_heartbeat_seconds) },
+        { name = "PIXEL_BUDGET", value = tostring(var.pixel_budget) },
+        { name = "WORKER_TRACE_MALLOC", value = tostring(var.worker_trace_malloc) },
+        { name = "MODEL_IMAGE_PROFILES", value = jsonencode(var.model_image_profiles) },
       ]
       logConfiguration = {
         logDriver = "awslogs"
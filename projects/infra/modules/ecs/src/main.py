@@ -6,19 +6,70 @@
 import json
 import logging
 import os
+import signal
+import socket
 import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Iterator
 
 import boto3
 from botocore.config import Config
 from botocore.exceptions import ClientError
-
+from botocore.exceptions import ConnectionError as BotocoreConnectionError
+from botocore.exceptions import HTTPClientError
+
+from image_captioning_assistant.aws.dynamodb import (
+    acquire_work_lease,
+    add_job_usage,
+    ATTEMPTS,
+    build_set_expression,
+    is_condition_failure,
+    PAGES_FAILED,
+    PAGES_PROCESSED,
+    PROCESSING_MS,
+    record_page_count,
+    renew_work_lease,
+    transition_work_status,
+    USAGE,
+)
+from image_captioning_assistant.aws.result_store import prepare_result
 from image_captioning_assistant.generate.bias_analysis.generate_bias_analysis import (
     generate_bias_analysis_from_s3_images,
 )
+from image_captioning_assistant.generate.derivatives import generate_derivatives_from_s3_images, PREVIEW, THUMBNAIL
 from image_captioning_assistant.generate.metadata.generate_metadata import generate_metadata_from_s3_images
+from image_captioning_assistant.generate.pages import cache_documents, expand_image_s3_uris, first_page_uris
+from image_captioning_assistant.generate.pixel_budget import get_pixel_budget
+from image_captioning_assistant.monitoring.images import record_work_images
+from image_captioning_assistant.monitoring.memory import record_work_memory, WorkMemory
+from image_captioning_assistant.monitoring.rollup import (
+    add_usage_totals,
+    clear_in_flight,
+    ensure_rollup,
+    record_work_completed,
+    register_in_flight,
+    renew_in_flight,
+)
+from image_captioning_assistant.monitoring.spans import (
+    configure_sinks,
+    DYNAMODB_GET,
+    DYNAMODB_WRITE,
+    EmfSink,
+    metric_context,
+    record_work_timings,
+    S3_FETCH,
+    set_dimensions,
+    span,
+    SQS_RECEIVE,
+)
+from image_captioning_assistant.monitoring.usage import record_work_usage, WorkUsage
 
 AWS_REGION = os.environ["AWS_REGION"]
 WORKS_TABLE_NAME = os.environ["WORKS_TABLE_NAME"]
+JOBS_TABLE_NAME = os.environ["JOBS_TABLE_NAME"]
 SQS_QUEUE_URL = os.environ["SQS_QUEUE_URL"]
 UPLOADS_BUCKET_NAME = os.environ["UPLOADS_BUCKET_NAME"]
 S3_CONFIG = Config(
@@ -43,12 +94,55 @@ JOB_NAME = "job_name"
 JOB_TYPE = "job_type"
 WORK_ID = "work_id"
 IMAGE_S3_URIS = "image_s3_uris"
+PAGE_S3_URIS = "page_s3_uris"
 CONTEXT_S3_URI = "context_s3_uri"
 ORIGINAL_METADATA_S3_URI = "original_metadata_s3_uri"
 WORK_STATUS = "work_status"
+THUMBNAIL_S3_URIS = "thumbnail_s3_uris"
+PREVIEW_S3_URIS = "preview_s3_uris"
+LATENCY_BREAKDOWN = "latency_breakdown"
+MEMORY = "memory"
+PAGE_IMAGES = "page_images"
+LAST_ERROR = "last_error"
 READY_FOR_REVIEW = "READY FOR REVIEW"
 IN_PROGRESS = "IN PROGRESS"
 FAILED_TO_PROCESS = "FAILED TO PROCESS"
+IN_QUEUE = "IN QUEUE"
+RECEIVE_WAIT_TIME_SECONDS = 20
+# 0 exits on the first empty receive; a positive value keeps the worker resident for that many idle seconds
+WORKER_IDLE_TIMEOUT_SECONDS = int(os.environ.get("WORKER_IDLE_TIMEOUT_SECONDS", "0"))
+# Time allowed to finish the current message after SIGTERM, below the container's stop timeout
+WORKER_SHUTDOWN_GRACE_SECONDS = int(os.environ.get("WORKER_SHUTDOWN_GRACE_SECONDS", "20"))
+# Failed attempts of a work with transient errors before it is marked as failed. Attempts are counted on the work,
+# as releases on shutdown also redeliver its message; the queue's maxReceiveCount must be comfortably above this.
+WORKER_MAX_ATTEMPTS = int(os.environ.get("WORKER_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY_SECONDS = int(os.environ.get("RETRY_BASE_DELAY_SECONDS", "60"))
+MAX_VISIBILITY_TIMEOUT_SECONDS = 43200
+# A work whose lease has expired is considered abandoned and may be claimed by another worker
+WORK_LEASE_SECONDS = int(os.environ.get("WORK_LEASE_SECONDS", "900"))
+# Seconds a received message stays invisible to other workers
+MESSAGE_VISIBILITY_SECONDS = int(os.environ.get("MESSAGE_VISIBILITY_SECONDS", "600"))
+# Interval at which the lease and the message's visibility are extended while a work is processed, well below both
+WORK_HEARTBEAT_SECONDS = int(
+    os.environ.get("WORK_HEARTBEAT_SECONDS", str(max(1, min(WORK_LEASE_SECONDS, MESSAGE_VISIBILITY_SECONDS) // 4)))
+)
+# Trace Python allocations per work with tracemalloc, on top of RSS sampling, at some cost in speed
+WORKER_TRACE_MALLOC = os.environ.get("WORKER_TRACE_MALLOC", "false").lower() == "true"
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+TRANSIENT_ERROR_CODES = {
+    "InternalFailure",
+    "InternalServerException",
+    "ModelNotReadyException",
+    "ModelTimeoutException",
+    "ProvisionedThroughputExceededException",
+    "RequestTimeout",
+    "RequestLimitExceeded",
+    "ServiceUnavailable",
+    "ServiceUnavailableException",
+    "SlowDown",
+    "ThrottlingException",
+    "TooManyRequestsException",
+}
 
 # Set up logging
 logger = logging.getLogger()
@@ -63,6 +157,10 @@ s3 = boto3.client("s3", config=S3_CONFIG, region_name=AWS_REGION)
 sqs = boto3.client("sqs", region_name=AWS_REGION)
 dynamodb = boto3.resource("dynamodb", region_name=AWS_REGION)
 table = dynamodb.Table(WORKS_TABLE_NAME)
+jobs_table = dynamodb.Table(JOBS_TABLE_NAME)
+shutdown_requested = threading.Event()
+# Set while the outcome of a message is recorded, which the shutdown alarm must not interrupt halfway
+recording_outcome = threading.Event()
 
 
 def get_work_details(job_name: str, work_id: str) -> dict:
@@ -92,49 +190,50 @@ def update_dynamodb_item(
     work_id: str,
     update_data: dict | None = None,
     status: str | None = None,
+    from_status: str | None = None,
 ) -> None:
     """Update a DynamoDB item with new data and/or status.
 
+    Status changes also move the work between the job's status counters, so from_status is required
+    whenever status is provided. Works leaving IN PROGRESS must be leased by this worker.
+
     Args:
         job_name (str): The job name
         work_id (str): The work ID
         update_data (dict, optional): Dictionary of field-value pairs to update
         status (str, optional): New status to set for the work item
+        from_status (str, optional): Current status of the work item
     """
     try:
-        # Start with empty update parts
-        update_expression_parts = []
-        expression_attribute_names = {}
-        expression_attribute_values = {}
-
-        # Add status update if provided
-        if status is not None:
-            update_expression_parts.append("#status = :status")
-            expression_attribute_names["#status"] = WORK_STATUS
-            expression_attribute_values[":status"] = status
-
-        # Add field updates from update_data if provided
-        if update_data:
-            for key, value in update_data.items():
-                update_expression_parts.append(f"#{key} = :{key}")
-                expression_attribute_names[f"#{key}"] = key
-                expression_attribute_values[f":{key}"] = value
-
         # If nothing to update, return early
-        if not update_expression_parts:
+        if status is None and not update_data:
             logger.warning(f"No updates provided for job={job_name}, work={work_id}")
             return
 
-        # Create the full update expression
-        update_expression = "SET " + ", ".join(update_expression_parts)
-
-        # Perform the update
-        table.update_item(
-            Key={JOB_NAME: job_name, WORK_ID: work_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeNames=expression_attribute_names,
-            ExpressionAttributeValues=expression_attribute_values,
-        )
+        if status is not None:
+            if from_status is None:
+                raise ValueError("from_status is required to change work_status")
+            transition_work_status(
+                works_table=table,
+                jobs_table=jobs_table,
+                job_name=job_name,
+                work_id=work_id,
+                from_status=from_status,
+                to_status=status,
+                update_data=update_data,
+                lease_owner=WORKER_ID if from_status == IN_PROGRESS else None,
+            )
+        else:
+            # Not empty when no status is set, as checked above
+            update_expression, expression_attribute_names, expression_attribute_values = build_set_expression(
+                update_data or {}
+            )
+            table.update_item(
+                Key={JOB_NAME: job_name, WORK_ID: work_id},
+                UpdateExpression=update_expression,
+                ExpressionAttributeNames=expression_attribute_names,
+                ExpressionAttributeValues=expression_attribute_values,
+            )
 
         # Log appropriate message based on what was updated
         log_message = f"Updated DynamoDB item for job={job_name}, work={work_id}"
@@ -151,105 +250,493 @@ def update_dynamodb_item(
         raise
 
 
-def process_sqs_messages() -> None:
-    """Process SQS messages."""
-    while True:
-        # Receive message from SQS queue
-        logging.info("Retrieving messages from SQS queue")
-        response = sqs.receive_message(
-            QueueUrl=SQS_QUEUE_URL,
-            AttributeNames=["All"],
-            MaxNumberOfMessages=1,
-            MessageAttributeNames=["All"],
-            VisibilityTimeout=600,
-            WaitTimeSeconds=0,
+def generate_derivatives(image_s3_uris: list[str]) -> dict:
+    """Generate thumbnails and previews for the review UI, which must not fail the work."""
+    try:
+        derivative_uris = generate_derivatives_from_s3_images(image_s3_uris=image_s3_uris, s3_kwargs=S3_KWARGS)
+        return {
+            THUMBNAIL_S3_URIS: derivative_uris[THUMBNAIL],
+            PREVIEW_S3_URIS: derivative_uris[PREVIEW],
+        }
+    except Exception as exc:
+        logger.warning(f"Failed to generate image derivatives, full-size images will be served: {exc}")
+        return {}
+
+
+class WorkHeartbeat:
+    """Extend the lease of the work being processed and the visibility of its message until stopped.
+
+    Without it, a work running longer than the visibility timeout is delivered again, and one running longer
+    than its lease is taken over by another worker while still being processed. Once the lease could not be
+    renewed, lease_lost is set and the work's result must not be saved.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a stopped heartbeat with its own table resource, as resources are not thread-safe."""
+        self._table = boto3.session.Session().resource("dynamodb", region_name=AWS_REGION).Table(WORKS_TABLE_NAME)
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.lease_lost = threading.Event()
+
+    def start(self, message: dict, job_name: str, work_id: str) -> None:
+        """Start extending the lease on a work and the visibility of its message in the background."""
+        self._stopped.clear()
+        self.lease_lost.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(message, job_name, work_id), name="work-heartbeat", daemon=True
         )
-        logging.info("Retrieved messages from SQS queue")
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop extending, waiting for an extension in progress so that it cannot undo a release of the message."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def check_lease(self, job_name: str, work_id: str) -> None:
+        """Raise LeaseLost if the lease on the work could not be renewed."""
+        if self.lease_lost.is_set():
+            raise LeaseLost(f"Lost the lease on job={job_name} work={work_id}")
+
+    def _run(self, message: dict, job_name: str, work_id: str) -> None:
+        """Extend the lease and the message's visibility every WORK_HEARTBEAT_SECONDS."""
+        while not self._stopped.wait(WORK_HEARTBEAT_SECONDS):
+            try:
+                sqs.change_message_visibility(
+                    QueueUrl=SQS_QUEUE_URL,
+                    ReceiptHandle=message["ReceiptHandle"],
+                    VisibilityTimeout=MESSAGE_VISIBILITY_SECONDS,
+                )
+                renewed = renew_work_lease(
+                    works_table=self._table,
+                    job_name=job_name,
+                    work_id=work_id,
+                    owner_id=WORKER_ID,
+                    lease_seconds=WORK_LEASE_SECONDS,
+                    leased_status=IN_PROGRESS,
+                )
+            except Exception as exc:
+                # Retried on the next beat, which comes well before the lease or visibility runs out
+                logger.warning(f"Could not extend the lease on job={job_name} work={work_id}: {exc}")
+                continue
+            if not renewed:
+                logger.error(f"Lost the lease on job={job_name} work={work_id}, its result will not be saved")
+                self.lease_lost.set()
+                return
+            renew_in_flight(jobs_table, WORKER_ID, WORK_LEASE_SECONDS)
+            logger.debug(f"Extended the lease on job={job_name} work={work_id}")
 
-        # Check if there are any messages
-        if "Messages" not in response:
-            logger.info("No more messages in the queue.")
-            sys.exit()
 
-        for message in response["Messages"]:
-            try:
-                # Parse the message body
-                message_body = json.loads(message["Body"])
-                job_name = message_body[JOB_NAME]
-                work_id = message_body[WORK_ID]
-
-                # Get work details from DynamoDB instead of SQS message
-                work_item = get_work_details(job_name, work_id)
-
-                job_type = work_item[JOB_TYPE]
-                context_s3_uri = work_item[CONTEXT_S3_URI]
-                image_s3_uris = work_item[IMAGE_S3_URIS]
-                original_metadata_s3_uri = work_item[ORIGINAL_METADATA_S3_URI]
-
-                logger.info(f"Job name: {job_name}")
-                logger.info(f"Work ID: {work_id}")
-                logger.info(f"Job type: {job_type}")
-                logger.info(f"Context S3 URI: {context_s3_uri}")
-                logger.info(f"Image S3 URIs: {image_s3_uris}")
-                logger.info(f"Original metadata S3 URI: {original_metadata_s3_uri}")
-
-                # Update work_status for the item in DynamoDB to "IN PROGRESS"
-                update_dynamodb_item(job_name=job_name, work_id=work_id, status=IN_PROGRESS)
-
-                if job_type == "metadata":
-                    work_structured_metadata = generate_metadata_from_s3_images(
-                        image_s3_uris=image_s3_uris,
-                        context_s3_uri=context_s3_uri,
-                        llm_kwargs=LLM_KWARGS,
-                        s3_kwargs=S3_KWARGS,
-                        resize_kwargs=RESIZE_KWARGS,
-                    )
-                    work_bias_analysis = generate_bias_analysis_from_s3_images(
-                        image_s3_uris=image_s3_uris,
-                        context_s3_uri=context_s3_uri,
-                        original_metadata_s3_uri=original_metadata_s3_uri,
-                        llm_kwargs=LLM_KWARGS,
-                        s3_kwargs=S3_KWARGS,
-                        resize_kwargs=RESIZE_KWARGS,
-                    )
-                    # Update DynamoDB with the bias_analysis field
-                    update_data = work_structured_metadata.model_dump() | work_bias_analysis.model_dump()
-                elif job_type == "bias":
-                    work_bias_analysis = generate_bias_analysis_from_s3_images(
-                        image_s3_uris=image_s3_uris,
-                        context_s3_uri=context_s3_uri,
-                        original_metadata_s3_uri=original_metadata_s3_uri,
-                        llm_kwargs=LLM_KWARGS,
-                        s3_kwargs=S3_KWARGS,
-                        resize_kwargs=RESIZE_KWARGS,
-                    )
-                    update_data = work_bias_analysis.model_dump()
-                else:
-                    raise ValueError(f"{JOB_TYPE}='{job_type}' not supported")
+class LeaseLost(Exception):
+    """Raised when another worker or a recovery took over the work being processed.
+
+    The work's outcome belongs to its new owner, so the message is acknowledged as a duplicate instead of failed.
+    """
+
+
+class WorkerShutdown(BaseException):
+    """Raised when the shutdown grace period ends before the current message is finished.
+
+    Derives from BaseException so that the per-message failure handling does not mark the work as failed.
+    """
 
-                # Update DynamoDB and SQS
+
+def handle_sigterm(signum: int, frame: object) -> None:
+    """Stop receiving messages and give the current message a grace period to finish."""
+    logger.info(f"Received signal {signum}, shutting down within {WORKER_SHUTDOWN_GRACE_SECONDS} seconds")
+    shutdown_requested.set()
+    signal.signal(signal.SIGALRM, handle_shutdown_alarm)
+    signal.alarm(WORKER_SHUTDOWN_GRACE_SECONDS)
+
+
+def handle_shutdown_alarm(signum: int, frame: object) -> None:
+    """Interrupt the current message once the shutdown grace period is over, unless its outcome is being recorded."""
+    if recording_outcome.is_set():
+        logger.info("Shutdown grace period elapsed while recording the outcome of a message, finishing it first")
+        return
+    raise WorkerShutdown("Shutdown grace period elapsed")
+
+
+@contextmanager
+def outcome_recording() -> Iterator[None]:
+    """Hold off the shutdown alarm while a work's status and its message are changed, so neither is left half done.
+
+    The alarm is handled in the main thread whichever thread receives it, so it is ignored there rather than masked.
+    The worker then stops at its next check of shutdown_requested.
+    """
+    recording_outcome.set()
+    try:
+        yield
+    finally:
+        recording_outcome.clear()
+
+
+def check_shutdown() -> None:
+    """Stop at a stage boundary once a shutdown is requested, rather than start a stage the grace period cuts short."""
+    if shutdown_requested.is_set():
+        raise WorkerShutdown("Shutdown requested")
+
+
+def release_message(
+    message: dict,
+    job_name: str | None,
+    work_id: str | None,
+    work_status: str | None,
+    visibility_timeout: int = 0,
+    update_data: dict | None = None,
+) -> None:
+    """Make an unfinished message visible again, optionally after a delay, and put its work back in the queue.
+
+    A work that could not be put back in the queue keeps its message hidden until its lease runs out, when any
+    worker may take it over.
+
+    Args:
+        message (dict): The SQS message.
+        job_name (str, optional): The job name, if the message was parsed.
+        work_id (str, optional): The work ID, if the message was parsed.
+        work_status (str, optional): The work's current status, if known.
+        visibility_timeout (int): Seconds before the message can be received again.
+        update_data (dict, optional): Additional field-value pairs to set on the work.
+    """
+    if job_name and work_id:
+        try:
+            if work_status == IN_PROGRESS:
                 update_dynamodb_item(
                     job_name=job_name,
                     work_id=work_id,
                     update_data=update_data,
-                    status=READY_FOR_REVIEW,
+                    status=IN_QUEUE,
+                    from_status=IN_PROGRESS,
                 )
-                sqs.delete_message(QueueUrl=SQS_QUEUE_URL, ReceiptHandle=message["ReceiptHandle"])
-                logger.info(f"Job {job_name} complete and ready for review")
-            except Exception as exc:
-                logger.exception(f"Message {message['MessageId']} failed with error {str(exc)}")
+            elif update_data:
+                update_dynamodb_item(job_name=job_name, work_id=work_id, update_data=update_data)
+        except Exception as exc:
+            logger.error(f"Could not put job={job_name} work={work_id} back in the queue: {exc}")
+            if work_status == IN_PROGRESS:
+                # Still leased: another worker receiving the message now would take it for a duplicate
+                visibility_timeout = max(visibility_timeout, WORK_LEASE_SECONDS)
+    try:
+        sqs.change_message_visibility(
+            QueueUrl=SQS_QUEUE_URL,
+            ReceiptHandle=message["ReceiptHandle"],
+            VisibilityTimeout=visibility_timeout,
+        )
+        logger.info(f"Released message {message['MessageId']} for job={job_name} work={work_id}")
+    except Exception as exc:
+        logger.error(f"Could not release message {message['MessageId']}: {exc}")
 
-                # Parse the message body to get the job_name and work_id
-                message_body = json.loads(message["Body"])
-                job_name = message_body[JOB_NAME]
-                work_id = message_body[WORK_ID]
 
-                # Update work_status for the item in DynamoDB to "FAILED TO PROCESS"
-                update_dynamodb_item(job_name=job_name, work_id=work_id, status=FAILED_TO_PROCESS)
+def record_job_usage(job_name: str, work_usage: WorkUsage, totals: dict[str, int] | None = None) -> None:
+    """Add a work's token usage and counters to its job's and all jobs' totals, logging rather than raising errors."""
+    usage_by_model = work_usage.totals()
+    try:
+        add_job_usage(jobs_table, job_name, usage_by_model, totals)
+    except Exception as e:
+        logger.error(f"Could not add usage to job={job_name}: {e}")
+    add_usage_totals(jobs_table, usage_by_model, totals)
+
+
+def record_expanded_pages(job_name: str, work_id: str, page_count: int, submitted_page_count: int) -> None:
+    """Correct the job's total pages for a work's expanded documents, logging rather than raising errors."""
+    try:
+        record_page_count(table, jobs_table, job_name, work_id, page_count, submitted_page_count)
+    except Exception as e:
+        logger.error(f"Could not record the page count of job={job_name} work={work_id}: {e}")
+
+
+def work_memory_summary(work_memory: WorkMemory) -> dict[str, Any]:
+    """Peak memory of a work so far, with the pixels it decoded at once and how often decodes waited for memory."""
+    work_memory.sample()
+    decode_stats = get_pixel_budget().stats()
+    summary: dict[str, Any] = work_memory.summary() | {
+        "peak_decode_pixels": decode_stats["peak_in_use"],
+        "decode_waits": decode_stats["waits"],
+    }
+    logger.info(f"Work memory: {summary}")
+    return summary
+
+
+def is_transient_error(exc: BaseException | None) -> bool:
+    """Whether an error, or the error it was raised from, may succeed on retry, such as a throttle or timeout."""
+    while exc is not None:
+        if isinstance(exc, ClientError):
+            error_code = exc.response.get("Error", {}).get("Code")
+            status_code = exc.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+            return error_code in TRANSIENT_ERROR_CODES or status_code >= 500
+        if isinstance(exc, (BotocoreConnectionError, HTTPClientError)):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def get_retry_delay(attempt: int) -> int:
+    """Exponentially increasing visibility timeout before the next attempt of a message."""
+    return int(min(RETRY_BASE_DELAY_SECONDS * 2 ** (attempt - 1), MAX_VISIBILITY_TIMEOUT_SECONDS))
+
 
-                # Always delete the message from the queue after handling the failure
-                sqs.delete_message(QueueUrl=SQS_QUEUE_URL, ReceiptHandle=message["ReceiptHandle"])
+def process_sqs_messages() -> None:
+    """Process SQS messages until the queue stays empty for the idle window or a shutdown is requested."""
+    last_message_time = time.monotonic()
+    heartbeat = WorkHeartbeat()
+    while not shutdown_requested.is_set():
+        # Receive message from SQS queue, long polling so that an empty response means an empty queue
+        logging.info("Retrieving messages from SQS queue")
+        with span(SQS_RECEIVE):
+            response = sqs.receive_message(
+                QueueUrl=SQS_QUEUE_URL,
+                AttributeNames=["All"],
+                MaxNumberOfMessages=1,
+                MessageAttributeNames=["All"],
+                VisibilityTimeout=MESSAGE_VISIBILITY_SECONDS,
+                WaitTimeSeconds=RECEIVE_WAIT_TIME_SECONDS,
+            )
+        logging.info("Retrieved messages from SQS queue")
+
+        # Check if there are any messages
+        if "Messages" not in response:
+            idle_seconds = time.monotonic() - last_message_time
+            if idle_seconds >= WORKER_IDLE_TIMEOUT_SECONDS:
+                logger.info(f"No more messages in the queue after {idle_seconds:.0f} idle seconds.")
+                return
+            continue
+        last_message_time = time.monotonic()
+
+        for message in response["Messages"]:
+            job_name = work_id = work_status = None
+            work_item: dict | None = None
+            page_count = 0
+            # The work's own attempt count replaces this once it is read
+            attempt = 1
+            if shutdown_requested.is_set():
+                with outcome_recording():
+                    release_message(message, job_name, work_id, work_status)
+                continue
+            # Calls made for a redelivered message are all retries
+            receive_count = int(message.get("Attributes", {}).get("ApproximateReceiveCount", 1))
+            # The latency breakdown, token usage and metric dimensions of this message only
+            with (
+                metric_context(),
+                record_work_timings() as work_timings,
+                record_work_usage(is_retry=receive_count > 1) as work_usage,
+                record_work_memory(trace_python=WORKER_TRACE_MALLOC) as work_memory,
+                record_work_images() as work_images,
+                cache_documents(S3_KWARGS),
+            ):
+                get_pixel_budget().reset_stats()
+                try:
+                    # Parse the message body
+                    message_body = json.loads(message["Body"])
+                    job_name = message_body[JOB_NAME]
+                    work_id = message_body[WORK_ID]
+                    set_dimensions(job_name=job_name, work_id=work_id)
+
+                    # Get work details from DynamoDB instead of SQS message
+                    with span(DYNAMODB_GET):
+                        work_item = get_work_details(job_name, work_id)
+
+                    job_type = work_item[JOB_TYPE]
+                    context_s3_uri = work_item[CONTEXT_S3_URI]
+                    image_s3_uris = work_item[IMAGE_S3_URIS]
+                    original_metadata_s3_uri = work_item[ORIGINAL_METADATA_S3_URI]
+                    work_status = work_item[WORK_STATUS]
+                    attempt = int(work_item.get(ATTEMPTS, 0)) + 1
+                    page_count = len(image_s3_uris)
+                    set_dimensions(job_type=job_type, page_count=page_count)
+
+                    logger.info(f"Job name: {job_name}")
+                    logger.info(f"Work ID: {work_id}")
+                    logger.info(f"Job type: {job_type}")
+                    logger.info(f"Context S3 URI: {context_s3_uri}")
+                    logger.info(f"Image S3 URIs: {image_s3_uris}")
+                    logger.info(f"Original metadata S3 URI: {original_metadata_s3_uri}")
+
+                    # Lease the work, so that duplicate deliveries and finished works are not processed again
+                    with span(DYNAMODB_WRITE):
+                        leased = acquire_work_lease(
+                            works_table=table,
+                            jobs_table=jobs_table,
+                            job_name=job_name,
+                            work_id=work_id,
+                            owner_id=WORKER_ID,
+                            lease_seconds=WORK_LEASE_SECONDS,
+                            queued_status=IN_QUEUE,
+                            leased_status=IN_PROGRESS,
+                        )
+                    if not leased:
+                        logger.info(f"Acknowledging duplicate of job={job_name} work={work_id} ({work_status})")
+                        sqs.delete_message(QueueUrl=SQS_QUEUE_URL, ReceiptHandle=message["ReceiptHandle"])
+                        continue
+                    work_status = IN_PROGRESS
+                    heartbeat.start(message, job_name, work_id)
+                    check_shutdown()
+
+                    # Replace each multi-page TIFF or PDF with its pages, downloading it once for the whole work
+                    with span(S3_FETCH):
+                        page_s3_uris = expand_image_s3_uris(image_s3_uris, S3_KWARGS)
+                    expanded = page_s3_uris != image_s3_uris
+                    # Structured metadata reads one or two images, so it sees the first page of each document
+                    metadata_s3_uris = first_page_uris(page_s3_uris)
+                    if expanded:
+                        record_expanded_pages(job_name, work_id, len(page_s3_uris), len(image_s3_uris))
+                        image_s3_uris = page_s3_uris
+                        page_count = len(image_s3_uris)
+                        set_dimensions(page_count=page_count)
+                    register_in_flight(jobs_table, WORKER_ID, job_name, work_id, page_count, WORK_LEASE_SECONDS)
+                    check_shutdown()
+
+                    if job_type == "metadata":
+                        work_structured_metadata = generate_metadata_from_s3_images(
+                            image_s3_uris=metadata_s3_uris,
+                            context_s3_uri=context_s3_uri,
+                            llm_kwargs=LLM_KWARGS,
+                            s3_kwargs=S3_KWARGS,
+                            resize_kwargs=RESIZE_KWARGS,
+                        )
+                        check_shutdown()
+                        work_bias_analysis = generate_bias_analysis_from_s3_images(
+                            image_s3_uris=image_s3_uris,
+                            context_s3_uri=context_s3_uri,
+                            original_metadata_s3_uri=original_metadata_s3_uri,
+                            llm_kwargs=LLM_KWARGS,
+                            s3_kwargs=S3_KWARGS,
+                            resize_kwargs=RESIZE_KWARGS,
+                        )
+                        # Update DynamoDB with the bias_analysis field
+                        update_data = work_structured_metadata.model_dump() | work_bias_analysis.model_dump()
+                    elif job_type == "bias":
+                        work_bias_analysis = generate_bias_analysis_from_s3_images(
+                            image_s3_uris=image_s3_uris,
+                            context_s3_uri=context_s3_uri,
+                            original_metadata_s3_uri=original_metadata_s3_uri,
+                            llm_kwargs=LLM_KWARGS,
+                            s3_kwargs=S3_KWARGS,
+                            resize_kwargs=RESIZE_KWARGS,
+                        )
+                        update_data = work_bias_analysis.model_dump()
+                    else:
+                        raise ValueError(f"{JOB_TYPE}='{job_type}' not supported")
+                    # Sizes of each page as uploaded and as sent to the model, offloaded with the result if large
+                    update_data[PAGE_IMAGES] = work_images.pages()
+                    update_data |= generate_derivatives(image_s3_uris)
+                    if expanded:
+                        # The page each entry of page_biases, thumbnails and previews belongs to
+                        update_data[PAGE_S3_URIS] = image_s3_uris
+
+                    # Keep the item under DynamoDB's size limit by offloading long results, page lists included, to S3
+                    heartbeat.check_lease(job_name, work_id)
+                    update_data = prepare_result(
+                        result=update_data,
+                        bucket=UPLOADS_BUCKET_NAME,
+                        job_name=job_name,
+                        work_id=work_id,
+                        s3_kwargs=S3_KWARGS,
+                    )
+                    update_data[LATENCY_BREAKDOWN] = work_timings.breakdown()
+                    update_data[MEMORY] = work_memory_summary(work_memory)
+                    update_data[USAGE] = work_usage.totals()
+
+                    # Update DynamoDB and SQS, while the lease and the message are still extended well ahead
+                    with outcome_recording():
+                        heartbeat.stop()
+                        heartbeat.check_lease(job_name, work_id)
+                        with span(DYNAMODB_WRITE):
+                            try:
+                                update_dynamodb_item(
+                                    job_name=job_name,
+                                    work_id=work_id,
+                                    update_data=update_data,
+                                    status=READY_FOR_REVIEW,
+                                    from_status=work_status,
+                                )
+                            except ClientError as e:
+                                if is_condition_failure(e):
+                                    raise LeaseLost(f"job={job_name} work={work_id} is no longer leased to us") from e
+                                raise
+                        sqs.delete_message(QueueUrl=SQS_QUEUE_URL, ReceiptHandle=message["ReceiptHandle"])
+                        duration_ms = work_timings.breakdown()["total_ms"]
+                        record_job_usage(
+                            job_name, work_usage, {PAGES_PROCESSED: page_count, PROCESSING_MS: duration_ms}
+                        )
+                        record_work_completed(jobs_table, WORKER_ID, duration_ms, page_count)
+                        logger.info(f"Job {job_name} complete and ready for review")
+                except LeaseLost as exc:
+                    with outcome_recording():
+                        heartbeat.stop()
+                        logger.warning(f"{exc}, acknowledging message {message['MessageId']} as a duplicate")
+                        try:
+                            sqs.delete_message(QueueUrl=SQS_QUEUE_URL, ReceiptHandle=message["ReceiptHandle"])
+                        except Exception as delete_exc:
+                            logger.error(f"Could not delete message {message['MessageId']}: {delete_exc}")
+                        # The tokens were spent all the same, but the work's pages are counted by its new owner
+                        if job_name is not None:
+                            record_job_usage(job_name, work_usage)
+                        clear_in_flight(jobs_table, WORKER_ID)
+                except WorkerShutdown:
+                    with outcome_recording():
+                        heartbeat.stop()
+                        release_message(message, job_name, work_id, work_status)
+                        if work_status == IN_PROGRESS:
+                            clear_in_flight(jobs_table, WORKER_ID)
+                        raise
+                except Exception as exc:
+                    with outcome_recording():
+                        heartbeat.stop()
+                        logger.exception(f"Message {message['MessageId']} failed with error {str(exc)}")
+
+                        # Parse the message body to get the job_name and work_id
+                        message_body = json.loads(message["Body"])
+                        job_name = message_body[JOB_NAME]
+                        work_id = message_body[WORK_ID]
+                        failure_data: dict[str, Any] = {
+                            LAST_ERROR: f"{type(exc).__name__}: {exc}"[:1000],
+                            MEMORY: work_memory_summary(work_memory),
+                        }
+                        if work_item is not None:
+                            # Only failures use up attempts; failures before the work is read are bounded by the
+                            # queue's redrive policy instead
+                            failure_data[ATTEMPTS] = attempt
+                        if work_usage.models:
+                            failure_data[USAGE] = work_usage.totals()
+                        retrying = is_transient_error(exc) and attempt < WORKER_MAX_ATTEMPTS
+                        # Tokens spent on a failed attempt count towards the job's cost
+                        record_job_usage(job_name, work_usage, None if retrying else {PAGES_FAILED: page_count})
+                        if work_status == IN_PROGRESS:
+                            clear_in_flight(jobs_table, WORKER_ID)
+
+                        # Transient errors are retried later by leaving the message in the queue
+                        if retrying:
+                            retry_delay = get_retry_delay(attempt)
+                            logger.info(f"Retrying job={job_name} work={work_id} in {retry_delay}s (attempt {attempt})")
+                            release_message(message, job_name, work_id, work_status, retry_delay, failure_data)
+                            continue
+
+                        # Update work_status for the item in DynamoDB to "FAILED TO PROCESS"
+                        try:
+                            if work_status is None:
+                                work_status = get_work_details(job_name, work_id)[WORK_STATUS]
+                            update_dynamodb_item(
+                                job_name=job_name,
+                                work_id=work_id,
+                                update_data=failure_data,
+                                status=FAILED_TO_PROCESS,
+                                from_status=work_status,
+                            )
+                        except Exception as status_exc:
+                            logger.error(f"Could not mark job={job_name} work={work_id} as failed: {status_exc}")
+
+                        # Out of attempts, or a deterministic error that would fail again: the work is recovered from
+                        # its status instead
+                        sqs.delete_message(QueueUrl=SQS_QUEUE_URL, ReceiptHandle=message["ReceiptHandle"])
 
 
 if __name__ == "__main__":
-    process_sqs_messages()
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    configure_sinks(EmfSink())
+    ensure_rollup(jobs_table)
+    try:
+        process_sqs_messages()
+        signal.alarm(0)
+    except WorkerShutdown:
+        logger.info("Worker stopped before finishing its current message")
+    logger.info("Worker exiting")
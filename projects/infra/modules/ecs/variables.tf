@@ -23,6 +23,11 @@ variable "works_table_name" {
   type        = string
 }
 
+variable "jobs_table_name" {
+  description = "Name of the DynamoDB jobs table"
+  type        = string
+}
+
 variable "deployment_prefix" {
   description = "Unique name of the deployment"
   type        = string
@@ -52,3 +57,57 @@ variable "ecr_processor_repository_url" {
   description = "URL of ECR repository for processor image"
   type        = string
 }
+
+variable "worker_idle_timeout_seconds" {
+  description = "Seconds a worker stays resident without messages before exiting; 0 exits on the first empty receive"
+  type        = number
+  default     = 300
+}
+
+variable "worker_shutdown_grace_seconds" {
+  description = "Seconds a worker has to finish its current message after SIGTERM before releasing it"
+  type        = number
+  default     = 20
+}
+
+variable "worker_max_attempts" {
+  description = "Failed attempts of a work with transient errors before it is marked as failed, below the queue's max_receive_count"
+  type        = number
+  default     = 3
+}
+
+variable "work_lease_seconds" {
+  description = "Seconds a worker holds a work before another worker may take it over"
+  type        = number
+  default     = 900
+}
+
+variable "message_visibility_seconds" {
+  description = "Seconds a received work message stays invisible to other workers, extended while it is processed"
+  type        = number
+  default     = 600
+}
+
+variable "work_heartbeat_seconds" {
+  description = "Interval at which the work lease and message visibility are extended, well below both"
+  type        = number
+  default     = 120
+}
+
+variable "pixel_budget" {
+  description = "Image pixels a worker decodes at once; larger decodes wait, sized to the task's memory"
+  type        = number
+  default     = 100000000
+}
+
+variable "worker_trace_malloc" {
+  description = "Whether workers trace Python allocations with tracemalloc to record each work's peak"
+  type        = bool
+  default     = false
+}
+
+variable "model_image_profiles" {
+  description = "Image profile fields by model ID substring, such as target_image_tokens, overriding the built-in profiles"
+  type        = any
+  default     = {}
+}
@@ -40,6 +40,7 @@ resource "aws_iam_policy" "create_job_policy" {
         Effect = "Allow"
         Action = [
           "sqs:SendMessage",
+          "sqs:GetQueueAttributes",
         ]
         Resource = [var.sqs_works_queue_arn]
       },
@@ -63,7 +64,7 @@ resource "aws_iam_policy" "create_job_policy" {
           "dynamodb:Query",
           "dynamodb:Scan"
         ]
-        Resource = [var.works_table_arn]
+        Resource = [var.works_table_arn, var.jobs_table_arn]
       },
       {
         Effect = "Allow"
@@ -132,7 +133,7 @@ resource "aws_iam_policy" "job_progress_policy" {
           "dynamodb:Query",
           "dynamodb:Scan"
         ]
-        Resource = [var.works_table_arn]
+        Resource = [var.works_table_arn, "${var.works_table_arn}/index/*", var.jobs_table_arn]
       }
     ]
   })
@@ -200,10 +201,11 @@ resource "aws_iam_policy" "overall_progress_policy" {
         Effect = "Allow"
         Action = [
           "dynamodb:GetItem",
+          "dynamodb:BatchGetItem",
           "dynamodb:Query",
           "dynamodb:Scan"
         ]
-        Resource = [var.works_table_arn]
+        Resource = [var.works_table_arn, var.jobs_table_arn]
       }
     ]
   })
@@ -248,10 +250,20 @@ resource "aws_iam_policy" "get_results_policy" {
         Effect = "Allow"
         Action = [
           "dynamodb:GetItem",
+          "dynamodb:BatchGetItem",
           "dynamodb:Query",
           "dynamodb:Scan"
         ]
         Resource = [var.works_table_arn]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject",
+        ]
+        Resource = [
+          "${var.uploads_bucket_arn}/results/*",
+        ]
       }
     ]
   })
@@ -349,7 +361,16 @@ resource "aws_iam_policy" "update_results_policy" {
           "dynamodb:GetItem",
           "dynamodb:UpdateItem"
         ]
-        Resource = [var.works_table_arn]
+        Resource = [var.works_table_arn, var.jobs_table_arn]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject",
+        ]
+        Resource = [
+          "${var.uploads_bucket_arn}/results/*",
+        ]
       }
     ]
   })
@@ -420,6 +441,7 @@ resource "aws_iam_policy" "ecs_task_policy" {
         Action = [
           "sqs:ReceiveMessage",
           "sqs:DeleteMessage",
+          "sqs:ChangeMessageVisibility",
           "sqs:GetQueueAttributes"
         ]
         Resource = [
@@ -433,7 +455,7 @@ resource "aws_iam_policy" "ecs_task_policy" {
           "dynamodb:PutItem",
           "dynamodb:UpdateItem",
         ]
-        Resource = [var.works_table_arn]
+        Resource = [var.works_table_arn, var.jobs_table_arn]
       },
       {
         Effect = "Allow"
@@ -447,6 +469,16 @@ resource "aws_iam_policy" "ecs_task_policy" {
           "${var.uploads_bucket_arn}/*",
         ]
       },
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:PutObject",
+        ]
+        Resource = [
+          "${var.uploads_bucket_arn}/derivatives/*",
+          "${var.uploads_bucket_arn}/results/*",
+        ]
+      },
       {
         Effect = "Allow"
         Action = [
@@ -8,6 +8,11 @@ variable "works_table_arn" {
   type        = string
 }
 
+variable "jobs_table_arn" {
+  description = "ARN of the DynamoDB jobs table"
+  type        = string
+}
+
 variable "website_bucket_arn" {
   description = "ARN of the S3 website bucket"
   type        = string
@@ -32,6 +32,7 @@ locals {
       role_arn    = var.create_job_role_arn
       environment = {
         WORKS_TABLE_NAME        = var.works_table_name
+        JOBS_TABLE_NAME         = var.jobs_table_name
         SQS_QUEUE_URL           = var.sqs_queue_url
         ECS_CLUSTER_NAME        = var.ecs_cluster_name
         ECS_CONTAINER_NAME      = "${var.deployment_prefix}-processing-container"
@@ -39,6 +40,8 @@ locals {
         ECS_SUBNET_IDS          = join(",", var.private_subnet_ids)
         ECS_SECURITY_GROUP_IDS  = join(",", [var.ecs_security_group_id])
         TASK_EXECUTION_ROLE_ARN = var.task_execution_role_arn
+        ECS_WORKS_PER_TASK      = var.ecs_works_per_task
+        ECS_MAX_TASKS           = var.ecs_max_tasks
       }
     }
     job_progress = {
@@ -47,7 +50,10 @@ locals {
       timeout     = 15
       role_arn    = var.job_progress_role_arn
       environment = {
-        WORKS_TABLE_NAME = var.works_table_name
+        WORKS_TABLE_NAME        = var.works_table_name
+        WORKS_STATUS_INDEX_NAME = var.works_status_index_name
+        JOBS_TABLE_NAME         = var.jobs_table_name
+        MODEL_PRICES            = jsonencode(var.model_prices)
       }
     }
     overall_progress = {
@@ -59,6 +65,8 @@ locals {
         SQS_QUEUE_URL           = var.sqs_queue_url
         ECS_CLUSTER_NAME        = var.ecs_cluster_name
         ECS_TASK_DEFINITION_ARN = var.ecs_task_definition_arn
+        JOBS_TABLE_NAME         = var.jobs_table_name
+        MODEL_PRICES            = jsonencode(var.model_prices)
       }
     }
     get_results = {
@@ -84,6 +92,7 @@ locals {
       role_arn    = var.update_results_role_arn
       environment = {
         WORKS_TABLE_NAME = var.works_table_name
+        JOBS_TABLE_NAME  = var.jobs_table_name
       }
     }
   }
@@ -131,6 +140,6 @@ resource "aws_lambda_function" "functions" {
   image_uri        = null
   filename         = data.archive_file.function_zips[each.key].output_path
   handler          = "index.handler"
-  runtime          = "ruby3.3"
-  source_code_hash = filebase64sha256("${each.value.source_dir}/index.rb")
+  runtime          = "python3.12"
+  source_code_hash = filebase64sha256("${each.value.source_dir}/index.py")
 }
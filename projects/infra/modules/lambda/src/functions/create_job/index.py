@@ -5,7 +5,10 @@
 
 import json
 import logging
+import math
 import os
+from bisect import bisect_left
+from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 from typing import Any, Dict
@@ -13,10 +16,12 @@ from urllib.parse import urlparse
 
 import boto3
 from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
 
 # Load environment variables
 AWS_REGION = os.environ["AWS_REGION"]
 WORKS_TABLE_NAME = os.environ["WORKS_TABLE_NAME"]
+JOBS_TABLE_NAME = os.environ["JOBS_TABLE_NAME"]
 SQS_QUEUE_URL = os.environ["SQS_QUEUE_URL"]
 ECS_CLUSTER_NAME = os.environ["ECS_CLUSTER_NAME"]
 ECS_TASK_DEFINITION_ARN = os.environ["ECS_TASK_DEFINITION_ARN"]
@@ -24,6 +29,8 @@ ECS_TASK_FAMILY_NAME = ECS_TASK_DEFINITION_ARN.split("/")[-1].split(":")[0]
 ECS_CONTAINER_NAME = os.environ["ECS_CONTAINER_NAME"]
 SUBNET_IDS = os.environ["ECS_SUBNET_IDS"].split(",")
 SECURITY_GROUP_IDS = os.environ["ECS_SECURITY_GROUP_IDS"].split(",")
+ECS_WORKS_PER_TASK = int(os.environ.get("ECS_WORKS_PER_TASK", "50"))
+ECS_MAX_TASKS = int(os.environ.get("ECS_MAX_TASKS", "10"))
 
 # Configs
 CORS_HEADERS = {
@@ -62,10 +69,28 @@ IMAGE_S3_URIS = "image_s3_uris"
 CONTEXT_S3_URI = "context_s3_uri"
 ORIGINAL_METADATA_S3_URI = "original_metadata_s3_uri"
 WORK_STATUS = "work_status"
+TOTAL_WORKS = "total_works"
+WORK_STATUS_COUNTS = "work_status_counts"
+TOTAL_PAGES = "total_pages"
+USAGE = "usage"
+PAGES_PROCESSED = "pages_processed"
+# Job name reserved for the workers' throughput and latency rollup in the jobs table
+ROLLUP_JOB_NAME = "__worker_rollup__"
+IN_QUEUE = "IN QUEUE"
+# Keys a shared prefix may hold, at least and per URI it covers, before its URIs are listed one by one instead
+MIN_PREFIX_LISTING_KEYS = 10_000
+PREFIX_LISTING_KEYS_PER_URI = 100
+MAX_TASKS_PER_RUN_TASK = 10  # ECS RunTask limit
+QUEUE_DEPTH_ATTRIBUTES = [
+    "ApproximateNumberOfMessages",
+    "ApproximateNumberOfMessagesDelayed",
+    "ApproximateNumberOfMessagesNotVisible",
+]
 
 # Initialize AWS clients globally
 dynamodb = boto3.resource("dynamodb", region_name=AWS_REGION)
 sqs = boto3.client("sqs", region_name=AWS_REGION)
+s3_client = boto3.client("s3", region_name=AWS_REGION)
 ecs_client = boto3.client("ecs", region_name=AWS_REGION)
 
 # Set up logging
@@ -169,36 +194,132 @@ def s3_path_to_file_list(s3_path_uri: str, recursive: bool = True) -> list[str]:
     return sorted(result_uris)
 
 
-def expand_s3_uris_to_files(uri_list: list[str], recursive: bool = True, max_workers: int = 10) -> list[str]:
-    """Expands a list of mixed S3 URIs (files and/or folders) into a flat list of all file URIs.
+def list_keys_under_prefix(bucket: str, prefix: str, max_keys: int) -> list[str] | None:
+    """List the keys under a prefix with a single paginated listing, sorted lexicographically.
+
+    Returns:
+        list[str] | None: Sorted keys, or None as soon as more than max_keys are listed, so that a prefix much
+            broader than the URIs it covers is not listed in full.
+    """
+    keys = []
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        keys.extend(obj["Key"] for obj in page.get("Contents", []))
+        if len(keys) > max_keys:
+            return None
+    # S3 already returns keys in UTF-8 binary order, sort anyway so bisect is safe
+    return sorted(keys)
+
+
+def keys_with_prefix(sorted_keys: list[str], prefix: str) -> list[str]:
+    """Return the contiguous run of keys in a sorted list that start with prefix."""
+    matches = []
+    for key in sorted_keys[bisect_left(sorted_keys, prefix) :]:
+        if not key.startswith(prefix):
+            break
+        matches.append(key)
+    return matches
+
+
+def resolve_s3_key_from_listing(bucket: str, key: str, sorted_keys: list[str], recursive: bool = True) -> list[str]:
+    """Resolve one S3 key against a pre-fetched listing, mirroring s3_path_to_file_list semantics."""
+    # Exact object match means the URI points to a file
+    index = bisect_left(sorted_keys, key)
+    if key and index < len(sorted_keys) and sorted_keys[index] == key:
+        return [f"s3://{bucket}/{key}"]
+
+    # Otherwise treat it as a folder
+    folder_prefix = key if key.endswith("/") else key + "/"
+    result_uris = []
+    for obj_key in keys_with_prefix(sorted_keys, folder_prefix):
+        # Skip the folder object itself
+        if obj_key == folder_prefix:
+            continue
+        # If not recursive, skip objects in subfolders
+        if not recursive and "/" in obj_key[len(folder_prefix) :]:
+            continue
+        result_uris.append(f"s3://{bucket}/{obj_key}")
+
+    # Fall back to plain prefix matching, e.g. 's3://bucket/job/work/page_'
+    if not result_uris and not key.endswith("/"):
+        result_uris = [f"s3://{bucket}/{obj_key}" for obj_key in keys_with_prefix(sorted_keys, key)]
+
+    return sorted(result_uris)
+
+
+def group_uris_by_listing_prefix(uri_list: list[str]) -> tuple[dict[tuple[str, str], list[str]], list[str]]:
+    """Group S3 URIs by bucket and top-level folder (e.g. the job name).
+
+    Returns:
+        tuple: Mapping of (bucket, common folder prefix) to the URIs it covers, and the URIs that should be
+            probed individually because they share no folder with any other URI.
+    """
+    groups = defaultdict(list)
+    for uri in uri_list:
+        parsed_uri = urlparse(uri)
+        if parsed_uri.scheme != "s3":
+            raise ValueError(f"Not a valid S3 URI: {uri}")
+        key = parsed_uri.path.lstrip("/")
+        top_level_folder = key.split("/", 1)[0] if "/" in key else ""
+        groups[(parsed_uri.netloc, top_level_folder)].append(uri)
+
+    listing_groups = {}
+    individual_uris = []
+    for (bucket, top_level_folder), uris in groups.items():
+        # A single URI or keys at the bucket root gain nothing from (or are unsafe for) a bulk listing
+        if not top_level_folder or len(uris) < 2:
+            individual_uris.extend(uris)
+            continue
+        keys = [urlparse(uri).path.lstrip("/") for uri in uris]
+        common_prefix = os.path.commonprefix(keys)
+        # Trim to a folder boundary so that the listing covers every URI in the group
+        common_prefix = common_prefix[: common_prefix.rfind("/") + 1]
+        listing_groups[(bucket, common_prefix)] = uris
+    return listing_groups, individual_uris
+
+
+def expand_s3_uris_in_bulk(uri_list: list[str], recursive: bool = True, max_workers: int = 10) -> dict[str, list[str]]:
+    """Expand S3 URIs (files and/or folders) to file URIs using one listing per shared folder prefix.
+
+    Works built by the data prep client all live under 'job_name/<work_id>/images/', so the whole job is
+    listed once and each URI is resolved in memory. URIs that share no folder with another URI, or whose shared
+    folder holds far more keys than they need, fall back to s3_path_to_file_list.
 
     Args:
         uri_list (list): List of S3 URIs (can be files or folders)
         recursive (bool): Whether to include files in subfolders
-        max_workers (int): Maximum number of parallel workers for processing
+        max_workers (int): Maximum number of parallel workers for the fallback probes
 
     Returns:
-        list: Flat list of all file URIs
+        dict: Mapping of each input URI to its sorted list of file URIs
     """
-    all_files = []
+    unique_uris = list(dict.fromkeys(uri_list))
+    listing_groups, individual_uris = group_uris_by_listing_prefix(unique_uris)
+
+    expanded = {}
+    for (bucket, prefix), uris in listing_groups.items():
+        logger.info(f"Listing s3://{bucket}/{prefix} once for {len(uris)} URIs")
+        max_keys = max(MIN_PREFIX_LISTING_KEYS, PREFIX_LISTING_KEYS_PER_URI * len(uris))
+        sorted_keys = list_keys_under_prefix(bucket, prefix, max_keys)
+        if sorted_keys is None:
+            logger.info(f"s3://{bucket}/{prefix} holds more than {max_keys} keys, listing its URIs one by one")
+            individual_uris.extend(uris)
+            continue
+        for uri in uris:
+            key = urlparse(uri).path.lstrip("/")
+            expanded[uri] = resolve_s3_key_from_listing(bucket, key, sorted_keys, recursive)
 
-    # Process URIs in parallel for better performance
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Map each URI to its expanded file list
-        future_to_uri = {executor.submit(s3_path_to_file_list, uri, recursive): uri for uri in uri_list}
+    if individual_uris:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            future_to_uri = {executor.submit(s3_path_to_file_list, uri, recursive): uri for uri in individual_uris}
+            for future, uri in future_to_uri.items():
+                try:
+                    expanded[uri] = future.result()
+                except Exception as exc:
+                    logger.error(f"Error processing {uri}: {exc}")
+                    raise exc
 
-        # Collect results as they complete
-        for future in future_to_uri:
-            try:
-                files = future.result()
-                all_files.extend(files)
-            except Exception as exc:
-                uri = future_to_uri[future]
-                logger.error(f"Error processing {uri}: {exc}")
-                raise exc
-
-    # Remove any duplicates (in case folders overlapped)
-    return list(dict.fromkeys(all_files))
+    return expanded
 
 
 def validate_request_body(body: dict[str, Any]) -> None:
@@ -226,61 +347,178 @@ def create_response(status_code: int, body: Any) -> dict[str, Any]:
     }
 
 
-def create_ecs_task(run_task_kwargs: dict[str, Any]) -> str:
-    """Create an ECS task if one is not already running."""
-    # Check for running tasks
-    running_tasks = ecs_client.list_tasks(
-        cluster=ECS_CLUSTER_NAME, family=ECS_TASK_FAMILY_NAME, desiredStatus="RUNNING"
+def get_queue_depth(sqs_client: Any, queue_url: str) -> tuple[int, int]:
+    """Get the approximate number of queued (visible or delayed) and in-flight messages."""
+    response = sqs_client.get_queue_attributes(QueueUrl=queue_url, AttributeNames=QUEUE_DEPTH_ATTRIBUTES)
+    attributes = response["Attributes"]
+    queued = int(attributes.get("ApproximateNumberOfMessages", 0)) + int(
+        attributes.get("ApproximateNumberOfMessagesDelayed", 0)
+    )
+    in_flight = int(attributes.get("ApproximateNumberOfMessagesNotVisible", 0))
+    return queued, in_flight
+
+
+def count_active_tasks(ecs_client: Any, cluster: str, family: str) -> int:
+    """Count tasks in the family that are running or about to run."""
+    task_count = 0
+    paginator = ecs_client.get_paginator("list_tasks")
+    for page in paginator.paginate(cluster=cluster, family=family, desiredStatus="RUNNING"):
+        task_count += len(page["taskArns"])
+    return task_count
+
+
+def compute_desired_task_count(queued: int, in_flight: int, works_per_task: int, max_tasks: int) -> int:
+    """Compute how many worker tasks the current backlog warrants.
+
+    Args:
+        queued (int): Messages waiting in the queue
+        in_flight (int): Messages received by a worker and not yet deleted
+        works_per_task (int): Target number of outstanding works per task
+        max_tasks (int): Upper bound on concurrent tasks
+
+    Returns:
+        int: Desired number of tasks, at least one whenever there is any backlog
+    """
+    backlog = queued + in_flight
+    if backlog <= 0:
+        return 0
+    return max(1, min(max_tasks, math.ceil(backlog / max(1, works_per_task))))
+
+
+def scale_ecs_tasks(
+    ecs_client: Any,
+    sqs_client: Any,
+    run_task_kwargs: dict[str, Any],
+    queue_url: str,
+    cluster: str,
+    family: str,
+    works_per_task: int,
+    max_tasks: int,
+) -> str:
+    """Launch the ECS tasks missing to reach the task count warranted by the queue depth."""
+    queued, in_flight = get_queue_depth(sqs_client, queue_url)
+    desired_count = compute_desired_task_count(queued, in_flight, works_per_task, max_tasks)
+    active_count = count_active_tasks(ecs_client, cluster, family)
+    missing_count = desired_count - active_count
+    logger.info(
+        f"Queue has {queued} queued and {in_flight} in-flight messages: "
+        f"{desired_count} tasks desired, {active_count} active"
     )
 
-    if running_tasks["taskArns"]:
-        message = "A task is already running. No new task will be started."
-        logger.warning(message)
+    if missing_count <= 0:
+        message = f"{active_count} tasks already running for {queued + in_flight} messages. No new task started."
+        logger.info(message)
         return message
 
-    # If no task is running, start a new one
-    logger.info("Running task")
     logger.debug(f"Task kwargs: {json.dumps(run_task_kwargs, indent=4)}")
-    response = ecs_client.run_task(**run_task_kwargs)
-    message = f"New ECS task {response['tasks'][0]['taskArn']} started successfully"
+    started_task_arns = []
+    while len(started_task_arns) < missing_count:
+        count = min(MAX_TASKS_PER_RUN_TASK, missing_count - len(started_task_arns))
+        response = ecs_client.run_task(**run_task_kwargs, count=count)
+        for failure in response.get("failures", []):
+            logger.warning(f"Failed to start ECS task: {failure}")
+        if not response["tasks"]:
+            break
+        started_task_arns.extend(task["taskArn"] for task in response["tasks"])
+
+    message = f"Started {len(started_task_arns)} new ECS tasks ({active_count + len(started_task_arns)} active)"
     logger.info(message)
     return message
 
 
+def create_ecs_task(run_task_kwargs: dict[str, Any]) -> str:
+    """Scale ECS worker tasks to the depth of the queue."""
+    return scale_ecs_tasks(
+        ecs_client=ecs_client,
+        sqs_client=sqs,
+        run_task_kwargs=run_task_kwargs,
+        queue_url=SQS_QUEUE_URL,
+        cluster=ECS_CLUSTER_NAME,
+        family=ECS_TASK_FAMILY_NAME,
+        works_per_task=ECS_WORKS_PER_TASK,
+        max_tasks=ECS_MAX_TASKS,
+    )
+
+
+def create_job_summary(jobs_table: Any, job_name: str, job_type: str, total_works: int, total_pages: int) -> None:
+    """Create the summary item holding a job's per-status work counters, as the worker's create_job_summary does.
+
+    Raises:
+        ValueError: If the job already has a summary item.
+    """
+    item = {
+        JOB_NAME: job_name,
+        JOB_TYPE: job_type,
+        TOTAL_WORKS: total_works,
+        WORK_STATUS_COUNTS: {IN_QUEUE: total_works},
+        USAGE: {},
+        PAGES_PROCESSED: 0,
+        TOTAL_PAGES: total_pages,
+    }
+    try:
+        jobs_table.put_item(Item=item, ConditionExpression=f"attribute_not_exists({JOB_NAME})")
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        msg = f"Job with name '{job_name}' already exists"
+        logger.error(msg)
+        raise ValueError(msg)
+
+
 def create_job(job_name: str, works: list[dict[str, Any]], job_type: str) -> None:
     """Create job in DynamoDB and SQS."""
     table = dynamodb.Table(WORKS_TABLE_NAME)
 
+    if job_name == ROLLUP_JOB_NAME:
+        msg = f"Job name '{job_name}' is reserved"
+        logger.error(msg)
+        raise ValueError(msg)
+
     # Check if job already exists
     if job_exists(table, job_name):
         msg = f"Job with name '{job_name}' already exists"
         logger.error(msg)
         raise ValueError(msg)
 
+    # Resolve every work's images up front so that the job prefix is listed once, not once per work
+    expanded_uris = expand_s3_uris_in_bulk([uri for work in works for uri in work[IMAGE_S3_URIS]])
+    work_image_uris = {
+        work[WORK_ID]: list(dict.fromkeys(file for uri in work[IMAGE_S3_URIS] for file in expanded_uris[uri]))
+        for work in works
+    }
+
+    # Create the job summary before queueing works so that the worker always finds its status counters
+    create_job_summary(
+        jobs_table=dynamodb.Table(JOBS_TABLE_NAME),
+        job_name=job_name,
+        job_type=job_type,
+        total_works=len(works),
+        total_pages=sum(len(image_uris) for image_uris in work_image_uris.values()),
+    )
+
     for work in works:
         work_id: str = work[WORK_ID]
-        image_s3_uris: list[str] = work[IMAGE_S3_URIS]
         context_s3_uri: str | None = work.get(CONTEXT_S3_URI, None)
         original_metadata_s3_uri: str | None = work.get(ORIGINAL_METADATA_S3_URI, None)
-        # Add work item to SQS queue
-        sqs_message = {
-            JOB_NAME: job_name,
-            WORK_ID: work_id,
-        }
-        sqs.send_message(QueueUrl=SQS_QUEUE_URL, MessageBody=json.dumps(sqs_message))
-        logger.debug(f"Successfully added job={job_name} work={work_id} to SQS")
-        # Put pending work item in DynamoDB
+        # Put pending work item in DynamoDB before queueing it, so that a worker never receives a missing work
         ddb_work_item = {
             JOB_NAME: job_name,
             JOB_TYPE: job_type,
             WORK_ID: work_id,
-            IMAGE_S3_URIS: expand_s3_uris_to_files(image_s3_uris),
+            IMAGE_S3_URIS: work_image_uris[work_id],
             CONTEXT_S3_URI: context_s3_uri,
             ORIGINAL_METADATA_S3_URI: original_metadata_s3_uri,
-            WORK_STATUS: "IN QUEUE",
+            WORK_STATUS: IN_QUEUE,
         }
         table.put_item(Item=ddb_work_item)
         logger.debug(f"Successfully added job={job_name} work={work_id} to DynamoDB")
+        # Add work item to SQS queue
+        sqs_message = {
+            JOB_NAME: job_name,
+            WORK_ID: work_id,
+        }
+        sqs.send_message(QueueUrl=SQS_QUEUE_URL, MessageBody=json.dumps(sqs_message))
+        logger.debug(f"Successfully added job={job_name} work={work_id} to SQS")
     logger.info(f"Successfully added all works for job={job_name} to SQS and DynamoDB")
 
 
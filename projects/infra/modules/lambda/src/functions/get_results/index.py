@@ -3,9 +3,14 @@
 
 """Get results."""
 
+import gzip
 import json
 import logging
 import os
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 from typing import Any
 from urllib.parse import urlparse
@@ -36,6 +41,26 @@ JOB_NAME = "job_name"
 WORK_ID = "work_id"
 IMAGE_S3_URIS = "image_s3_uris"
 IMAGE_S3_PRESIGNED_URLS = "image_presigned_urls"
+THUMBNAIL_S3_URIS = "thumbnail_s3_uris"
+THUMBNAIL_PRESIGNED_URLS = "thumbnail_presigned_urls"
+PREVIEW_S3_URIS = "preview_s3_uris"
+PREVIEW_PRESIGNED_URLS = "preview_presigned_urls"
+IMAGE_URI_FIELDS = (IMAGE_S3_URIS, THUMBNAIL_S3_URIS, PREVIEW_S3_URIS)
+INCLUDE_FULL_SIZE = "include_full_size"
+WORK_IDS = "work_ids"
+FIELDS = "fields"
+INCLUDE_PRESIGNED_URLS = "include_presigned_urls"
+PAGES = "pages"
+SUMMARY_ONLY = "summary_only"
+RESULT_S3_URI = "result_s3_uri"
+OFFLOADED_FIELDS = "offloaded_fields"
+# Attribute names allowed in each part of a requested field path
+FIELD_PART_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_-]*$")
+MAX_REHYDRATE_WORKERS = 16
+MAX_BATCH_SIZE = 100
+MAX_BATCH_GET_ATTEMPTS = 8
+BATCH_GET_BASE_DELAY = 0.05  # seconds
+BATCH_GET_MAX_DELAY = 2.0  # seconds
 
 # Initialize AWS clients globally
 dynamodb = boto3.resource("dynamodb", region_name=AWS_REGION)
@@ -102,6 +127,220 @@ def deserialize_dynamodb_item(raw_data: dict[str, Any] | list[dict[str, Any]]) -
     return deserialized_data
 
 
+def parse_list_parameter(value: str | None) -> list[str]:
+    """Parse a comma-separated query parameter into a list of non-empty values."""
+    if not value:
+        return []
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def parse_bool_parameter(value: str | None) -> bool:
+    """Parse a boolean query parameter."""
+    return str(value).lower() in ("1", "true", "yes")
+
+
+def parse_fields(value: str | None) -> list[str]:
+    """Parse the requested fields, attribute names or dotted paths into map attributes.
+
+    Raises:
+        ValueError: If a field is not a valid path.
+    """
+    fields = parse_list_parameter(value)
+    for field in fields:
+        if not all(FIELD_PART_PATTERN.match(part) for part in field.split(".")):
+            raise ValueError(f"Invalid field '{field}' in '{FIELDS}'")
+    return fields
+
+
+def remove_overlapping_paths(fields: list[str]) -> list[str]:
+    """Drop repeated paths and paths within another requested path, which DynamoDB rejects in a projection."""
+    fields = list(dict.fromkeys(fields))
+    return [field for field in fields if not any(field.startswith(other + ".") for other in fields)]
+
+
+def build_projection(fields: list[str], include_image_uris: bool) -> tuple[str, dict[str, str]]:
+    """Build a ProjectionExpression for the requested fields, which may be dotted paths."""
+    fields = [JOB_NAME, WORK_ID, RESULT_S3_URI] + fields
+    if include_image_uris:
+        fields.extend(IMAGE_URI_FIELDS)
+    fields = remove_overlapping_paths(fields)
+
+    expression_attribute_names = {}
+    projections = []
+    for field_index, field in enumerate(fields):
+        path = []
+        for part_index, part in enumerate(field.split(".")):
+            placeholder = f"#f{field_index}_{part_index}"
+            expression_attribute_names[placeholder] = part
+            path.append(placeholder)
+        projections.append(".".join(path))
+    return ", ".join(projections), expression_attribute_names
+
+
+def batch_get_works(
+    job_name: str, work_ids: list[str], fields: list[str] | None = None, include_image_uris: bool = False
+) -> list[dict[str, Any]]:
+    """Get up to MAX_BATCH_SIZE works with BatchGetItem, retrying unprocessed keys with backoff.
+
+    Args:
+        job_name: The job name
+        work_ids: IDs of the works to get
+        fields: Fields to project, all fields if empty
+        include_image_uris: Whether to project the image S3 URIs even if not requested
+
+    Returns:
+        Items found, in no particular order
+    """
+    keys_and_projection: dict[str, Any] = {"Keys": [{JOB_NAME: job_name, WORK_ID: work_id} for work_id in work_ids]}
+    if fields:
+        projection_expression, expression_attribute_names = build_projection(fields, include_image_uris)
+        keys_and_projection["ProjectionExpression"] = projection_expression
+        keys_and_projection["ExpressionAttributeNames"] = expression_attribute_names
+
+    items = []
+    request_items = {WORKS_TABLE_NAME: keys_and_projection}
+    for attempt in range(MAX_BATCH_GET_ATTEMPTS):
+        response = dynamodb.batch_get_item(RequestItems=request_items)
+        items.extend(response["Responses"].get(WORKS_TABLE_NAME, []))
+
+        request_items = response.get("UnprocessedKeys") or {}
+        if not request_items:
+            return items
+
+        # Exponential backoff with full jitter before retrying unprocessed keys
+        delay = min(BATCH_GET_MAX_DELAY, BATCH_GET_BASE_DELAY * 2**attempt)
+        unprocessed_count = len(request_items[WORKS_TABLE_NAME]["Keys"])
+        logger.warning(f"Retrying {unprocessed_count} unprocessed keys (attempt {attempt + 1})")
+        time.sleep(random.uniform(0, delay))  # nosec B311
+
+    raise RuntimeError(f"Could not get all works after {MAX_BATCH_GET_ATTEMPTS} attempts")
+
+
+def load_offloaded_fields(s3_uri: str) -> dict[str, Any]:
+    """Load the gzip-compressed JSON holding a work's offloaded result fields."""
+    parsed_uri = urlparse(s3_uri)
+    response = s3.get_object(Bucket=parsed_uri.netloc, Key=parsed_uri.path.lstrip("/"))
+    return json.loads(gzip.decompress(response["Body"].read()), parse_float=Decimal)
+
+
+def pop_offload_pointer(item: dict[str, Any]) -> str | None:
+    """Remove the pointer to a work's offloaded result from the item, returning its S3 URI if any."""
+    item.pop(OFFLOADED_FIELDS, None)
+    return item.pop(RESULT_S3_URI, None)
+
+
+def rehydrate_item(item: dict[str, Any], fields: list[str] | None = None) -> dict[str, Any]:
+    """Restore the result fields a work offloaded to S3.
+
+    Fields set on the item itself, such as reviewer edits made after offloading, take precedence.
+
+    Args:
+        item: The work item
+        fields: Requested fields, restoring only the offloaded fields they name. All fields if empty.
+
+    Returns:
+        The work item with its full result
+    """
+    s3_uri = pop_offload_pointer(item)
+    if not s3_uri:
+        return item
+    offloaded = load_offloaded_fields(s3_uri)
+    if fields:
+        requested_fields = {field.split(".")[0] for field in fields}
+        offloaded = {field: value for field, value in offloaded.items() if field in requested_fields}
+    return offloaded | item
+
+
+def presign_pages(s3_uris: list[str], pages: list[int] | None = None) -> list[str | None]:
+    """Presign the requested pages (zero-based indices) of a work's image URIs, all pages if none requested.
+
+    Returns:
+        One URL per image URI, None for pages not requested.
+    """
+    if not pages:
+        return generate_presigned_urls(s3_uris)
+    selected_pages = sorted({index for index in pages if 0 <= index < len(s3_uris)})
+    presigned_urls: list[str | None] = [None] * len(s3_uris)
+    for index, url in zip(selected_pages, generate_presigned_urls([s3_uris[index] for index in selected_pages])):
+        presigned_urls[index] = url
+    return presigned_urls
+
+
+def presign_work_images(item: dict[str, Any], include_full_size: bool, pages: list[int] | None = None) -> None:
+    """Add presigned URLs for a work's thumbnails and previews to the item, as lists indexed by page.
+
+    Full-size images are only presigned on request, or for works processed before derivatives existed.
+
+    Args:
+        item: The work item
+        include_full_size: Whether to presign the original images too
+        pages: Zero-based pages to presign, leaving the others None. None presigns every page.
+    """
+    has_derivatives = bool(item.get(THUMBNAIL_S3_URIS)) and bool(item.get(PREVIEW_S3_URIS))
+    url_fields = {}
+    if has_derivatives:
+        url_fields = {THUMBNAIL_S3_URIS: THUMBNAIL_PRESIGNED_URLS, PREVIEW_S3_URIS: PREVIEW_PRESIGNED_URLS}
+    if include_full_size or not has_derivatives:
+        url_fields[IMAGE_S3_URIS] = IMAGE_S3_PRESIGNED_URLS
+
+    for uri_field, url_field in url_fields.items():
+        item[url_field] = presign_pages(item.get(uri_field, []), pages)
+
+
+def get_results_batch(job_name: str, query_params: dict[str, str]) -> dict[str, Any]:
+    """Handle a batch results request."""
+    work_ids = list(dict.fromkeys(parse_list_parameter(query_params.get(WORK_IDS))))
+    if not work_ids:
+        msg = f"'{WORK_IDS}' must list at least one work ID"
+        logger.error(msg)
+        return create_response(400, {"error": msg})
+    if len(work_ids) > MAX_BATCH_SIZE:
+        msg = f"At most {MAX_BATCH_SIZE} '{WORK_IDS}' are supported per request, {len(work_ids)} provided"
+        logger.error(msg)
+        return create_response(400, {"error": msg})
+
+    try:
+        fields = parse_fields(query_params.get(FIELDS))
+    except ValueError as e:
+        logger.error(str(e))
+        return create_response(400, {"error": str(e)})
+    include_presigned_urls = parse_bool_parameter(query_params.get(INCLUDE_PRESIGNED_URLS))
+    include_full_size = parse_bool_parameter(query_params.get(INCLUDE_FULL_SIZE))
+    summary_only = parse_bool_parameter(query_params.get(SUMMARY_ONLY))
+    try:
+        pages = [int(page) for page in parse_list_parameter(query_params.get(PAGES))]
+    except ValueError:
+        return create_response(400, {"error": f"'{PAGES}' must be a comma-separated list of page indices"})
+
+    items = batch_get_works(job_name, work_ids, fields=fields, include_image_uris=include_presigned_urls)
+    restored_fields = fields
+    if include_presigned_urls and (summary_only or fields):
+        # Per-page image URIs may be offloaded with the result, and are needed to presign the pages
+        restored_fields = list(IMAGE_URI_FIELDS) if summary_only else fields + list(IMAGE_URI_FIELDS)
+    if not summary_only or include_presigned_urls:
+        with ThreadPoolExecutor(max_workers=MAX_REHYDRATE_WORKERS) as executor:
+            items = list(executor.map(lambda item: rehydrate_item(item, restored_fields), items))
+    else:
+        for item in items:
+            pop_offload_pointer(item)
+    items_by_work_id = {item[WORK_ID]: item for item in items}
+
+    results = []
+    for work_id in work_ids:
+        item = items_by_work_id.get(work_id)
+        if item is None:
+            continue
+        if include_presigned_urls:
+            presign_work_images(item, include_full_size=include_full_size, pages=pages)
+            for uri_field in IMAGE_URI_FIELDS:
+                if fields and uri_field not in fields:
+                    item.pop(uri_field, None)
+        results.append(item)
+
+    missing_work_ids = [work_id for work_id in work_ids if work_id not in items_by_work_id]
+    return create_response(200, {"items": results, "missing_work_ids": missing_work_ids})
+
+
 def create_response(status_code: int, body: Any) -> dict[str, Any]:
     """Create a standardized API response."""
     return {
@@ -120,6 +359,10 @@ def handler(event: Any, context: Any) -> dict[str, Any]:
             logger.error(msg)
             return create_response(400, {"error": msg})
 
+        # Batch of works
+        if event["queryStringParameters"].get(WORK_IDS) is not None:
+            return get_results_batch(job_name, event["queryStringParameters"])
+
         work_id = event["queryStringParameters"].get(WORK_ID)
         if not work_id:
             msg = f"Missing '{WORK_ID}' in query parameters"
@@ -130,9 +373,14 @@ def handler(event: Any, context: Any) -> dict[str, Any]:
         item = response.get("Item")
         if item:
             deserialized_item = deserialize_dynamodb_item(item)
+            # Long results are stored in S3; a summary-only request skips loading them
+            if not parse_bool_parameter(event["queryStringParameters"].get(SUMMARY_ONLY)):
+                deserialized_item = rehydrate_item(deserialized_item)
+            else:
+                pop_offload_pointer(deserialized_item)
 
-            image_s3_uris = deserialized_item[IMAGE_S3_URIS]
-            deserialized_item[IMAGE_S3_PRESIGNED_URLS] = generate_presigned_urls(image_s3_uris)
+            include_full_size = parse_bool_parameter(event["queryStringParameters"].get(INCLUDE_FULL_SIZE))
+            presign_work_images(deserialized_item, include_full_size=include_full_size)
 
             return create_response(200, {"item": deserialized_item})
 
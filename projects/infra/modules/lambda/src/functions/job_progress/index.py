@@ -3,6 +3,7 @@
 
 """Get job progress."""
 
+import base64
 import json
 import logging
 import os
@@ -17,6 +18,8 @@ from botocore.exceptions import ClientError
 # Constants
 AWS_REGION = os.environ["AWS_REGION"]
 WORKS_TABLE_NAME = os.environ["WORKS_TABLE_NAME"]
+JOBS_TABLE_NAME = os.environ["JOBS_TABLE_NAME"]
+WORKS_STATUS_INDEX_NAME = os.environ["WORKS_STATUS_INDEX_NAME"]
 CORS_HEADERS = {
     "Access-Control-Allow-Origin": "*",
     "Access-Control-Allow-Headers": "*",
@@ -27,10 +30,27 @@ JOB_NAME = "job_name"
 JOB_TYPE = "job_type"
 WORK_ID = "work_id"
 WORK_STATUS = "work_status"
+TOTAL_WORKS = "total_works"
+WORK_STATUS_COUNTS = "work_status_counts"
+LIMIT = "limit"
+NEXT_TOKEN = "next_token"
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+USAGE = "usage"
+PAGES_PROCESSED = "pages_processed"
+PAGES_FAILED = "pages_failed"
+PROCESSING_MS = "processing_ms"
+TOTAL_PAGES = "total_pages"
+IN_PROGRESS = "IN PROGRESS"
+TOKEN_FIELDS = ("input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens")
+RETRY_PREFIX = "retry_"
+# On-demand USD per million tokens, matched against model IDs by substring; set from the Terraform model_prices
+MODEL_PRICES = json.loads(os.environ.get("MODEL_PRICES") or "{}")
 
 # Initialize AWS clients globally
 dynamodb = boto3.resource("dynamodb", region_name=AWS_REGION)
 table = dynamodb.Table(WORKS_TABLE_NAME)
+jobs_table = dynamodb.Table(JOBS_TABLE_NAME)
 
 # Set up logging
 logger = logging.getLogger()
@@ -47,6 +67,131 @@ class DecimalEncoder(json.JSONEncoder):
         return super(DecimalEncoder, self).default(obj)
 
 
+def encode_next_token(last_evaluated_key: dict[str, Any] | None) -> str | None:
+    """Encode a DynamoDB LastEvaluatedKey as an opaque pagination cursor."""
+    if not last_evaluated_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key, cls=DecimalEncoder).encode()).decode()
+
+
+def decode_next_token(next_token: str) -> dict[str, Any]:
+    """Decode a pagination cursor back into a DynamoDB ExclusiveStartKey."""
+    try:
+        return json.loads(base64.urlsafe_b64decode(next_token.encode()))
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid {NEXT_TOKEN}")
+
+
+def parse_limit(limit: str | None) -> int:
+    """Parse the page size query parameter."""
+    if limit is None:
+        return DEFAULT_LIMIT
+    try:
+        return max(1, min(int(limit), MAX_LIMIT))
+    except ValueError:
+        raise ValueError(f"{LIMIT} must be an integer")
+
+
+def get_job_summary(job_name: str) -> dict[str, Any] | None:
+    """Get the job summary item with its per-status work counters."""
+    response = jobs_table.get_item(Key={JOB_NAME: job_name})
+    return response.get("Item")
+
+
+def find_model_price(model_id: str) -> dict[str, float] | None:
+    """Find the prices of a model, preferring the longest matching key."""
+    matches = [key for key in MODEL_PRICES if key in model_id]
+    return MODEL_PRICES[max(matches, key=len)] if matches else None
+
+
+def estimate_cost(counters: dict[str, Any], model_price: dict[str, float], prefix: str = "") -> float:
+    """Estimate the USD cost of a model's token counters."""
+    return sum(float(counters.get(prefix + field, 0)) * model_price.get(field, 0.0) for field in TOKEN_FIELDS) / 1e6
+
+
+def summarize_usage(usage_by_model: dict[str, dict[str, Any]], pages_processed: int) -> dict[str, Any]:
+    """Summarize token usage per model into totals, estimated cost, cost per page and the share spent on retries.
+
+    Args:
+        usage_by_model (dict): Token and call counters per model.
+        pages_processed (int): Pages of the works processed successfully.
+
+    Returns:
+        dict[str, Any]: Usage summary; costs leave out models without a price, which are listed as unpriced.
+    """
+    totals = defaultdict(int)
+    cost = retry_cost = 0.0
+    models = {}
+    unpriced_models = []
+    for model_id, model_counters in usage_by_model.items():
+        counters = {counter: int(count) for counter, count in model_counters.items()}
+        for counter, count in counters.items():
+            totals[counter] += count
+        model_price = find_model_price(model_id)
+        if model_price is None:
+            unpriced_models.append(model_id)
+            models[model_id] = counters
+            continue
+        model_cost = estimate_cost(counters, model_price)
+        cost += model_cost
+        retry_cost += estimate_cost(counters, model_price, prefix=RETRY_PREFIX)
+        models[model_id] = counters | {"cost_usd": round(model_cost, 6)}
+
+    pages_processed = int(pages_processed)
+    return dict(totals) | {
+        "models": models,
+        PAGES_PROCESSED: pages_processed,
+        "cost_usd": round(cost, 6),
+        "cost_per_page_usd": round(cost / pages_processed, 6) if pages_processed else None,
+        "retry_cost_usd": round(retry_cost, 6),
+        "retry_cost_share": round(retry_cost / cost, 4) if cost else None,
+        "unpriced_models": unpriced_models,
+    }
+
+
+def estimate_time_remaining(summary: dict[str, Any], concurrency: int) -> dict[str, Any]:
+    """Estimate a job's remaining pages and time from its recorded processing time per page.
+
+    Args:
+        summary (dict[str, Any]): The job summary item.
+        concurrency (int): Works of the job being processed at once.
+
+    Returns:
+        dict[str, Any]: Remaining pages, milliseconds per page and estimated seconds remaining; None where
+            the job has no page count or no processed pages yet.
+    """
+    pages_processed = int(summary.get(PAGES_PROCESSED, 0))
+    ms_per_page = int(summary.get(PROCESSING_MS, 0)) / pages_processed if pages_processed else None
+    remaining_pages = None
+    if TOTAL_PAGES in summary:
+        remaining_pages = max(0, int(summary[TOTAL_PAGES]) - pages_processed - int(summary.get(PAGES_FAILED, 0)))
+    eta_seconds = None
+    if remaining_pages is not None and ms_per_page is not None:
+        eta_seconds = round(remaining_pages * ms_per_page / 1000 / max(1, concurrency))
+    return {
+        "remaining_pages": remaining_pages,
+        "ms_per_page": round(ms_per_page) if ms_per_page is not None else None,
+        "eta_seconds": eta_seconds,
+    }
+
+
+def list_work_ids(job_name: str, work_status: str, limit: int, next_token: str | None = None) -> dict[str, Any]:
+    """List one page of work IDs in a job with the given status from the status index."""
+    query_kwargs = {
+        "IndexName": WORKS_STATUS_INDEX_NAME,
+        "KeyConditionExpression": Key(WORK_STATUS).eq(work_status) & Key(JOB_NAME).eq(job_name),
+        "Limit": limit,
+    }
+    if next_token:
+        query_kwargs["ExclusiveStartKey"] = decode_next_token(next_token)
+
+    response = table.query(**query_kwargs)
+    return {
+        "work_ids": [item[WORK_ID] for item in response["Items"]],
+        NEXT_TOKEN: encode_next_token(response.get("LastEvaluatedKey")),
+    }
+
+
 def query_all_items(job_name: str) -> list[dict]:
     """Query all items for a given job name, handling pagination."""
     items = []
@@ -120,7 +265,34 @@ def handler(event: Any, context: Any) -> dict[str, Any]:
         if not job_name:
             return create_response(400, {"error": f"Missing required query parameter: {JOB_NAME}"})
 
+        # List work IDs with a given status one page at a time
+        work_status: str | None = query_params.get(WORK_STATUS, None)
+        if work_status:
+            logger.info(f"Listing works of job={job_name} with status={work_status}")
+            try:
+                page = list_work_ids(
+                    job_name=job_name,
+                    work_status=work_status,
+                    limit=parse_limit(query_params.get(LIMIT, None)),
+                    next_token=query_params.get(NEXT_TOKEN, None),
+                )
+            except ValueError as e:
+                return create_response(400, {"error": str(e)})
+            return create_response(200, page | {WORK_STATUS: work_status})
+
         logger.info(f"Getting progress of job={job_name}")
+        summary = get_job_summary(job_name)
+        if summary:
+            response = {
+                "job_counts": {status: count for status, count in summary[WORK_STATUS_COUNTS].items() if count},
+                "job_type": summary[JOB_TYPE],
+                TOTAL_WORKS: summary[TOTAL_WORKS],
+                USAGE: summarize_usage(summary.get(USAGE, {}), summary.get(PAGES_PROCESSED, 0)),
+                "progress": estimate_time_remaining(summary, int(summary[WORK_STATUS_COUNTS].get(IN_PROGRESS, 0))),
+            }
+            return create_response(200, response)
+
+        # Jobs created before summary items existed have no counters, so read the whole partition
         items = query_all_items(job_name)
 
         if len(items) == 0:
@@ -131,7 +303,9 @@ def handler(event: Any, context: Any) -> dict[str, Any]:
         # Return success response
         response = {
             "job_progress": work_ids_by_status,
+            "job_counts": {status: len(work_ids) for status, work_ids in work_ids_by_status.items()},
             "job_type": job_type,
+            TOTAL_WORKS: len(items),
         }
         return create_response(200, response)
 
@@ -6,6 +6,8 @@
 import json
 import logging
 import os
+import time
+from collections import defaultdict
 from decimal import Decimal
 from typing import Any
 
@@ -17,16 +19,39 @@ ECS_CLUSTER_NAME = os.environ["ECS_CLUSTER_NAME"]
 ECS_TASK_DEFINITION_ARN = os.environ["ECS_TASK_DEFINITION_ARN"]
 ECS_TASK_FAMILY_NAME = ECS_TASK_DEFINITION_ARN.split("/")[-1].split(":")[0]
 SQS_QUEUE_URL = os.environ["SQS_QUEUE_URL"]
+JOBS_TABLE_NAME = os.environ["JOBS_TABLE_NAME"]
 CORS_HEADERS = {
     "Access-Control-Allow-Origin": "*",
     "Access-Control-Allow-Headers": "*",
     "Access-Control-Allow-Methods": "*",
     "Access-Control-Allow-Credentials": True,
 }
+USAGE = "usage"
+PAGES_PROCESSED = "pages_processed"
+PAGES_FAILED = "pages_failed"
+PROCESSING_MS = "processing_ms"
+TOTAL_PAGES = "total_pages"
+JOB_NAME = "job_name"
+# Rollup item the workers keep in the jobs table, with a slot per minute of the last hour, in-flight works and
+# the usage totals over all jobs
+ROLLUP_JOB_NAME = "__worker_rollup__"
+MINUTES = "minutes"
+WORKERS = "workers"
+THROUGHPUT_WINDOWS_MINUTES = (5, 15, 60)
+LATENCY_BUCKET_BOUNDS_MS = tuple(
+    seconds * 1000 for seconds in (5, 10, 20, 30, 45, 60, 90, 120, 180, 300, 450, 600, 900, 1800, 3600)
+)
+OVERFLOW_BUCKET = "inf"
+TOKEN_FIELDS = ("input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens")
+RETRY_PREFIX = "retry_"
+# On-demand USD per million tokens, matched against model IDs by substring; set from the Terraform model_prices
+MODEL_PRICES = json.loads(os.environ.get("MODEL_PRICES") or "{}")
 
 # Initialize AWS clients globally
 sqs = boto3.client("sqs", region_name=AWS_REGION)
 ecs_client = boto3.client("ecs", region_name=AWS_REGION)
+dynamodb = boto3.resource("dynamodb", region_name=AWS_REGION)
+jobs_table = dynamodb.Table(JOBS_TABLE_NAME)
 
 # Set up logging
 logger = logging.getLogger()
@@ -73,6 +98,155 @@ def get_queue_length(queue_url: str) -> int:
     return queue_length
 
 
+def find_model_price(model_id: str) -> dict[str, float] | None:
+    """Find the prices of a model, preferring the longest matching key."""
+    matches = [key for key in MODEL_PRICES if key in model_id]
+    return MODEL_PRICES[max(matches, key=len)] if matches else None
+
+
+def estimate_cost(counters: dict[str, Any], model_price: dict[str, float], prefix: str = "") -> float:
+    """Estimate the USD cost of a model's token counters."""
+    return sum(float(counters.get(prefix + field, 0)) * model_price.get(field, 0.0) for field in TOKEN_FIELDS) / 1e6
+
+
+def summarize_usage(usage_by_model: dict[str, dict[str, Any]], pages_processed: int) -> dict[str, Any]:
+    """Summarize token usage per model into totals, estimated cost, cost per page and the share spent on retries.
+
+    Args:
+        usage_by_model (dict): Token and call counters per model.
+        pages_processed (int): Pages of the works processed successfully.
+
+    Returns:
+        dict[str, Any]: Usage summary; costs leave out models without a price, which are listed as unpriced.
+    """
+    totals = defaultdict(int)
+    cost = retry_cost = 0.0
+    models = {}
+    unpriced_models = []
+    for model_id, model_counters in usage_by_model.items():
+        counters = {counter: int(count) for counter, count in model_counters.items()}
+        for counter, count in counters.items():
+            totals[counter] += count
+        model_price = find_model_price(model_id)
+        if model_price is None:
+            unpriced_models.append(model_id)
+            models[model_id] = counters
+            continue
+        model_cost = estimate_cost(counters, model_price)
+        cost += model_cost
+        retry_cost += estimate_cost(counters, model_price, prefix=RETRY_PREFIX)
+        models[model_id] = counters | {"cost_usd": round(model_cost, 6)}
+
+    pages_processed = int(pages_processed)
+    return dict(totals) | {
+        "models": models,
+        PAGES_PROCESSED: pages_processed,
+        "cost_usd": round(cost, 6),
+        "cost_per_page_usd": round(cost / pages_processed, 6) if pages_processed else None,
+        "retry_cost_usd": round(retry_cost, 6),
+        "retry_cost_share": round(retry_cost / cost, 4) if cost else None,
+        "unpriced_models": unpriced_models,
+    }
+
+
+def estimate_time_remaining(summary: dict[str, Any], concurrency: int) -> dict[str, Any]:
+    """Estimate a job's remaining pages and time from its recorded processing time per page.
+
+    Args:
+        summary (dict[str, Any]): The job summary item.
+        concurrency (int): Works of the job being processed at once.
+
+    Returns:
+        dict[str, Any]: Remaining pages, milliseconds per page and estimated seconds remaining; None where
+            the job has no page count or no processed pages yet.
+    """
+    pages_processed = int(summary.get(PAGES_PROCESSED, 0))
+    ms_per_page = int(summary.get(PROCESSING_MS, 0)) / pages_processed if pages_processed else None
+    remaining_pages = None
+    if TOTAL_PAGES in summary:
+        remaining_pages = max(0, int(summary[TOTAL_PAGES]) - pages_processed - int(summary.get(PAGES_FAILED, 0)))
+    eta_seconds = None
+    if remaining_pages is not None and ms_per_page is not None:
+        eta_seconds = round(remaining_pages * ms_per_page / 1000 / max(1, concurrency))
+    return {
+        "remaining_pages": remaining_pages,
+        "ms_per_page": round(ms_per_page) if ms_per_page is not None else None,
+        "eta_seconds": eta_seconds,
+    }
+
+
+def get_rollup() -> dict[str, Any]:
+    """Get the rollup item the workers keep, or an empty one if no worker has started yet."""
+    response = jobs_table.get_item(Key={JOB_NAME: ROLLUP_JOB_NAME})
+    return response.get("Item", {})
+
+
+def histogram_percentile(histogram: dict[str, int], quantile: float) -> int | None:
+    """Upper bound in milliseconds of the latency bucket holding a quantile, capped at the largest bound."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    cumulative = 0
+    for bound_ms in LATENCY_BUCKET_BOUNDS_MS:
+        cumulative += histogram.get(str(bound_ms), 0)
+        if cumulative >= quantile * total:
+            return bound_ms
+    return LATENCY_BUCKET_BOUNDS_MS[-1]
+
+
+def summarize_rollup(rollup: dict[str, Any], now: float) -> dict[str, Any]:
+    """Summarize the rollup into throughput over rolling windows, work latency percentiles and in-flight works.
+
+    Args:
+        rollup (dict[str, Any]): The rollup item.
+        now (float): Current epoch time in seconds.
+
+    Returns:
+        dict[str, Any]: Works and pages completed per minute per window, p50/p95 latency over the last hour,
+            and the number of works in flight in total and per job.
+    """
+    current_minute = int(now // 60)
+    slots = [slot for slot in rollup.get(MINUTES, {}).values() if current_minute - int(slot["minute"]) < 60]
+    throughput = {}
+    for window in THROUGHPUT_WINDOWS_MINUTES:
+        window_slots = [slot for slot in slots if current_minute - int(slot["minute"]) < window]
+        throughput[f"{window}m"] = {
+            "works_per_minute": round(sum(int(slot["works"]) for slot in window_slots) / window, 2),
+            "pages_per_minute": round(sum(int(slot["pages"]) for slot in window_slots) / window, 2),
+        }
+
+    histogram = defaultdict(int)
+    for slot in slots:
+        for bucket, count in slot.get("latency", {}).items():
+            histogram[bucket] += int(count)
+
+    in_flight_by_job = defaultdict(int)
+    for entry in rollup.get(WORKERS, {}).values():
+        if int(entry["expires_at"]) >= now:
+            in_flight_by_job[entry[JOB_NAME]] += 1
+
+    return {
+        "throughput": throughput,
+        "latency_ms": {"p50": histogram_percentile(histogram, 0.5), "p95": histogram_percentile(histogram, 0.95)},
+        "in_flight": sum(in_flight_by_job.values()),
+        "in_flight_by_job": dict(in_flight_by_job),
+    }
+
+
+def get_job_summaries(job_names: list[str]) -> list[dict[str, Any]]:
+    """Get the summary items of jobs."""
+    summaries = []
+    # BatchGetItem reads at most 100 keys per request
+    for start in range(0, len(job_names), 100):
+        keys = [{JOB_NAME: job_name} for job_name in job_names[start : start + 100]]
+        request_items = {JOBS_TABLE_NAME: {"Keys": keys}}
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            summaries.extend(response["Responses"].get(JOBS_TABLE_NAME, []))
+            request_items = response.get("UnprocessedKeys")
+    return summaries
+
+
 def create_response(status_code: int, body: Any) -> dict[str, Any]:
     """Create a standardized API response."""
     return {
@@ -91,11 +265,21 @@ def handler(event: Any, context: Any) -> dict[str, Any]:
             task_family_name=ECS_TASK_FAMILY_NAME,
         )
         queue_length = get_queue_length(SQS_QUEUE_URL)
+        rollup_item = get_rollup()
+        rollup = summarize_rollup(rollup_item, time.time())
+        in_flight_by_job = rollup["in_flight_by_job"]
+        job_estimates = {
+            summary[JOB_NAME]: estimate_time_remaining(summary, in_flight_by_job[summary[JOB_NAME]])
+            for summary in get_job_summaries(list(in_flight_by_job))
+        }
 
         # Return success response
         response = {
             "ecs_status": ecs_status,
             "queue_length": queue_length,
+            USAGE: summarize_usage(rollup_item.get(USAGE, {}), rollup_item.get(PAGES_PROCESSED, 0)),
+            **rollup,
+            "job_estimates": job_estimates,
         }
         return create_response(200, response)
 
@@ -3,11 +3,15 @@
 
 """Update Results handler."""
 
+import gzip
 import json
 import logging
 import os
+import random
+import time
 from decimal import Decimal
 from typing import Any
+from urllib.parse import urlparse
 
 import boto3
 from botocore.exceptions import ClientError
@@ -15,6 +19,7 @@ from botocore.exceptions import ClientError
 # Constants
 AWS_REGION = os.environ["AWS_REGION"]
 WORKS_TABLE_NAME = os.environ["WORKS_TABLE_NAME"]
+JOBS_TABLE_NAME = os.environ["JOBS_TABLE_NAME"]
 CORS_HEADERS = {
     "Access-Control-Allow-Origin": "*",
     "Access-Control-Allow-Headers": "*",
@@ -24,10 +29,20 @@ CORS_HEADERS = {
 JOB_NAME = "job_name"
 WORK_ID = "work_id"
 UPDATED_FIELDS = "updated_fields"
+WORK_STATUS = "work_status"
+WORK_STATUS_COUNTS = "work_status_counts"
+RESULT_S3_URI = "result_s3_uri"
+OFFLOADED_FIELDS = "offloaded_fields"
+# Concurrent transitions of works in one job contend for its summary item
+TRANSACTION_CONFLICT_RETRIES = 5
+# Jobs found to have no summary item; they never gain one, as it is created with the job
+jobs_without_counters: set[str] = set()
 
 # Initialize AWS clients globally
 dynamodb = boto3.resource("dynamodb", region_name=AWS_REGION)
 table = dynamodb.Table(WORKS_TABLE_NAME)
+jobs_table = dynamodb.Table(JOBS_TABLE_NAME)
+s3 = boto3.client("s3", region_name=AWS_REGION)
 
 # Set up logging
 logger = logging.getLogger()
@@ -53,6 +68,98 @@ def create_response(status_code: int, body: Any) -> dict[str, Any]:
     }
 
 
+def build_set_expression(fields: dict[str, Any]) -> tuple[str, dict[str, str], dict[str, Any]]:
+    """Build a SET update expression for top-level fields."""
+    expression_parts = []
+    expression_attribute_names = {}
+    expression_attribute_values = {}
+    for key, value in fields.items():
+        expression_parts.append(f"#{key} = :{key}")
+        expression_attribute_names[f"#{key}"] = key
+        expression_attribute_values[f":{key}"] = value
+    return "SET " + ", ".join(expression_parts), expression_attribute_names, expression_attribute_values
+
+
+def is_condition_failure(error: ClientError) -> bool:
+    """Whether an update or transaction failed only because a condition no longer held."""
+    error_code = error.response["Error"]["Code"]
+    if error_code == "ConditionalCheckFailedException":
+        return True
+    if error_code == "TransactionCanceledException":
+        reasons = [reason.get("Code", "None") for reason in error.response.get("CancellationReasons", [])]
+        return "ConditionalCheckFailed" in reasons and set(reasons) <= {"None", "ConditionalCheckFailed"}
+    return False
+
+
+def rehydrate_item(item: dict[str, Any]) -> dict[str, Any]:
+    """Restore the result fields a work offloaded to S3, as get_results returns them.
+
+    Fields set on the item itself, such as the reviewer edits just saved, take precedence.
+    """
+    s3_uri = item.pop(RESULT_S3_URI, None)
+    item.pop(OFFLOADED_FIELDS, None)
+    if not s3_uri:
+        return item
+    parsed_uri = urlparse(s3_uri)
+    response = s3.get_object(Bucket=parsed_uri.netloc, Key=parsed_uri.path.lstrip("/"))
+    offloaded = json.loads(gzip.decompress(response["Body"].read()), parse_float=Decimal)
+    return offloaded | item
+
+
+def transition_work_status(job_name: str, work_id: str, from_status: str, updated_fields: dict[str, Any]) -> None:
+    """Update a work, changing its status, and move it between its job's status counters in one transaction.
+
+    The work update is conditional on the work still being in from_status, as in the worker, so that the
+    counters never drift. Jobs created before summary items existed have no counters; for those only the work
+    is updated, with a plain conditional update once the job is known to have none.
+
+    Raises:
+        ClientError: If the work is no longer in from_status.
+    """
+    to_status = updated_fields[WORK_STATUS]
+    update_expression, names, values = build_set_expression(updated_fields)
+    work_update = {
+        "TableName": table.name,
+        "Key": {JOB_NAME: job_name, WORK_ID: work_id},
+        "UpdateExpression": update_expression,
+        "ConditionExpression": f"#{WORK_STATUS} = :from_status",
+        "ExpressionAttributeNames": names,
+        "ExpressionAttributeValues": values | {":from_status": from_status},
+    }
+    if from_status == to_status or job_name in jobs_without_counters:
+        table.update_item(**{k: v for k, v in work_update.items() if k != "TableName"})
+        return
+
+    job_update = {
+        "TableName": jobs_table.name,
+        "Key": {JOB_NAME: job_name},
+        "UpdateExpression": (
+            "SET #counts.#from = if_not_exists(#counts.#from, :zero) - :one, "
+            "#counts.#to = if_not_exists(#counts.#to, :zero) + :one"
+        ),
+        "ConditionExpression": "attribute_exists(#counts)",
+        "ExpressionAttributeNames": {"#counts": WORK_STATUS_COUNTS, "#from": from_status, "#to": to_status},
+        "ExpressionAttributeValues": {":zero": 0, ":one": 1},
+    }
+    for attempt in range(TRANSACTION_CONFLICT_RETRIES + 1):
+        try:
+            dynamodb.meta.client.transact_write_items(TransactItems=[{"Update": work_update}, {"Update": job_update}])
+            return
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TransactionCanceledException":
+                raise
+            reasons = [reason.get("Code", "None") for reason in e.response.get("CancellationReasons", [])]
+            # Only the job summary's condition failed: a job without counters
+            if reasons == ["None", "ConditionalCheckFailed"]:
+                logger.warning(f"No status counters for {JOB_NAME}={job_name}, updating its works only")
+                jobs_without_counters.add(job_name)
+                table.update_item(**{k: v for k, v in work_update.items() if k != "TableName"})
+                return
+            if "TransactionConflict" not in reasons or attempt == TRANSACTION_CONFLICT_RETRIES:
+                raise
+            time.sleep(random.uniform(0, 0.05 * 2**attempt))
+
+
 def handler(event: Any, context: Any) -> dict[str, Any]:
     """Lambda handler."""
     try:
@@ -75,30 +182,34 @@ def handler(event: Any, context: Any) -> dict[str, Any]:
             logger.error(msg)
             return create_response(400, {"error": msg})
 
-        # Prepare the update expression and attribute values
-        update_expression = "SET "
-        expression_attribute_values = {}
-        expression_attribute_names = {}
-
-        for key, value in updated_fields.items():
-            update_expression += f"#{key} = :{key}, "
-            expression_attribute_values[f":{key}"] = value
-            expression_attribute_names[f"#{key}"] = key
-
-        # Remove the trailing comma and space
-        update_expression = update_expression[:-2]
-
-        # Update the item in DynamoDB
-        response = table.update_item(
-            Key={JOB_NAME: job_name, WORK_ID: work_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeValues=expression_attribute_values,
-            ExpressionAttributeNames=expression_attribute_names,
-            ReturnValues="ALL_NEW",
-        )
-
-        updated_item = response.get("Attributes")
+        if WORK_STATUS in updated_fields:
+            # Status changes move the work between its job's status counters
+            current_item = table.get_item(
+                Key={JOB_NAME: job_name, WORK_ID: work_id},
+                ProjectionExpression="#work_status",
+                ExpressionAttributeNames={"#work_status": WORK_STATUS},
+            ).get("Item")
+            if not current_item:
+                logger.warning(f"No item found for {JOB_NAME}={job_name} and {WORK_ID}={work_id}")
+                return create_response(404, {"error": "Item not found"})
+            transition_work_status(job_name, work_id, current_item[WORK_STATUS], updated_fields)
+            updated_item = table.get_item(Key={JOB_NAME: job_name, WORK_ID: work_id}).get("Item")
+        else:
+            update_expression, expression_attribute_names, expression_attribute_values = build_set_expression(
+                updated_fields
+            )
+            # Update the item in DynamoDB
+            response = table.update_item(
+                Key={JOB_NAME: job_name, WORK_ID: work_id},
+                UpdateExpression=update_expression,
+                ExpressionAttributeValues=expression_attribute_values,
+                ExpressionAttributeNames=expression_attribute_names,
+                ReturnValues="ALL_NEW",
+            )
+            updated_item = response.get("Attributes")
+
         if updated_item:
+            updated_item = rehydrate_item(updated_item)
             logger.info(f"Successfully updated item for {JOB_NAME}={job_name} and {WORK_ID}={work_id}")
             return create_response(200, {"message": "Item updated successfully", "item": updated_item})
         else:
@@ -106,6 +217,9 @@ def handler(event: Any, context: Any) -> dict[str, Any]:
             return create_response(404, {"error": "Item not found"})
 
     except ClientError as e:
+        if is_condition_failure(e):
+            logger.warning(f"Status of {JOB_NAME}={job_name} and {WORK_ID}={work_id} changed concurrently: {e}")
+            return create_response(409, {"error": "Work status changed concurrently, reload and try again"})
         logger.error(f"AWS service error: {e}")
         return create_response(500, {"error": "Internal server error"})
     except json.JSONDecodeError:
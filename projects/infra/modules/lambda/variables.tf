@@ -13,6 +13,16 @@ variable "works_table_name" {
   type        = string
 }
 
+variable "works_status_index_name" {
+  description = "Name of the works table index on job_name and work_status"
+  type        = string
+}
+
+variable "jobs_table_name" {
+  description = "Name of the DynamoDB jobs table"
+  type        = string
+}
+
 variable "sqs_queue_url" {
   description = "URL of SQS queue"
   type        = string
@@ -28,6 +38,61 @@ variable "ecs_task_definition_arn" {
   type        = string
 }
 
+variable "ecs_works_per_task" {
+  description = "Target number of queued works per ECS worker task"
+  type        = number
+  default     = 50
+}
+
+variable "ecs_max_tasks" {
+  description = "Maximum number of concurrent ECS worker tasks"
+  type        = number
+  default     = 10
+}
+
+variable "model_prices" {
+  description = "On-demand USD per million tokens by model ID substring, used to estimate the cost of usage"
+  type        = map(map(number))
+  default = {
+    "anthropic.claude-3-5-sonnet" = {
+      input_tokens       = 3.0
+      output_tokens      = 15.0
+      cache_read_tokens  = 0.3
+      cache_write_tokens = 3.75
+    }
+    "anthropic.claude-3-7-sonnet" = {
+      input_tokens       = 3.0
+      output_tokens      = 15.0
+      cache_read_tokens  = 0.3
+      cache_write_tokens = 3.75
+    }
+    "anthropic.claude-3-5-haiku" = {
+      input_tokens       = 0.8
+      output_tokens      = 4.0
+      cache_read_tokens  = 0.08
+      cache_write_tokens = 1.0
+    }
+    "amazon.nova-pro" = {
+      input_tokens      = 0.8
+      output_tokens     = 3.2
+      cache_read_tokens = 0.2
+    }
+    "amazon.nova-lite" = {
+      input_tokens      = 0.06
+      output_tokens     = 0.24
+      cache_read_tokens = 0.015
+    }
+    "meta.llama3-2-90b" = {
+      input_tokens  = 0.72
+      output_tokens = 0.72
+    }
+    "meta.llama3-2-11b" = {
+      input_tokens  = 0.16
+      output_tokens = 0.16
+    }
+  }
+}
+
 variable "private_subnet_ids" {
   description = "List of subnet IDs for ECS tasks"
   type        = list(string)
@@ -17,3 +17,8 @@ output "queue_name" {
   description = "The name of the created Amazon SQS queue"
   value       = aws_sqs_queue.work_queue.name
 }
+
+output "max_receive_count" {
+  description = "The number of times a message is delivered before it is moved to the dead-letter queue"
+  value       = var.max_receive_count
+}
@@ -37,3 +37,9 @@ variable "deployment_prefix" {
   description = "Unique name of the deployment"
   type        = string
 }
+
+variable "max_receive_count" {
+  description = "The number of times a message is delivered before it is moved to the dead-letter queue"
+  type        = number
+  default     = 3
+}
@@ -0,0 +1,191 @@
+# Copyright © Amazon.com and Affiliates: This deliverable is considered Developed Content as defined in the AWS Service
+# Terms and the SOW between the parties dated 2025.
+
+"""Check the create_job Lambda's ECS scaler against stubbed ECS and SQS clients."""
+
+import importlib.util
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Iterator
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+CREATE_JOB_PATH = Path(__file__).parents[3] / "projects/infra/modules/lambda/src/functions/create_job/index.py"
+REGION = "us-east-1"
+QUEUE_URL = "https://sqs.us-east-1.amazonaws.com/123456789012/works"
+CLUSTER = "cluster"
+FAMILY = "processing-task"
+RUN_TASK_KWARGS = {"cluster": CLUSTER, "taskDefinition": f"{FAMILY}:1", "launchType": "FARGATE"}
+
+
+@pytest.fixture(scope="module")
+def create_job() -> ModuleType:
+    """Import the create_job handler with the environment Terraform gives it."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        for name, value in {
+            "AWS_REGION": REGION,
+            "WORKS_TABLE_NAME": "works",
+            "JOBS_TABLE_NAME": "jobs",
+            "SQS_QUEUE_URL": QUEUE_URL,
+            "ECS_CLUSTER_NAME": CLUSTER,
+            "ECS_TASK_DEFINITION_ARN": f"arn:aws:ecs:{REGION}:123456789012:task-definition/{FAMILY}:1",
+            "ECS_CONTAINER_NAME": "processing-container",
+            "ECS_SUBNET_IDS": "subnet-1",
+            "ECS_SECURITY_GROUP_IDS": "sg-1",
+        }.items():
+            monkeypatch.setenv(name, value)
+        spec = importlib.util.spec_from_file_location("create_job_index", CREATE_JOB_PATH)
+        assert spec is not None and spec.loader is not None
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def clients() -> Iterator[tuple[Any, Stubber, Any, Stubber]]:
+    """ECS and SQS clients whose responses are stubbed, checking every expected call was made."""
+    ecs_client = boto3.client("ecs", region_name=REGION, aws_access_key_id="x", aws_secret_access_key="x")
+    sqs_client = boto3.client("sqs", region_name=REGION, aws_access_key_id="x", aws_secret_access_key="x")
+    with Stubber(ecs_client) as ecs_stubber, Stubber(sqs_client) as sqs_stubber:
+        yield ecs_client, ecs_stubber, sqs_client, sqs_stubber
+        ecs_stubber.assert_no_pending_responses()
+        sqs_stubber.assert_no_pending_responses()
+
+
+def stub_queue_depth(sqs_stubber: Stubber, visible: int, delayed: int, not_visible: int) -> None:
+    """Expect one read of the queue depth."""
+    sqs_stubber.add_response(
+        "get_queue_attributes",
+        {
+            "Attributes": {
+                "ApproximateNumberOfMessages": str(visible),
+                "ApproximateNumberOfMessagesDelayed": str(delayed),
+                "ApproximateNumberOfMessagesNotVisible": str(not_visible),
+            }
+        },
+        {
+            "QueueUrl": QUEUE_URL,
+            "AttributeNames": [
+                "ApproximateNumberOfMessages",
+                "ApproximateNumberOfMessagesDelayed",
+                "ApproximateNumberOfMessagesNotVisible",
+            ],
+        },
+    )
+
+
+def stub_active_tasks(ecs_stubber: Stubber, active_count: int) -> None:
+    """Expect one listing of the running tasks of the family."""
+    ecs_stubber.add_response(
+        "list_tasks",
+        {"taskArns": [f"arn:aws:ecs:{REGION}:123456789012:task/active-{index}" for index in range(active_count)]},
+        {"cluster": CLUSTER, "family": FAMILY, "desiredStatus": "RUNNING"},
+    )
+
+
+def stub_run_task(ecs_stubber: Stubber, count: int, started_count: int | None = None) -> None:
+    """Expect one RunTask call for count tasks, starting started_count of them (all by default)."""
+    started_count = count if started_count is None else started_count
+    ecs_stubber.add_response(
+        "run_task",
+        {
+            "tasks": [
+                {"taskArn": f"arn:aws:ecs:{REGION}:123456789012:task/new-{index}"} for index in range(started_count)
+            ],
+            "failures": [{"reason": "RESOURCE:CPU"}] * (count - started_count),
+        },
+        RUN_TASK_KWARGS | {"count": count},
+    )
+
+
+def scale(
+    create_job: ModuleType, ecs_client: Any, sqs_client: Any, works_per_task: int = 50, max_tasks: int = 10
+) -> str:
+    """Run the scaler against the stubbed clients."""
+    result: str = create_job.scale_ecs_tasks(
+        ecs_client=ecs_client,
+        sqs_client=sqs_client,
+        run_task_kwargs=RUN_TASK_KWARGS,
+        queue_url=QUEUE_URL,
+        cluster=CLUSTER,
+        family=FAMILY,
+        works_per_task=works_per_task,
+        max_tasks=max_tasks,
+    )
+    return result
+
+
+@pytest.mark.parametrize(
+    "queued, in_flight, works_per_task, max_tasks, expected",
+    [
+        (0, 0, 50, 10, 0),
+        (1, 0, 50, 10, 1),
+        (0, 3, 50, 10, 1),
+        (100, 0, 50, 10, 2),
+        (101, 0, 50, 10, 3),
+        (80, 21, 50, 10, 3),
+        (10_000, 0, 50, 10, 10),
+        (5, 0, 0, 10, 5),
+    ],
+)
+def test_compute_desired_task_count(
+    create_job: ModuleType, queued: int, in_flight: int, works_per_task: int, max_tasks: int, expected: int
+) -> None:
+    """Tasks grow with the backlog, in flight included, up to the maximum."""
+    assert create_job.compute_desired_task_count(queued, in_flight, works_per_task, max_tasks) == expected
+
+
+def test_scale_starts_missing_tasks(create_job: ModuleType, clients: tuple[Any, Stubber, Any, Stubber]) -> None:
+    """Only the tasks missing from the desired count are started."""
+    ecs_client, ecs_stubber, sqs_client, sqs_stubber = clients
+    stub_queue_depth(sqs_stubber, visible=120, delayed=20, not_visible=10)
+    stub_active_tasks(ecs_stubber, active_count=1)
+    stub_run_task(ecs_stubber, count=2)
+
+    assert scale(create_job, ecs_client, sqs_client) == "Started 2 new ECS tasks (3 active)"
+
+
+def test_scale_starts_nothing_when_enough_tasks(
+    create_job: ModuleType, clients: tuple[Any, Stubber, Any, Stubber]
+) -> None:
+    """No task is started when the active tasks cover the backlog."""
+    ecs_client, ecs_stubber, sqs_client, sqs_stubber = clients
+    stub_queue_depth(sqs_stubber, visible=30, delayed=0, not_visible=40)
+    stub_active_tasks(ecs_stubber, active_count=2)
+
+    assert "No new task started" in scale(create_job, ecs_client, sqs_client)
+
+
+def test_scale_starts_nothing_for_empty_queue(
+    create_job: ModuleType, clients: tuple[Any, Stubber, Any, Stubber]
+) -> None:
+    """An empty queue warrants no task, even with none running."""
+    ecs_client, ecs_stubber, sqs_client, sqs_stubber = clients
+    stub_queue_depth(sqs_stubber, visible=0, delayed=0, not_visible=0)
+    stub_active_tasks(ecs_stubber, active_count=0)
+
+    assert "No new task started" in scale(create_job, ecs_client, sqs_client)
+
+
+def test_scale_splits_run_task_calls(create_job: ModuleType, clients: tuple[Any, Stubber, Any, Stubber]) -> None:
+    """More tasks than one RunTask call may start are started over several calls."""
+    ecs_client, ecs_stubber, sqs_client, sqs_stubber = clients
+    stub_queue_depth(sqs_stubber, visible=2_000, delayed=0, not_visible=0)
+    stub_active_tasks(ecs_stubber, active_count=3)
+    stub_run_task(ecs_stubber, count=10)
+    stub_run_task(ecs_stubber, count=7)
+
+    assert scale(create_job, ecs_client, sqs_client, max_tasks=20) == "Started 17 new ECS tasks (20 active)"
+
+
+def test_scale_stops_when_no_task_starts(create_job: ModuleType, clients: tuple[Any, Stubber, Any, Stubber]) -> None:
+    """Capacity failures end the scaling instead of retrying RunTask indefinitely."""
+    ecs_client, ecs_stubber, sqs_client, sqs_stubber = clients
+    stub_queue_depth(sqs_stubber, visible=500, delayed=0, not_visible=0)
+    stub_active_tasks(ecs_stubber, active_count=0)
+    stub_run_task(ecs_stubber, count=10, started_count=4)
+    stub_run_task(ecs_stubber, count=6, started_count=0)
+
+    assert scale(create_job, ecs_client, sqs_client) == "Started 4 new ECS tasks (4 active)"